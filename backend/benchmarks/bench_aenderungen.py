@@ -0,0 +1,124 @@
+"""Benchmark: Client-Sync per Änderungsfeed vs. Listen komplett neu laden
+
+Legt eine Testdatenbank an (SQLite im Temp-Verzeichnis oder
+BENCH_DATABASE_URL, dort werden die Tabellen per migrate.py angelegt), füllt
+sie mit benchmarks/datagen.py und merkt sich den Cursor von GET /changes.
+Danach werden jeweils `--aenderungen` Schreibzugriffe gemacht (neue Kunden,
+Fahrzeuge und Aufträge, Statuswechsel) und ein Client bringt sich auf den
+neuen Stand: einmal, indem er /kunden, /fahrzeuge, /werkstatt und
+/auftraege komplett durchblättert (wie bisher das Frontend), einmal über
+/changes?since=<cursor>. Gemessen werden Dauer, Anfragen und Bytes. Die App
+läuft im selben Prozess (httpx.ASGITransport).
+
+Aufruf (aus backend/):
+    python -m benchmarks.bench_aenderungen --scale 20000 --aenderungen 10 100 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+LISTEN = ("/kunden", "/fahrzeuge", "/werkstatt", "/auftraege")
+
+
+async def schreiben(client: httpx.AsyncClient, rnd: random.Random, anzahl: int, mengen: Dict[str, int]):
+    for i in range(anzahl):
+        art = i % 4
+        if art == 0:
+            r = await client.post("/kunden", json={"name": f"Sync {i}", "email": "sync@example.com", "telefon": "1"})
+        elif art == 1:
+            r = await client.post("/fahrzeuge", json={"marke": "VW", "modell": "Golf", "baujahr": 2015,
+                                                      "kunde_id": rnd.randint(1, mengen["kunde"])})
+        elif art == 2:
+            r = await client.post("/auftraege", json={
+                "beschreibung": "Inspektion", "status": "offen", "kosten": 120,
+                "fahrzeug_id": rnd.randint(1, mengen["fahrzeug"]), "werkstatt_id": rnd.randint(1, mengen["werkstatt"]),
+            })
+        else:
+            r = await client.patch(f"/auftraege/{rnd.randint(1, mengen['auftrag'])}/status",
+                                   json={"status": "in_arbeit"})
+        r.raise_for_status()
+
+
+async def komplett(client: httpx.AsyncClient) -> Dict:
+    started, anfragen, groesse, zeilen = time.perf_counter(), 0, 0, 0
+    for pfad in LISTEN:
+        params = {"limit": 1000}
+        while True:
+            r = await client.get(pfad, params=params)
+            r.raise_for_status()
+            anfragen, groesse, zeilen = anfragen + 1, groesse + len(r.content), zeilen + len(r.json())
+            weiter = r.headers.get("x-next-cursor")
+            if not weiter:
+                break
+            params["after"] = weiter
+    return {"dauer_ms": round((time.perf_counter() - started) * 1000, 1), "anfragen": anfragen,
+            "bytes": groesse, "zeilen": zeilen}
+
+
+async def delta(client: httpx.AsyncClient, since: int) -> Dict:
+    started, anfragen, groesse, zeilen = time.perf_counter(), 0, 0, 0
+    while True:
+        r = await client.get("/changes", params={"since": since, "limit": 1000})
+        r.raise_for_status()
+        seite = r.json()
+        anfragen, groesse, zeilen = anfragen + 1, groesse + len(r.content), zeilen + len(seite["changes"])
+        since = seite["cursor"]
+        if not seite["has_more"]:
+            break
+    return {"dauer_ms": round((time.perf_counter() - started) * 1000, 1), "anfragen": anfragen,
+            "bytes": groesse, "zeilen": zeilen, "cursor": since}
+
+
+async def main_async(args) -> List[Dict]:
+    import migrate
+    migrate.migrate()
+    from benchmarks.datagen import generate
+    from database import engine
+    mengen = generate(engine, scale=args.scale, seed=args.seed)
+    import main
+
+    rnd = random.Random(args.seed)
+    ergebnisse = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            cursor = (await client.get("/changes")).json()["cursor"]
+            for anzahl in args.aenderungen:
+                await schreiben(client, rnd, anzahl, mengen)
+                voll = await komplett(client)
+                neu = await delta(client, cursor)
+                cursor = neu.pop("cursor")
+                ergebnisse.append({"aenderungen": anzahl, "komplett": voll, "delta": neu})
+    return ergebnisse
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=20000, help="Kunden für datagen")
+    parser.add_argument("--aenderungen", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["WEB_SEARCH_CACHE_PATH"] = os.path.join(tmp, "web_search_cache.sqlite3")
+    os.environ["AGENT_WARMUP"] = "false"
+
+    result = asyncio.run(main_async(args))
+    for r in result:
+        voll, neu = r["komplett"], r["delta"]
+        print(f"{r['aenderungen']:>6} Änderungen: komplett {voll['dauer_ms']:8.1f} ms, {voll['anfragen']:4d} Anfragen, "
+              f"{voll['bytes'] / 1024:8.0f} KiB | delta {neu['dauer_ms']:7.1f} ms, {neu['anfragen']:2d} Anfragen, "
+              f"{neu['bytes'] / 1024:6.0f} KiB ({neu['zeilen']} Zeilen)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,160 @@
+"""Benchmark: synchrone vs. asynchrone DB-Schicht unter gleicher Latenzgrenze
+
+Beide Varianten bedienen denselben Listen-Endpunkt (100 Kunden). Vor jeder
+Abfrage wird ein Netzwerk-Roundtrip zur Datenbank simuliert:
+- Postgres: `SELECT pg_sleep(...)` über dieselbe Verbindung
+- SQLite: blockierendes `time.sleep` (sync) bzw. `asyncio.sleep` (async),
+  so wie ein blockierender bzw. ein asynchroner Treiber auf den Socket wartet
+
+Für jede Nebenläufigkeitsstufe wird die p95-Latenz gemessen. Ausgegeben wird
+die höchste Stufe, die jede Variante noch innerhalb des Budgets schafft.
+Aussagekräftig ist vor allem der Lauf gegen Postgres: aiosqlite arbeitet
+selbst mit einem Thread pro Verbindung und misst eher dessen Overhead.
+
+Aufruf (aus backend/):
+    python -m benchmarks.bench_async_db --latency-ms 20 --budget-ms 250
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_async_db
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+from fastapi import Depends, FastAPI, Response
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+import models
+from database import Base, to_async_url
+from services.pagination import keyset_page
+
+PAGE_SIZE = 100
+
+
+def build_app(url: str, latency_s: float, pool_size: int) -> FastAPI:
+    is_postgres = url.startswith("postgresql")
+    engine_kwargs = {"pool_size": pool_size, "max_overflow": 0}
+
+    sync_engine = create_engine(url, **engine_kwargs)
+    async_engine = create_async_engine(to_async_url(url), **engine_kwargs)
+    SyncSession = sessionmaker(bind=sync_engine)
+    AsyncSessionBench = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    Base.metadata.create_all(bind=sync_engine)
+    with SyncSession() as db:
+        if db.scalar(select(func.count(models.Kunde.id))) < PAGE_SIZE:
+            db.execute(insert(models.Kunde), [
+                {"name": f"Kunde {i}", "email": f"kunde{i}@example.com", "telefon": "0301234567"}
+                for i in range(PAGE_SIZE)
+            ])
+            db.commit()
+
+    def get_sync_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionBench() as db:
+            yield db
+
+    app = FastAPI()
+    app.state.engines = (sync_engine, async_engine)
+
+    @app.get("/sync/kunden")
+    def sync_kunden(db: Session = Depends(get_sync_db)):
+        if is_postgres:
+            db.execute(text("SELECT pg_sleep(:s)"), {"s": latency_s})
+        else:
+            time.sleep(latency_s)
+        return [k.id for k in db.query(models.Kunde).order_by(models.Kunde.id).limit(PAGE_SIZE).all()]
+
+    @app.get("/async/kunden")
+    async def async_kunden(response: Response, db: AsyncSession = Depends(get_async_db)):
+        if is_postgres:
+            await db.execute(text("SELECT pg_sleep(:s)"), {"s": latency_s})
+        else:
+            await asyncio.sleep(latency_s)
+        return [k.id for k in await keyset_page(db, response, models.Kunde, PAGE_SIZE)]
+
+    return app
+
+
+async def run_level(client: httpx.AsyncClient, path: str, concurrency: int, requests_per_worker: int) -> List[float]:
+    latencies: List[float] = []
+
+    async def worker():
+        for _ in range(requests_per_worker):
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def p95(values: List[float]) -> float:
+    return statistics.quantiles(values, n=100)[94]
+
+
+async def main(args) -> Dict:
+    url = args.database_url
+    if not url:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    app = build_app(url, args.latency_ms / 1000, args.pool_size)
+    report = {"latency_ms": args.latency_ms, "budget_ms": args.budget_ms, "variants": {}}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for variant in ("sync", "async"):
+            levels = []
+            sustained = 0
+            for concurrency in args.levels:
+                started = time.perf_counter()
+                latencies = await run_level(client, f"/{variant}/kunden", concurrency, args.requests)
+                elapsed = time.perf_counter() - started
+                level_p95 = p95(latencies) * 1000
+                levels.append({
+                    "concurrency": concurrency,
+                    "p95_ms": round(level_p95, 1),
+                    "requests_per_second": round(len(latencies) / elapsed, 1),
+                })
+                print(f"{variant:>5}  c={concurrency:<4} p95={level_p95:8.1f} ms  {len(latencies) / elapsed:8.1f} req/s")
+                if level_p95 > args.budget_ms:
+                    break
+                sustained = concurrency
+            report["variants"][variant] = {"sustained_concurrency": sustained, "levels": levels}
+
+    sync_engine, async_engine = app.state.engines
+    sync_engine.dispose()
+    await async_engine.dispose()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulierter DB-Roundtrip")
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="p95-Latenzgrenze")
+    parser.add_argument("--pool-size", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5, help="Requests pro Client und Stufe")
+    parser.add_argument("--levels", type=int, nargs="+", default=[10, 25, 50, 100, 200, 400])
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    for variant, data in result["variants"].items():
+        print(f"{variant}: hält {data['sustained_concurrency']} parallele Requests unter {args.budget_ms:.0f} ms (p95)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
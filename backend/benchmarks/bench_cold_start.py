@@ -0,0 +1,93 @@
+"""Benchmark: Kaltstart eines Workers (Importzeit und Zeit bis zur ersten 200 auf `/`)
+
+Jede Messung startet einen frischen Python-Prozess:
+- import: `import main` (inkl. aller Service-Module), gemessen im Prozess
+- erste_200: Start von uvicorn bis zur ersten erfolgreichen Antwort auf `GET /`
+Die zweite Messung läuft einmal mit erreichbarer SQLite-Datenbank und einmal
+mit einer nicht erreichbaren Postgres-URL; der Worker soll in beiden Fällen
+sofort antworten (Schema: `python migrate.py`, Indizes: Hintergrund).
+
+Aufruf (aus backend/):
+    python -m benchmarks.bench_cold_start --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+UNERREICHBAR = "postgresql://bench@127.0.0.1:9/bench"  # Port 9: Verbindung wird abgewiesen
+
+
+def import_zeit_ms(env: Dict[str, str]) -> float:
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env, check=True, capture_output=True, text=True)
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+def erste_200_ms(env: Dict[str, str], port: int, timeout_s: float = 30.0) -> float:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "critical"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout_s:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                        return (time.perf_counter() - started) * 1000
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise RuntimeError(f"Server beendet mit Code {server.returncode}")
+                time.sleep(0.01)
+        raise RuntimeError("Keine Antwort innerhalb des Timeouts")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def auswertung(werte: List[float]) -> Dict:
+    return {"p50_ms": round(statistics.median(werte), 1), "max_ms": round(max(werte), 1)}
+
+
+def main(args) -> Dict:
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        WEB_SEARCH_CACHE_PATH=os.path.join(tmp, "web_search_cache.sqlite3"),
+        KI_LOG_FALLBACK_PATH=os.path.join(tmp, "ki_fallback.ndjson"),
+        KI_LOG_DEAD_LETTER_PATH=os.path.join(tmp, "ki_dead_letter.ndjson"),
+    )
+    subprocess.run([sys.executable, "migrate.py"], env=env, check=True, stdout=subprocess.DEVNULL)
+    ohne_db = dict(env, DATABASE_URL=UNERREICHBAR)
+    ohne_db.pop("ASYNC_DATABASE_URL", None)
+
+    return {
+        "import": auswertung([import_zeit_ms(env) for _ in range(args.runs)]),
+        "erste_200": auswertung([erste_200_ms(env, args.port) for _ in range(args.runs)]),
+        "erste_200_db_nicht_erreichbar": auswertung([erste_200_ms(ohne_db, args.port) for _ in range(args.runs)]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    result = main(args)
+    for name, r in result.items():
+        print(f"{name:>30}: p50 {r['p50_ms']:8.1f} ms   max {r['max_ms']:8.1f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
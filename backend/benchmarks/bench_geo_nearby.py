@@ -0,0 +1,76 @@
+"""Benchmark: Umkreissuche über den Gitter-Index vs. Scan aller Werkstätten
+
+Verteilt N zufällige Werkstätten über Deutschland (Bounding Box) und misst
+für zufällige Mittelpunkte die nächsten `--limit` Treffer im Umkreis.
+Der Scan berechnet die Entfernung zu jeder Werkstatt und dient als
+Referenz für Laufzeit und Korrektheit.
+
+Aufruf (aus backend/):
+    python -m benchmarks.bench_geo_nearby --werkstaetten 50000 --radius-km 25
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Dict
+
+from services.geo import GeoGrid, haversine_km
+
+LAT_RANGE = (47.3, 55.0)
+LON_RANGE = (5.9, 15.0)
+
+
+def main(args) -> Dict:
+    rnd = random.Random(args.seed)
+    punkte = {i: (rnd.uniform(*LAT_RANGE), rnd.uniform(*LON_RANGE)) for i in range(args.werkstaetten)}
+    grid = GeoGrid(cell_km=args.cell_km)
+    for key, (lat, lon) in punkte.items():
+        grid.add(key, lat, lon)
+
+    mittelpunkte = [(rnd.uniform(*LAT_RANGE), rnd.uniform(*LON_RANGE)) for _ in range(args.queries)]
+    index_us, scan_us = [], []
+    for lat, lon in mittelpunkte:
+        started = time.perf_counter()
+        treffer = grid.nearest(lat, lon, args.radius_km, args.limit)
+        index_us.append((time.perf_counter() - started) * 1e6)
+
+        if len(scan_us) < args.scan_queries:
+            started = time.perf_counter()
+            alle = sorted(
+                (d, k) for k, p in punkte.items() if (d := haversine_km(lat, lon, *p)) <= args.radius_km
+            )[:args.limit]
+            scan_us.append((time.perf_counter() - started) * 1e6)
+            assert [k for _, k in alle] == [k for _, k in treffer], "Index und Scan weichen ab"
+
+    def auswertung(werte):
+        q = statistics.quantiles(werte, n=100)
+        return {"p50_us": round(q[49], 1), "p99_us": round(q[98], 1)}
+
+    return {
+        "werkstaetten": args.werkstaetten,
+        "radius_km": args.radius_km,
+        "limit": args.limit,
+        "index": auswertung(index_us),
+        "scan": auswertung(scan_us),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--werkstaetten", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--scan-queries", type=int, default=50, help="Anzahl Referenz-Scans")
+    parser.add_argument("--radius-km", type=float, default=25.0)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--cell-km", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    result = main(args)
+    for variante in ("index", "scan"):
+        print(f"{variante:>5}: p50 {result[variante]['p50_us']:10.1f} µs   p99 {result[variante]['p99_us']:10.1f} µs")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,152 @@
+"""Benchmark: Bytes auf der Leitung und Server-CPU für das Laden der Listen
+
+Startet die App mit uvicorn in einem eigenen Prozess (SQLite-Testdatenbank),
+legt Kunden, Fahrzeuge und Werkstätten per Bulk-Import an und wiederholt dann
+das Muster der Frontend-Seite ApiPage: GET /kunden, /fahrzeuge und /werkstatt.
+Varianten:
+- identity: ohne Komprimierung und ohne If-None-Match (entspricht dem Stand
+  vor ETag/Komprimierung, plus der Berechnung der ETag)
+- gzip / br: komprimierte Antworten
+- revalidierung: gzip mit der ETag der vorherigen Antwort → 304
+Gemessen werden Bytes pro Seitenaufruf (Header + Body, wie übertragen) und
+die CPU-Zeit des Server-Prozesses (aus /proc, daher nur unter Linux).
+
+Aufruf (aus backend/):
+    python -m benchmarks.bench_http_cache --anzahl 1000 --limit 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from services.compression import brotli
+
+LISTEN = ("/kunden", "/fahrzeuge", "/werkstatt")
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def server_cpu_s(pid: int) -> float:
+    """utime + stime des Prozesses in Sekunden"""
+    with open(f"/proc/{pid}/stat") as f:
+        felder = f.read().rsplit(")", 1)[1].split()
+    return (int(felder[11]) + int(felder[12])) / CLK_TCK
+
+
+def bytes_auf_leitung(r: httpx.Response) -> int:
+    status_zeile = len(f"HTTP/1.1 {r.status_code} {r.reason_phrase}\r\n")
+    header = sum(len(k) + len(v) + 4 for k, v in r.headers.raw) + 2
+    return status_zeile + header + r.num_bytes_downloaded
+
+
+def seed(client: httpx.Client, anzahl: int):
+    client.post("/kunden/bulk", json=[
+        {"name": f"Kunde {i}", "email": f"kunde{i}@example.com", "telefon": "030 1234567"} for i in range(anzahl)
+    ]).raise_for_status()
+    client.post("/fahrzeuge/bulk", json=[
+        {"marke": "Volkswagen", "modell": "Golf VII", "baujahr": 2015, "kunde_id": i + 1} for i in range(anzahl)
+    ]).raise_for_status()
+    client.post("/werkstatt/bulk", json=[
+        {"name": f"Autowerkstatt {i}", "adresse": "Hauptstraße 1", "plz": "10115", "ort": "Berlin"}
+        for i in range(anzahl)
+    ]).raise_for_status()
+
+
+def szenario(client: httpx.Client, pid: int, limit: int, aufrufe: int, encoding: str, revalidieren: bool) -> Dict:
+    etags: Dict[str, str] = {}
+    bytes_pro_aufruf: List[int] = []
+    latenzen_ms: List[float] = []
+    status: Dict[int, int] = {}
+    cpu_start = server_cpu_s(pid)
+
+    for _ in range(aufrufe):
+        summe = 0
+        started = time.perf_counter()
+        for pfad in LISTEN:
+            headers = {"Accept-Encoding": encoding}
+            if revalidieren and pfad in etags:
+                headers["If-None-Match"] = etags[pfad]
+            r = client.get(pfad, params={"limit": limit}, headers=headers)
+            r.read()
+            if "etag" in r.headers:
+                etags[pfad] = r.headers["etag"]
+            status[r.status_code] = status.get(r.status_code, 0) + 1
+            summe += bytes_auf_leitung(r)
+        latenzen_ms.append((time.perf_counter() - started) * 1000)
+        bytes_pro_aufruf.append(summe)
+
+    cpu_s = server_cpu_s(pid) - cpu_start
+    return {
+        "bytes_pro_aufruf": round(statistics.mean(bytes_pro_aufruf)),
+        "server_cpu_ms_pro_aufruf": round(cpu_s * 1000 / aufrufe, 2),
+        "latenz_p50_ms": round(statistics.median(latenzen_ms), 2),
+        "status": status,
+    }
+
+
+def main(args) -> Dict:
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        WEB_SEARCH_CACHE_PATH=os.path.join(tmp, "web_search_cache.sqlite3"),
+        KI_LOG_FALLBACK_PATH=os.path.join(tmp, "ki_fallback.ndjson"),
+        KI_LOG_DEAD_LETTER_PATH=os.path.join(tmp, "ki_dead_letter.ndjson"),
+    )
+    env.setdefault("OPENAI_API_KEY", "bench")
+    env.setdefault("TAVILY_API_KEY", "bench")
+    subprocess.run([sys.executable, "migrate.py"], env=env, check=True, stdout=subprocess.DEVNULL)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            for _ in range(200):
+                try:
+                    client.get("/")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            seed(client, args.anzahl)
+
+            varianten = [("identity", "identity", False), ("gzip", "gzip", False)]
+            if brotli is not None:
+                varianten.append(("br", "br", False))
+            varianten.append(("revalidierung", "gzip", True))
+
+            ergebnis = {"anzahl": args.anzahl, "limit": args.limit, "aufrufe": args.aufrufe}
+            for name, encoding, revalidieren in varianten:
+                # Aufwärmen (und erste ETag für die Revalidierung holen)
+                szenario(client, server.pid, args.limit, 3, encoding, revalidieren)
+                ergebnis[name] = szenario(client, server.pid, args.limit, args.aufrufe, encoding, revalidieren)
+            return ergebnis
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--anzahl", type=int, default=1000, help="Zeilen pro Tabelle")
+    parser.add_argument("--limit", type=int, default=1000, help="Seitengröße der Listen")
+    parser.add_argument("--aufrufe", type=int, default=50, help="Seitenaufrufe (je drei Listen) pro Variante")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    result = main(args)
+    for name in ("identity", "gzip", "br", "revalidierung"):
+        if name in result:
+            r = result[name]
+            print(f"{name:>13}: {r['bytes_pro_aufruf']:9d} B/Aufruf   "
+                  f"Server-CPU {r['server_cpu_ms_pro_aufruf']:7.2f} ms/Aufruf   p50 {r['latenz_p50_ms']:7.2f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
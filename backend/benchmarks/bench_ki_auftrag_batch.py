@@ -0,0 +1,103 @@
+"""Benchmark: Nachrichten pro Sekunde, POST /ki/auftrag einzeln vs. /ki/auftrag/batch
+
+Legt eine Testdatenbank an (SQLite im Temp-Verzeichnis oder
+BENCH_DATABASE_URL, dort werden die Tabellen per migrate.py angelegt), füllt
+sie mit benchmarks/datagen.py und schickt dann dieselben Kundennachrichten
+(zufällige Fahrzeuge, teils mit Kunde oder Werkstatt, teils ohne Zuordnung)
+einmal in einer Schleife an den Einzel-Endpunkt und einmal in Batches an
+/ki/auftrag/batch. Die App läuft im selben Prozess (httpx.ASGITransport),
+gemessen wird also Server-Arbeit plus ASGI, ohne Netzwerk.
+
+Aufruf (aus backend/):
+    python -m benchmarks.bench_ki_auftrag_batch --nachrichten 2000 --batch 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+
+def nachrichten(anzahl: int, fahrzeuge: int, kunden: int, werkstaetten: int, seed: int) -> List[dict]:
+    rnd = random.Random(seed)
+    ergebnis = []
+    for i in range(anzahl):
+        nachricht = {"nachricht": f"Bitte Termin für Inspektion, Bremsen quietschen ({i})"}
+        art = rnd.random()
+        if art < 0.7:
+            nachricht["fahrzeug_id"] = rnd.randint(1, fahrzeuge)
+        elif art < 0.9:
+            nachricht["kunde_id"] = rnd.randint(1, kunden)
+        if rnd.random() < 0.3:
+            nachricht["werkstatt_id"] = rnd.randint(1, werkstaetten)
+        ergebnis.append(nachricht)
+    return ergebnis
+
+
+async def einzeln(client: httpx.AsyncClient, daten: List[dict]) -> float:
+    started = time.perf_counter()
+    for nachricht in daten:
+        (await client.post("/ki/auftrag", json=nachricht)).raise_for_status()
+    return time.perf_counter() - started
+
+
+async def batch(client: httpx.AsyncClient, daten: List[dict], groesse: int) -> float:
+    started = time.perf_counter()
+    for start in range(0, len(daten), groesse):
+        r = await client.post("/ki/auftrag/batch", json=daten[start:start + groesse])
+        r.raise_for_status()
+        assert not r.json()["errors"], r.json()["errors"][:3]
+    return time.perf_counter() - started
+
+
+async def main_async(args) -> Dict:
+    import migrate
+    migrate.migrate()
+    from benchmarks.datagen import generate
+    from database import engine
+    mengen = generate(engine, scale=args.scale, seed=args.seed)
+    import main
+
+    daten = nachrichten(args.nachrichten, mengen["fahrzeug"], mengen["kunde"], mengen["werkstatt"], args.seed)
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            dauer_einzeln = await einzeln(client, daten)
+            dauer_batch = await batch(client, daten, args.batch)
+    return {
+        "nachrichten": args.nachrichten,
+        "batch": args.batch,
+        "datenbank": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "einzeln_pro_s": round(args.nachrichten / dauer_einzeln, 1),
+        "batch_pro_s": round(args.nachrichten / dauer_batch, 1),
+        "faktor": round(dauer_einzeln / dauer_batch, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nachrichten", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500, help="Nachrichten pro Batch-Anfrage")
+    parser.add_argument("--scale", type=int, default=5000, help="Kunden für datagen")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["WEB_SEARCH_CACHE_PATH"] = os.path.join(tmp, "web_search_cache.sqlite3")
+    os.environ["AGENT_WARMUP"] = "false"
+
+    result = asyncio.run(main_async(args))
+    print(f"{result['nachrichten']} Nachrichten ({result['datenbank']}): "
+          f"einzeln {result['einzeln_pro_s']:.0f}/s, batch {result['batch_pro_s']:.0f}/s "
+          f"(Faktor {result['faktor']})")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
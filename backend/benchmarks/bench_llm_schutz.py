@@ -0,0 +1,161 @@
+"""Benchmark: Zusammenlegen gleicher Agent-Anfragen und Rate-Limit pro Client
+
+Läuft ohne Netz mit dem Offline-Ersatz für OpenAI und Tavily
+(benchmarks/offline_agent.py) gegen die App im selben Prozess
+(httpx.ASGITransport, SQLite-Testdatenbank in einem Temp-Verzeichnis).
+- Zusammenlegen: `--gleichzeitig` Clients schicken dieselbe Frage (mit
+  abweichender Schreibweise) an /werkstatt-agent/search, einmal mit und
+  einmal ohne AGENT_COALESCE. Gezählt werden die Aufrufe von Agent 2 und der
+  Suche, die Dauer und die geschriebenen KIAktionen.
+- Rate-Limit: ein Client (IP) schickt `--anfragen` Anfragen in schneller
+  Folge, zwei weitere Clients per Keycloak-Token je eine, dazu ein Token mit
+  gefälschter Signatur; gezählt werden 200 und 429 (Burst/Nachlauf aus
+  LLM_RATE_LIMIT_*). Die Tokens signiert ein Test-Schlüssel, dessen JWKS
+  statt Keycloak eingesetzt wird (braucht PyJWT[crypto]).
+
+Aufruf (aus backend/):
+    python -m benchmarks.bench_llm_schutz --gleichzeitig 50 --anfragen 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict
+
+import httpx
+
+FRAGE = "Finde mir eine gute Werkstatt in {ort}"
+
+
+def test_schluessel():
+    """RSA-Schlüssel für die Tokens; der öffentliche Teil ersetzt das JWKS des Realms"""
+    import jwt
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from services.rate_limit import keycloak_schluessel
+
+    privat = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = {**json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(privat.public_key())), "kid": "bench", "alg": "RS256"}
+    keycloak_schluessel.setzen({"keys": [jwk]})
+    return privat
+
+
+def test_schluessel_fremd():
+    """Schlüssel, der nicht im JWKS steht (gefälschte Signatur mit passender kid)"""
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def keycloak_token(privat, sub: str) -> str:
+    """Vom Test-Schlüssel signiertes Token mit Aussteller des Realms"""
+    import jwt
+    from services.rate_limit import KEYCLOAK_ISSUER
+
+    claims = {"sub": sub, "iss": KEYCLOAK_ISSUER, "exp": int(time.time()) + 300}
+    return jwt.encode(claims, privat, algorithm="RS256", headers={"kid": "bench"})
+
+
+async def zusammenlegen(main, ersatz: Dict, gleichzeitig: int, an: bool, ort: str) -> Dict:
+    from services.rate_limit import llm_rate_limiter
+    from services.single_flight import agent_single_flight
+
+    agent_single_flight.enabled = an
+    llm_rate_limiter.enabled = False
+    vorher = {name: ersatz[name].aufrufe for name in ("agent2", "search")}
+    ki_vorher = main.ki_log.stats()
+    schreibweisen = [FRAGE.format(ort=ort), FRAGE.format(ort=ort.upper()) + "?", "  " + FRAGE.format(ort=ort) + " "]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        started = time.perf_counter()
+        antworten = await asyncio.gather(*[
+            client.post("/werkstatt-agent/search", json={"query": schreibweisen[i % len(schreibweisen)]})
+            for i in range(gleichzeitig)
+        ])
+        dauer = time.perf_counter() - started
+    await main.ki_log.flush()
+    ki_nachher = main.ki_log.stats()
+    return {
+        "coalesce": an,
+        "status": {code: sum(r.status_code == code for r in antworten) for code in {r.status_code for r in antworten}},
+        "agent2_aufrufe": ersatz["agent2"].aufrufe - vorher["agent2"],
+        "suche_aufrufe": ersatz["search"].aufrufe - vorher["search"],
+        "ki_aktionen": ki_nachher["written"] - ki_vorher["written"],
+        "dauer_s": round(dauer, 3),
+    }
+
+
+async def rate_limit(main, anfragen: int) -> Dict:
+    from services.rate_limit import llm_rate_limiter
+
+    llm_rate_limiter.enabled = True
+    llm_rate_limiter.clear()
+    transport = httpx.ASGITransport(app=main.app, client=("10.0.0.1", 4711))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        ergebnis = {"ip": {}, "subjects": {}}
+        for i in range(anfragen):
+            r = await client.post("/langchain/chat", json={"message": f"Wie oft Ölwechsel? ({i})"})
+            ergebnis["ip"][r.status_code] = ergebnis["ip"].get(r.status_code, 0) + 1
+            if r.status_code == 429:
+                ergebnis["retry_after"] = r.headers.get("retry-after")
+        privat = test_schluessel()
+        for sub in ("kunde-a", "kunde-b"):
+            r = await client.post("/langchain/chat", json={"message": "Wie oft Ölwechsel?"},
+                                  headers={"Authorization": f"Bearer {keycloak_token(privat, sub)}"})
+            ergebnis["subjects"][sub] = r.status_code
+        # Fremder Schlüssel: zählt als die IP (kein eigener Eimer, siehe stats["clients"])
+        r = await client.post("/langchain/chat", json={"message": "Wie oft Ölwechsel?"},
+                              headers={"Authorization": f"Bearer {keycloak_token(test_schluessel_fremd(), 'x')}"})
+        ergebnis["subjects"]["gefaelscht"] = r.status_code
+    ergebnis["stats"] = llm_rate_limiter.stats()
+    return ergebnis
+
+
+async def main_async(args) -> Dict:
+    import migrate
+    migrate.migrate()
+    from benchmarks import offline_agent
+    ersatz = offline_agent.install(args.llm_latency_ms, args.token_ms, args.search_latency_ms)
+    import main
+
+    ergebnis = {}
+    async with main.lifespan(main.app):
+        ergebnis["zusammenlegen"] = [
+            await zusammenlegen(main, ersatz, args.gleichzeitig, an=False, ort="Berlin"),
+            await zusammenlegen(main, ersatz, args.gleichzeitig, an=True, ort="München"),
+        ]
+        ergebnis["rate_limit"] = await rate_limit(main, args.anfragen)
+    return ergebnis
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gleichzeitig", type=int, default=50, help="Gleichzeitige Clients mit derselben Frage")
+    parser.add_argument("--anfragen", type=int, default=30, help="Anfragen eines Clients für das Rate-Limit")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=2)
+    parser.add_argument("--search-latency-ms", type=float, default=200)
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    os.environ["WEB_SEARCH_CACHE_PATH"] = os.path.join(tmp, "web_search_cache.sqlite3")
+    os.environ["KI_LOG_FALLBACK_PATH"] = os.path.join(tmp, "ki_fallback.ndjson")
+    os.environ["KI_LOG_DEAD_LETTER_PATH"] = os.path.join(tmp, "ki_dead_letter.ndjson")
+    os.environ["AGENT_WARMUP"] = "false"
+    sys.stdout.reconfigure(line_buffering=True)
+
+    result = asyncio.run(main_async(args))
+    for r in result["zusammenlegen"]:
+        print(f"coalesce={'an ' if r['coalesce'] else 'aus'}: {args.gleichzeitig} Anfragen in {r['dauer_s']:.2f} s, "
+              f"Agent 2 {r['agent2_aufrufe']}x, Suche {r['suche_aufrufe']}x, "
+              f"KIAktionen {r['ki_aktionen']}, Status {r['status']}")
+    rl = result["rate_limit"]
+    print(f"Rate-Limit: IP {rl['ip']} (Retry-After {rl.get('retry_after')}), Subjects {rl['subjects']}, "
+          f"Eimer {rl['stats']['clients']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2, default=str)
@@ -0,0 +1,113 @@
+"""Benchmark: Prompt-Tokens von Agent 2 vor und nach der Kontext-Kompaktierung
+
+Füllt eine SQLite-Datenbank im Speicher mit synthetischen Daten
+(benchmarks/datagen.py, Werkstätten nach Einwohnern auf echte Orte verteilt),
+lädt Werkstatt-Index und Statistik und baut für jede Benchmark-Anfrage den
+Prompt von Agent 2 zweimal:
+- vorher: ausführliche DB-Liste und roher Tavily-Text (wie bisher)
+- nachher: Kandidaten nach Relevanz, kompakt, im Budget AGENT2_CONTEXT_TOKENS
+Die Web-Treffer kommen vom Offline-Ersatz (drei Treffer à ~700 Zeichen wie
+bei Tavily). Gezählt wird mit services/tokens.py (tiktoken, sonst geschätzt).
+
+Aufruf (aus backend/):
+    python -m benchmarks.bench_prompt_kontext --scale 20000 --budget 600
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Dict
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.datagen import generate
+from benchmarks.offline_agent import OfflineSearch, klassifizieren
+from database import Base
+from services import tokens
+from services.fast_classifier import fast_classifier
+from services.prompt_kontext import WebErgebnis, bauen
+from services.statistik import auftrag_statistik
+from services.werkstatt_index import werkstatt_index
+from services.werkstatt_web_agent import (
+    WERKSTATT_SEARCH_TEMPLATE, db_ergebnis, extract_search_query, format_db_ergebnis, format_web_ergebnis,
+)
+
+ANFRAGEN = [
+    "Finde mir eine gute Werkstatt in Berlin",
+    "Suche Werkstatt für VW Golf in München",
+    "Welche Werkstatt in Hamburg macht Klimaservice?",
+    "Autowerkstatt in Köln mit guten Bewertungen",
+    "Werkstatt in der Nähe von 10115 Berlin",
+    "Günstige Kfz-Werkstatt in Leipzig für BMW 3er",
+    "Suche Werkstatt in Bad Tölz",
+    "Werkstatt für Tesla Model 3 in Stuttgart",
+    "Finde eine Werkstatt",
+    "Autohaus in Frankfurt am Main für Inspektion",
+]
+
+
+def prompt(classification: str, anfrage: str, db_results: str, web_results: str) -> str:
+    return WERKSTATT_SEARCH_TEMPLATE.format(
+        classification=classification, user_input=anfrage, db_results=db_results, web_results=web_results,
+    )
+
+
+def main(args) -> Dict:
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    generate(engine, scale=args.scale, seed=args.seed)
+    with Session(engine) as db:
+        werkstatt_index.load(db)
+        auftrag_statistik.load(db)
+    search = OfflineSearch(latency_ms=0)
+
+    ergebnis = {"scale": args.scale, "budget": args.budget, "tokens_geschaetzt": tokens.geschaetzt(), "anfragen": {}}
+    for anfrage in ANFRAGEN:
+        classification = fast_classifier.classify(anfrage) or klassifizieren({"user_input": anfrage})
+        db = db_ergebnis(anfrage, classification)
+        web_query = extract_search_query(anfrage, classification)
+        web = WebErgebnis(web_query, json.dumps(search.run(web_query), ensure_ascii=False))
+
+        vorher = prompt(classification, anfrage, format_db_ergebnis(db), format_web_ergebnis(web))
+        started = time.perf_counter()
+        kontext = bauen(classification, db, web, budget=args.budget)
+        dauer_ms = (time.perf_counter() - started) * 1000
+        nachher = prompt(classification, anfrage, kontext.db_text, kontext.web_text)
+
+        ergebnis["anfragen"][anfrage] = {
+            "vorher": tokens.anzahl(vorher),
+            "nachher": tokens.anzahl(nachher),
+            "werkstaetten": f"{kontext.db['verwendet']}/{kontext.db['gesamt']}",
+            "web_treffer": f"{kontext.web['verwendet']}/{kontext.web['gesamt']}",
+            "kontext_ms": round(dauer_ms, 2),
+        }
+        if args.zeigen:
+            print(f"\n--- {anfrage} ---\n{kontext.db_text}\n{kontext.web_text}")
+
+    werte = ergebnis["anfragen"].values()
+    ergebnis["summe"] = {"vorher": sum(w["vorher"] for w in werte), "nachher": sum(w["nachher"] for w in werte)}
+    ergebnis["median_kontext_ms"] = round(statistics.median(w["kontext_ms"] for w in werte), 2)
+    return ergebnis
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=20_000, help="Kunden für datagen (Werkstätten: scale / 100)")
+    parser.add_argument("--budget", type=int, default=600, help="Token-Budget für DB- und Web-Kontext")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--zeigen", action="store_true", help="Kompakten Kontext pro Anfrage ausgeben")
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    result = main(args)
+    for anfrage, r in result["anfragen"].items():
+        print(f"{anfrage[:45]:>45}: {r['vorher']:6d} → {r['nachher']:5d} Tokens   "
+              f"Werkstätten {r['werkstaetten']:>7}   Web {r['web_treffer']}")
+    s = result["summe"]
+    print(f"{'Summe':>45}: {s['vorher']:6d} → {s['nachher']:5d} Tokens ({s['nachher'] / s['vorher']:.0%})"
+          f"{'   (geschätzt, tiktoken fehlt)' if result['tokens_geschaetzt'] else ''}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
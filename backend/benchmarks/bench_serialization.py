@@ -0,0 +1,130 @@
+"""Benchmark: Serialisierung großer Listen, response_model vs. schneller JSON-Pfad
+
+Füllt eine SQLite-Datenbank im Speicher mit N Werkstätten und N Aufträgen
+(Umlaute, Fließkomma- und Datumswerte, NULL in optionalen Feldern) und misst
+für jede Tabelle:
+- response_model: ORM-Objekte laden, wie FastAPI pro Objekt über das Schema
+  validieren (`from_attributes`), im JSON-Modus dumpen, mit JSONResponse kodieren
+- schnell: nur die Schema-Spalten als Tupel laden und mit orjson kodieren
+  (services/pagination.py)
+Beide Ausgaben werden byteweise verglichen, ebenso eine NDJSON-Zeile pro
+Objekt (`model_dump_json`) gegen den Stream-Pfad.
+
+Aufruf (aus backend/):
+    python -m benchmarks.bench_serialization --rows 10000 100000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import models
+import schemas
+from database import Base
+from services.pagination import dumps, rows_to_dicts, schema_columns
+
+ORTE = ["Berlin", "München", "Köln", "Düsseldorf", "Nürnberg", "Frankfurt am Main"]
+
+
+def seed(engine, n: int, seed: int):
+    rnd = random.Random(seed)
+    with Session(engine) as db:
+        db.execute(insert(models.Werkstatt), [
+            {
+                "name": f"Autohaus Müller & Söhne {i} 🚗", "adresse": f"Hauptstraße {i % 200}",
+                "plz": f"{rnd.randint(10000, 99999)}", "ort": rnd.choice(ORTE),
+                "lat": rnd.uniform(47.3, 55.0) if i % 10 else None, "lon": rnd.uniform(5.9, 15.0) if i % 10 else None,
+            }
+            for i in range(n)
+        ])
+        db.execute(insert(models.Auftrag), [
+            {
+                "beschreibung": f"Ölwechsel und Bremsen prüfen \"{i}\"", "status": rnd.choice(["offen", "erledigt"]),
+                "erstellt_am": date(2024, 1, 1) + timedelta(days=i % 365) if i % 7 else None,
+                "fahrzeug_id": i + 1, "werkstatt_id": i % n + 1, "kosten": rnd.randint(0, 99999) / 100,
+            }
+            for i in range(n)
+        ])
+        db.commit()
+
+
+def response_model_pfad(db: Session, model, schema) -> bytes:
+    objs = db.scalars(select(model).order_by(model.id)).all()
+    adapter = TypeAdapter(List[schema])
+    value = adapter.validate_python(objs, from_attributes=True)
+    return JSONResponse(adapter.dump_python(value, mode="json")).body
+
+
+def schneller_pfad(db: Session, model, schema) -> bytes:
+    names, columns = schema_columns(model, schema)
+    rows = db.execute(select(*columns).order_by(model.id)).all()
+    return dumps(rows_to_dicts(names, rows))
+
+
+def messen(fn, wiederholungen: int) -> float:
+    zeiten = []
+    for _ in range(wiederholungen):
+        started = time.perf_counter()
+        fn()
+        zeiten.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(zeiten), 1)
+
+
+def main(args) -> Dict:
+    ergebnis = {}
+    for n in args.rows:
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        seed(engine, n, args.seed)
+
+        for model, schema in ((models.Werkstatt, schemas.Werkstatt), (models.Auftrag, schemas.Auftrag)):
+            with Session(engine) as db:
+                alt = response_model_pfad(db, model, schema)
+                neu = schneller_pfad(db, model, schema)
+                assert alt == neu, f"{schema.__name__}: Ausgabe weicht ab"
+                erstes = db.scalars(select(model).order_by(model.id).limit(50)).all()
+                names, columns = schema_columns(model, schema)
+                for obj, row in zip(erstes, db.execute(select(*columns).order_by(model.id).limit(50)).all()):
+                    ndjson_alt = schema.model_validate(obj, from_attributes=True).model_dump_json().encode()
+                    assert ndjson_alt == dumps(dict(zip(names, row))), f"{schema.__name__}: NDJSON weicht ab"
+
+                def mit_session(fn):
+                    def run():
+                        with Session(engine) as s:
+                            fn(s, model, schema)
+                    return run
+
+                ergebnis[f"{schema.__name__}/{n}"] = {
+                    "bytes": len(neu),
+                    "response_model_ms": messen(mit_session(response_model_pfad), args.wiederholungen),
+                    "schnell_ms": messen(mit_session(schneller_pfad), args.wiederholungen),
+                }
+        engine.dispose()
+    return ergebnis
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--wiederholungen", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    result = main(args)
+    for name, r in result.items():
+        faktor = r["response_model_ms"] / r["schnell_ms"] if r["schnell_ms"] else float("inf")
+        print(f"{name:>18}: response_model {r['response_model_ms']:8.1f} ms   "
+              f"schnell {r['schnell_ms']:8.1f} ms   ({faktor:.1f}x, {r['bytes'] / 1e6:.1f} MB)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,60 @@
+"""Prüft die Regel-Vorstufe der Klassifizierung an Beispielsätzen
+
+Eindeutige Werkstattsuchen müssen ohne LLM als WERKSTATT_SUCHE mit dem
+richtigen Ort erkannt werden; alles, was nur nach Werkstatt klingt (Steuer,
+Versicherung, Jobs, Beschwerden über die eigene Werkstatt, Fragen ohne
+Suchabsicht), muss an Agent 1 weitergehen. Exit-Code 1 bei Abweichungen,
+damit das Skript in CI laufen kann.
+
+Aufruf (aus backend/):
+    python -m benchmarks.check_fast_classifier
+"""
+import sys
+from typing import List, Optional, Tuple
+
+from services.fast_classifier import FastClassifier, fast_classifier
+
+# (Anfrage, erwarteter Ort oder None = muss an das LLM gehen)
+BEISPIELE: List[Tuple[str, Optional[str]]] = [
+    ("Finde mir eine gute Werkstatt in Berlin", "Berlin"),
+    ("Suche Werkstatt für VW Golf in 10115", "10115"),
+    ("Kannst du mir eine Kfz-Werkstatt in München empfehlen?", "München"),
+    ("Ich brauche einen Mechaniker in Köln, mein Auto springt nicht an", "Köln"),
+    ("Suche ein Autohaus in Frankfurt am Main für meinen BMW", "Frankfurt am Main"),
+    ("Wo finde ich günstige Werkstätten in Halle?", "Halle (Saale)"),
+    # Kein Werkstatt-Thema bzw. keine Suche
+    ("Wie hoch ist die Kfz-Steuer in Berlin?", None),
+    ("Was kostet die Kfz-Versicherung in München?", None),
+    ("Ich suche einen Job als Mechaniker in Köln", None),
+    ("Suche eine Stelle als Kfz-Mechaniker in Hamburg", None),
+    ("Meine Werkstatt in Berlin hat meinen Golf kaputt gemacht, was kann ich tun?", None),
+    ("Ich möchte mich über eine Werkstatt in Dresden beschweren, wen kann ich finden?", None),
+    ("Werkstatt in Berlin?", None),
+    ("Finde mir was in Berlin", None),
+    ("Wie oft sollte ich einen Ölwechsel machen lassen?", None),
+    ("Suche eine gute Werkstatt", None),
+]
+
+
+def ort_aus(antwort: Optional[str]) -> Optional[str]:
+    if antwort is None:
+        return None
+    for zeile in antwort.splitlines():
+        if zeile.startswith("- Ort/PLZ:"):
+            return zeile.split(":", 1)[1].strip()
+    return "?"
+
+
+def main(classifier: FastClassifier = fast_classifier) -> int:
+    fehler = 0
+    for anfrage, erwartet in BEISPIELE:
+        ort = ort_aus(classifier.classify(anfrage))
+        ok = ort == erwartet
+        fehler += not ok
+        print(f"{'ok ' if ok else 'FEHLER'} {anfrage!r}: {ort or 'LLM'} (erwartet {erwartet or 'LLM'})")
+    print(f"{len(BEISPIELE) - fehler}/{len(BEISPIELE)} wie erwartet")
+    return 1 if fehler else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
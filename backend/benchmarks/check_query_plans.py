@@ -0,0 +1,153 @@
+"""Prüft die Ausführungspläne der Filter-Endpunkte (kein Full-Table-Scan)
+
+Legt das Schema samt Indizes in einer Testdatenbank an, füllt sie mit
+Beispieldaten und führt dieselben Abfragen aus wie die Endpunkte
+(services/queries.py, services/pagination.py). Jede dabei abgesetzte
+SQL-Anweisung wird mitgeschnitten und per EXPLAIN geprüft:
+- SQLite: `EXPLAIN QUERY PLAN`, ein `SCAN <tabelle>` ohne Index ist ein Fehler
+- Postgres: `EXPLAIN (FORMAT JSON)` mit `enable_seqscan = off`; bleibt trotzdem
+  ein `Seq Scan` übrig, gibt es keinen passenden Index
+Zusätzlich wird die Anzahl der Abfragen pro Endpunkt begrenzt (kein Lazy Loading).
+Exit-Code 1 bei Abweichungen, damit das Skript in CI laufen kann.
+
+Aufruf (aus backend/):
+    python -m benchmarks.check_query_plans
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.check_query_plans
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Callable, List, Tuple
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import Session
+
+import models
+from database import Base, add_missing_indexes
+from services.pagination import keyset_select
+from services.queries import auftrag_filter, kunden_uebersicht
+
+
+def seed(engine, kunden: int, fahrzeuge_pro_kunde: int, auftraege_pro_fahrzeug: int):
+    with Session(engine) as db:
+        db.execute(insert(models.Werkstatt), [
+            {"name": f"Werkstatt {i}", "adresse": "Hauptstr. 1", "plz": "10115", "ort": "Berlin"} for i in range(20)
+        ])
+        db.execute(insert(models.Kunde), [
+            {"name": f"Kunde {i}", "email": f"k{i}@example.com", "telefon": "030"} for i in range(kunden)
+        ])
+        db.execute(insert(models.Fahrzeug), [
+            {"marke": "VW", "modell": "Golf", "baujahr": 2015, "kunde_id": k + 1}
+            for k in range(kunden) for _ in range(fahrzeuge_pro_kunde)
+        ])
+        anzahl_fahrzeuge = kunden * fahrzeuge_pro_kunde
+        db.execute(insert(models.Auftrag), [
+            {
+                "beschreibung": "Inspektion", "status": ("offen", "in Arbeit", "erledigt")[(f + a) % 3],
+                "erstellt_am": date.today() - timedelta(days=a), "fahrzeug_id": f + 1,
+                "werkstatt_id": (f + a) % 20 + 1, "kosten": 100,
+            }
+            for f in range(anzahl_fahrzeuge) for a in range(auftraege_pro_fahrzeug)
+        ])
+        db.commit()
+        db.execute(text("ANALYZE"))
+        db.commit()
+
+
+@contextmanager
+def capture(engine):
+    """Schneidet alle SQL-Anweisungen samt Parametern mit"""
+    statements: List[Tuple[str, object]] = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+
+
+def full_scans(engine, statement: str, parameters) -> List[str]:
+    """Tabellen, die ohne Index gelesen werden"""
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        if engine.dialect.name == "postgresql":
+            cur.execute("SET enable_seqscan = off")
+            cur.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plan = cur.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            scans = []
+
+            def walk(node):
+                if node["Node Type"] == "Seq Scan":
+                    scans.append(node["Relation Name"])
+                for child in node.get("Plans", []):
+                    walk(child)
+
+            walk(plan[0]["Plan"])
+            return scans
+
+        cur.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [
+            detail for *_, detail in cur.fetchall()
+            if detail.startswith("SCAN") and "USING" not in detail
+        ]
+    finally:
+        raw.close()
+
+
+def checks() -> List[Tuple[str, int, Callable[[Session], object]]]:
+    """(Name, max. Anzahl Abfragen, Abfrage wie im Endpunkt)"""
+    def page(model, where, after=None):
+        return lambda db: db.scalars(keyset_select(model, 100, after, where)).all()
+
+    return [
+        ("GET /kunden/{id}/fahrzeuge", 1, page(models.Fahrzeug, [models.Fahrzeug.kunde_id == 7])),
+        ("GET /kunden/{id}/uebersicht", 3, lambda db: db.scalars(kunden_uebersicht(7)).first()),
+        ("GET /fahrzeuge/{id}/auftraege", 1, page(models.Auftrag, auftrag_filter(fahrzeug_id=42))),
+        ("GET /fahrzeuge/{id}/auftraege?status", 1,
+         page(models.Auftrag, auftrag_filter(fahrzeug_id=42, status="offen"))),
+        ("GET /werkstatt/{id}/auftraege", 1, page(models.Auftrag, auftrag_filter(werkstatt_id=3))),
+        ("GET /werkstatt/{id}/auftraege?status", 1,
+         page(models.Auftrag, auftrag_filter(werkstatt_id=3, status="Erledigt"))),
+        ("GET /auftraege/status/{status}", 1, page(models.Auftrag, auftrag_filter(status="OFFEN"), after=500)),
+    ]
+
+
+def main(args) -> int:
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    add_missing_indexes(engine)
+    seed(engine, args.kunden, 3, 5)
+
+    fehler = 0
+    with Session(engine) as db:
+        for name, max_queries, run in checks():
+            with capture(engine) as statements:
+                run(db)
+            db.expunge_all()
+            scans = [t for stmt, params in statements for t in full_scans(engine, stmt, params)]
+            ok = not scans and len(statements) <= max_queries
+            fehler += not ok
+            detail = f"{len(statements)} Abfrage(n)" + (f", Full Scan: {', '.join(scans)}" if scans else "")
+            print(f"{'OK ' if ok else 'FEHLER'} {name:<42} {detail}")
+
+    engine.dispose()
+    return 1 if fehler else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="ACHTUNG: die Tabellen werden neu angelegt")
+    parser.add_argument("--kunden", type=int, default=2000)
+    sys.exit(main(parser.parse_args()))
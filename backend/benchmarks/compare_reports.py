@@ -0,0 +1,100 @@
+"""Vergleicht zwei Berichte von run_scenarios.py (z.B. main gegen Pull-Request)
+
+Pro Szenario, das in beiden Berichten vorkommt:
+- Latenz: p50/p95/p99 dürfen um höchstens --toleranz (relativ) steigen
+- Durchsatz: darf um höchstens --toleranz sinken
+- Fehler: dürfen nicht zunehmen
+- Server-RSS-Spitze: darf um höchstens --rss-toleranz steigen
+Unterschiede unter --min-ms gelten als Rauschen. Weicht die Konfiguration
+(Scale, Seed, Latenzen, ...) ab, wird gewarnt; der Vergleich läuft trotzdem.
+Exit-Code 1 bei mindestens einer Verschlechterung, sonst 0.
+
+Aufruf (aus backend/):
+    python -m benchmarks.compare_reports basis.json neu.json --toleranz 0.15
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+LATENZEN = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def _relativ(alt: float, neu: float) -> float:
+    return (neu - alt) / alt if alt else 0.0
+
+
+def vergleichen(basis: Dict, neu: Dict, toleranz: float, rss_toleranz: float, min_ms: float) -> List[Dict]:
+    """Eine Zeile pro Szenario und Kennzahl; `schlechter` markiert Verschlechterungen"""
+    zeilen = []
+    for name, b in basis["szenarien"].items():
+        n = neu["szenarien"].get(name)
+        if n is None:
+            continue
+
+        def zeile(kennzahl: str, alt: Optional[float], wert: Optional[float], schlechter: bool):
+            zeilen.append({
+                "szenario": name, "kennzahl": kennzahl, "basis": alt, "neu": wert,
+                "aenderung": round(_relativ(alt, wert), 4) if alt is not None and wert is not None else None,
+                "schlechter": schlechter,
+            })
+
+        for kennzahl in LATENZEN:
+            alt, wert = b.get(kennzahl), n.get(kennzahl)
+            if alt is None or wert is None:
+                continue
+            zeile(kennzahl, alt, wert, wert - alt > min_ms and _relativ(alt, wert) > toleranz)
+        zeile("durchsatz_rps", b["durchsatz_rps"], n["durchsatz_rps"],
+              _relativ(b["durchsatz_rps"], n["durchsatz_rps"]) < -toleranz)
+        zeile("fehler", b["fehler"], n["fehler"], n["fehler"] > b["fehler"])
+        alt, wert = b.get("server_rss_spitze_mb"), n.get("server_rss_spitze_mb")
+        if alt and wert:
+            zeile("server_rss_spitze_mb", alt, wert, _relativ(alt, wert) > rss_toleranz)
+    return zeilen
+
+
+def main(args) -> Dict:
+    with open(args.basis) as f:
+        basis = json.load(f)
+    with open(args.neu) as f:
+        neu = json.load(f)
+
+    abweichend = sorted(
+        k for k in set(basis["konfiguration"]) | set(neu["konfiguration"])
+        if basis["konfiguration"].get(k) != neu["konfiguration"].get(k)
+    )
+    zeilen = vergleichen(basis, neu, args.toleranz, args.rss_toleranz, args.min_ms)
+    return {
+        "basis": basis["meta"].get("commit"),
+        "neu": neu["meta"].get("commit"),
+        "konfiguration_abweichend": abweichend,
+        "fehlende_szenarien": sorted(set(basis["szenarien"]) - set(neu["szenarien"])),
+        "vergleich": zeilen,
+        "verschlechterungen": sum(z["schlechter"] for z in zeilen),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("basis")
+    parser.add_argument("neu")
+    parser.add_argument("--toleranz", type=float, default=0.15, help="Erlaubte relative Verschlechterung")
+    parser.add_argument("--rss-toleranz", type=float, default=0.20)
+    parser.add_argument("--min-ms", type=float, default=2.0, help="Kleinere Latenz-Unterschiede ignorieren")
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    result = main(args)
+    if result["konfiguration_abweichend"]:
+        print(f"⚠️ Konfiguration weicht ab: {', '.join(result['konfiguration_abweichend'])}")
+    for name in result["fehlende_szenarien"]:
+        print(f"⚠️ Szenario fehlt im neuen Bericht: {name}")
+    for z in result["vergleich"]:
+        aenderung = f"{z['aenderung'] * 100:+7.1f} %" if z["aenderung"] is not None else "        "
+        markierung = "  ❌" if z["schlechter"] else ""
+        print(f"{z['szenario']:>20} {z['kennzahl']:>21}: {z['basis']:>10} → {z['neu']:>10}  {aenderung}{markierung}")
+    print(f"{result['verschlechterungen']} Verschlechterung(en)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    sys.exit(1 if result["verschlechterungen"] else 0)
@@ -0,0 +1,234 @@
+"""Synthetische Testdaten für Last- und Benchmark-Läufe (reproduzierbar über --seed)
+
+Erzeugt Kunden, Fahrzeuge, Werkstätten, Aufträge und KI-Aktionen in der
+Datenbank aus DATABASE_URL (Schema vorher mit `python migrate.py` anlegen).
+Die Mengen ergeben sich aus --scale (Anzahl Kunden):
+- Fahrzeuge: 1–2 pro Kunde (im Mittel 1,5)
+- Werkstätten: scale / 100, mindestens 20, in echten Orten (data/orte.csv,
+  gewichtet nach Einwohnern) mit Koordinaten
+- Aufträge: 0–6 pro Fahrzeug (im Mittel 3), verteilt über die letzten 365 Tage
+- KI-Aktionen: für etwa jeden fünften Auftrag
+Die Zeilen werden als Generator erzeugt und in Blöcken per executemany
+eingefügt, der Speicherbedarf bleibt auch bei Millionen Zeilen konstant. Die
+IDs werden selbst vergeben (Fremdschlüssel ohne Rückfrage an die Datenbank)
+und schließen an vorhandene Daten an; unter Postgres werden die Sequenzen
+danach nachgezogen. Gleicher Seed und gleiche Startdaten ergeben dieselben Zeilen.
+
+Aufruf (aus backend/):
+    python -m benchmarks.datagen --scale 100000 --seed 1
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import func, insert, select, text
+
+import models
+from database import engine as default_engine
+from services.fast_classifier import DATA_DIR
+
+VORNAMEN = [
+    "Anna", "Ben", "Clara", "David", "Emma", "Felix", "Greta", "Hannah", "Jonas", "Julia",
+    "Lea", "Lukas", "Marie", "Max", "Mia", "Noah", "Paul", "Sophie", "Tim", "Zoe", "Jürgen", "Özlem",
+]
+NACHNAMEN = [
+    "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz",
+    "Hoffmann", "Koch", "Richter", "Klein", "Wolf", "Schröder", "Neumann", "Yılmaz", "Nowak",
+]
+FAHRZEUGE = {
+    "Volkswagen": ["Golf VII", "Golf VIII", "Passat", "Polo", "Tiguan", "ID.3"],
+    "BMW": ["3er", "5er", "X1", "X3", "i3"],
+    "Mercedes-Benz": ["A-Klasse", "C-Klasse", "E-Klasse", "GLC"],
+    "Audi": ["A3", "A4", "A6", "Q5"],
+    "Opel": ["Corsa", "Astra", "Insignia"],
+    "Ford": ["Fiesta", "Focus", "Kuga"],
+    "Skoda": ["Octavia", "Fabia", "Superb"],
+    "Toyota": ["Yaris", "Corolla", "RAV4"],
+    "Tesla": ["Model 3", "Model Y"],
+}
+WERKSTATT_NAMEN = ["Autohaus", "Kfz-Meisterbetrieb", "Autowerkstatt", "Auto-Service", "Karosserie & Lack"]
+STRASSEN = ["Hauptstraße", "Bahnhofstraße", "Industriestraße", "Gartenweg", "Schulstraße", "Am Markt"]
+ARBEITEN = [
+    "Ölwechsel", "Inspektion", "Bremsen vorne erneuern", "Reifenwechsel", "HU/AU", "Klimaservice",
+    "Zahnriemen wechseln", "Batterie tauschen", "Unfallschaden hinten", "Auspuff undicht",
+]
+# Gewichte wie im Betrieb: die meisten Aufträge sind abgeschlossen
+STATUS = [("offen", 15), ("in_arbeit", 10), ("abgeschlossen", 65), ("storniert", 10)]
+BLOCK = 10_000
+
+
+def lade_orte() -> List[Tuple[str, float, float, int]]:
+    with open(os.path.join(DATA_DIR, "orte.csv"), encoding="utf-8") as f:
+        return [(r["ort"], float(r["lat"]), float(r["lon"]), int(r["einwohner"])) for r in csv.DictReader(f)]
+
+
+def mengen(scale: int) -> Dict[str, int]:
+    """Ungefähre Zeilenzahlen für --scale (Fahrzeuge/Aufträge sind zufällig verteilt)"""
+    return {
+        "kunde": scale,
+        "fahrzeug": scale * 3 // 2,
+        "werkstatt": max(20, scale // 100),
+        "auftrag": scale * 9 // 2,
+        "ki_aktionen": scale * 9 // 10,
+    }
+
+
+def _start_id(conn, table) -> int:
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def _einfuegen(conn, table, rows: Iterable[dict], block: int) -> int:
+    anzahl = 0
+    rows = iter(rows)
+    while True:
+        teil = list(islice(rows, block))
+        if not teil:
+            return anzahl
+        conn.execute(insert(table), teil)
+        anzahl += len(teil)
+
+
+def _sequenzen_nachziehen(conn, tabellen):
+    """Postgres: SERIAL-Sequenzen hinter die selbst vergebenen IDs setzen"""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tabellen:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+
+
+def generate(bind=default_engine, scale: int = 10_000, seed: int = 1, block: int = BLOCK,
+             heute: date = date(2025, 6, 30)) -> Dict[str, int]:
+    """Schreibt die Testdaten und liefert die Anzahl eingefügter Zeilen pro Tabelle"""
+    rnd = random.Random(seed)
+    orte = lade_orte()
+    ort_gewichte = [o[3] for o in orte]
+    status_werte, status_gewichte = zip(*STATUS)
+    marken = list(FAHRZEUGE)
+    ergebnis = {}
+
+    with bind.begin() as conn:
+        kunde = models.Kunde.__table__
+        fahrzeug = models.Fahrzeug.__table__
+        werkstatt = models.Werkstatt.__table__
+        auftrag = models.Auftrag.__table__
+        ki = models.KIAktion.__table__
+        k0, f0, w0, a0, ki0 = (_start_id(conn, t) for t in (kunde, fahrzeug, werkstatt, auftrag, ki))
+        anzahl_werkstaetten = mengen(scale)["werkstatt"]
+
+        def werkstaetten() -> Iterator[dict]:
+            for i, (ort, lat, lon, _) in enumerate(rnd.choices(orte, ort_gewichte, k=anzahl_werkstaetten)):
+                yield {
+                    "id": w0 + i,
+                    "name": f"{rnd.choice(WERKSTATT_NAMEN)} {rnd.choice(NACHNAMEN)} {ort}",
+                    "adresse": f"{rnd.choice(STRASSEN)} {rnd.randint(1, 180)}",
+                    "plz": f"{rnd.randint(1067, 99998):05d}",
+                    "ort": ort,
+                    "lat": round(lat + rnd.uniform(-0.05, 0.05), 5),
+                    "lon": round(lon + rnd.uniform(-0.05, 0.05), 5),
+                    # Gestreut um den Ort, nicht aus der PLZ: beim Start nicht neu berechnen
+                    "geo_quelle": "manuell",
+                }
+
+        def kunden() -> Iterator[dict]:
+            for i in range(scale):
+                vorname, nachname = rnd.choice(VORNAMEN), rnd.choice(NACHNAMEN)
+                yield {
+                    "id": k0 + i,
+                    "name": f"{vorname} {nachname}",
+                    "email": f"{vorname.lower()}.{nachname.lower()}{k0 + i}@example.com",
+                    "telefon": f"0{rnd.randint(30, 9999)} {rnd.randint(100000, 9999999)}",
+                }
+
+        # Fahrzeuge und Aufträge hängen voneinander ab: ein gemeinsamer Durchlauf
+        # pro Kunde, die Zeilen landen in getrennten Puffern
+        zaehler = {"fahrzeug": 0, "auftrag": 0, "ki_aktionen": 0}
+
+        def fahrzeuge_und_auftraege() -> Iterator[Tuple[str, dict]]:
+            for k in range(scale):
+                for _ in range(rnd.randint(1, 2)):
+                    fid = f0 + zaehler["fahrzeug"]
+                    zaehler["fahrzeug"] += 1
+                    marke = rnd.choice(marken)
+                    yield "fahrzeug", {
+                        "id": fid, "marke": marke, "modell": rnd.choice(FAHRZEUGE[marke]),
+                        "baujahr": rnd.randint(2005, 2025), "kunde_id": k0 + k,
+                    }
+                    for _ in range(rnd.randint(0, 6)):
+                        aid = a0 + zaehler["auftrag"]
+                        zaehler["auftrag"] += 1
+                        beschreibung = rnd.choice(ARBEITEN)
+                        yield "auftrag", {
+                            "id": aid, "beschreibung": beschreibung,
+                            "status": rnd.choices(status_werte, status_gewichte)[0],
+                            "erstellt_am": heute - timedelta(days=rnd.randint(0, 364)),
+                            "fahrzeug_id": fid, "werkstatt_id": w0 + rnd.randrange(anzahl_werkstaetten),
+                            "kosten": round(rnd.uniform(49, 2500), 2),
+                        }
+                        if rnd.random() < 0.2:
+                            zaehler["ki_aktionen"] += 1
+                            yield "ki_aktionen", {
+                                "id": ki0 + zaehler["ki_aktionen"] - 1,
+                                "nachricht": f"Bitte Termin für {beschreibung}",
+                                "antwort": f"Ihr Auftrag wurde erstellt (ID {aid}).",
+                                "erstellt_am": heute - timedelta(days=rnd.randint(0, 364)),
+                                "auftrag_id": aid,
+                            }
+
+        ergebnis["werkstatt"] = _einfuegen(conn, werkstatt, werkstaetten(), block)
+        ergebnis["kunde"] = _einfuegen(conn, kunde, kunden(), block)
+
+        tabellen = {"fahrzeug": fahrzeug, "auftrag": auftrag, "ki_aktionen": ki}
+        puffer: Dict[str, List[dict]] = {name: [] for name in tabellen}
+        for name, row in fahrzeuge_und_auftraege():
+            puffer[name].append(row)
+            if len(puffer[name]) >= block:
+                # Fahrzeuge vor Aufträgen, Aufträge vor KI-Aktionen (Fremdschlüssel)
+                for vorher in tabellen:
+                    if puffer[vorher]:
+                        conn.execute(insert(tabellen[vorher]), puffer[vorher])
+                        puffer[vorher] = []
+                    if vorher == name:
+                        break
+        for name, table in tabellen.items():
+            if puffer[name]:
+                conn.execute(insert(table), puffer[name])
+        ergebnis.update(zaehler)
+
+        _sequenzen_nachziehen(conn, (kunde, fahrzeug, werkstatt, auftrag, ki))
+    return ergebnis
+
+
+def main(args) -> Dict:
+    started = time.perf_counter()
+    zeilen = generate(scale=args.scale, seed=args.seed, block=args.block)
+    dauer = time.perf_counter() - started
+    return {
+        "scale": args.scale, "seed": args.seed, "zeilen": zeilen,
+        "sekunden": round(dauer, 2), "zeilen_pro_s": round(sum(zeilen.values()) / dauer) if dauer else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10_000, help="Anzahl Kunden, alle anderen Mengen skalieren mit")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--block", type=int, default=BLOCK, help="Zeilen pro INSERT-Block")
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    result = main(args)
+    for name, anzahl in result["zeilen"].items():
+        print(f"{name:>12}: {anzahl:10d} Zeilen")
+    print(f"{'gesamt':>12}: {result['sekunden']:10.1f} s   ({result['zeilen_pro_s']} Zeilen/s)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,192 @@
+"""Offline-Ersatz für OpenAI (LangChain-Chains) und Tavily mit einstellbarer Latenz
+
+Für Last- und Benchmark-Läufe ohne Netz, API-Keys und Kosten. `install()`
+ersetzt in services/werkstatt_web_agent.py die Fabriken `get_agent_chains`
+und `get_tavily_client`; alles dahinter (Regel-Vorstufe, Index, Web-Cache,
+Agent-Cache, Jobs, SSE) läuft unverändert. Die Ersatz-Chains bieten genau
+das, was der Agent benutzt: Aufruf (synchron), `acall`, `llm.astream` und
+`prompt.format`.
+- Agent 1 klassifiziert wie die Regel-Vorstufe, erkennt aber jede Anfrage
+  mit Werkstatt-/Suchwort als Werkstattsuche (Ort darf fehlen)
+- Agent 2 antwortet mit einem festen Text aus `antwort_tokens` Wörtern
+- Latenz: `llm_latency_ms` bis zum ersten Token, danach `token_ms` pro Wort;
+  die Suche wartet `search_latency_ms` und liefert drei Treffer mit je etwa
+  700 Zeichen (Größe wie bei Tavily)
+
+Die App mit Ersatz starten (Einstellungen über OFFLINE_* Umgebungsvariablen):
+    uvicorn benchmarks.offline_agent:create_app --factory
+
+Den sequentiellen Agenten offline ausführen (aus backend/):
+    python -m benchmarks.offline_agent "Finde eine Werkstatt in Berlin" "Wie oft Ölwechsel?"
+"""
+import argparse
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict
+
+from services import werkstatt_web_agent
+from services.fast_classifier import fast_classifier
+
+SUCH_WOERTER = ("werkstatt", "werkstätte", "autohaus", "kfz", "finde", "suche")
+
+
+@dataclass
+class _Chunk:
+    content: str
+
+
+class OfflinePrompt:
+    def __init__(self, template: str):
+        self.template = template
+
+    def format(self, **kwargs) -> str:
+        return self.template.format(**kwargs)
+
+
+class OfflineChatModel:
+    """Streamt einen festen Text Wort für Wort (wie ChatOpenAI.astream)"""
+
+    def __init__(self, text: str, latency_ms: float, token_ms: float):
+        self.text = text
+        self.latency_s = latency_ms / 1000
+        self.token_s = token_ms / 1000
+
+    def dauer_s(self, text: str) -> float:
+        return self.latency_s + self.token_s * len(text.split())
+
+    async def astream(self, prompt: str) -> AsyncIterator[_Chunk]:
+        await asyncio.sleep(self.latency_s)
+        for i, wort in enumerate(self.text.split(" ")):
+            if i:
+                await asyncio.sleep(self.token_s)
+            yield _Chunk(wort if i == 0 else " " + wort)
+
+
+class OfflineChain:
+    """Ersatz für LLMChain: `antwort(inputs)` liefert den Text, das Modell die Latenz"""
+
+    def __init__(self, llm: OfflineChatModel, prompt: OfflinePrompt, output_key: str,
+                 antwort: Callable[[dict], str]):
+        self.llm = llm
+        self.prompt = prompt
+        self.output_key = output_key
+        self._antwort = antwort
+        self.aufrufe = 0
+
+    def __call__(self, inputs: dict) -> dict:
+        self.aufrufe += 1
+        text = self._antwort(inputs)
+        time.sleep(self.llm.dauer_s(text))
+        return {**inputs, self.output_key: text}
+
+    async def acall(self, inputs: dict) -> dict:
+        self.aufrufe += 1
+        text = self._antwort(inputs)
+        await asyncio.sleep(self.llm.dauer_s(text))
+        return {**inputs, self.output_key: text}
+
+    def run(self, **inputs) -> str:
+        return self(inputs)[self.output_key]
+
+
+WEB_SAETZE = [
+    "Unsere Kfz-Meisterwerkstatt bietet Inspektion nach Herstellervorgaben, HU/AU und Reifenservice.",
+    "Kunden loben die schnelle Terminvergabe und die transparente Kostenaufstellung vor Arbeitsbeginn.",
+    "Öffnungszeiten Montag bis Freitag 7:30 bis 18:00 Uhr, Samstag nach Vereinbarung.",
+    "Wir reparieren alle Marken, Schwerpunkt Volkswagen, Audi, Skoda und Seat, auch Elektrofahrzeuge.",
+    "Ein Ersatzwagen steht nach Absprache kostenlos zur Verfügung, Hol- und Bringservice im Stadtgebiet.",
+    "Bewertung 4,6 von 5 Sternen bei über 300 Rezensionen, besonders für Bremsen und Klimaservice.",
+]
+
+
+class OfflineSearch:
+    """Ersatz für TavilySearchResults.run: Liste von Treffern (url, content) wie Tavily"""
+
+    def __init__(self, latency_ms: float, treffer: int = 3, zeichen: int = 700):
+        self.latency_s = latency_ms / 1000
+        self.treffer = treffer
+        self.zeichen = zeichen
+        self.aufrufe = 0
+
+    def run(self, query: str) -> list:
+        self.aufrufe += 1
+        time.sleep(self.latency_s)
+        ergebnis = []
+        for i in range(self.treffer):
+            text = f"{query} – Treffer {i + 1}."
+            j = i
+            while len(text) < self.zeichen:
+                text += " " + WEB_SAETZE[j % len(WEB_SAETZE)]
+                j += 1
+            ergebnis.append({"url": f"https://werkstatt-{i + 1}.example.com/", "content": text[:self.zeichen]})
+        return ergebnis
+
+
+def klassifizieren(inputs: dict) -> str:
+    anfrage = inputs["user_input"]
+    if not any(w in anfrage.lower() for w in SUCH_WOERTER):
+        return "KATEGORIE: ANDERE\n\nWEITERLEITEN: NEIN\n\nBEGRÜNDUNG: Allgemeine Frage (offline)"
+    ort = fast_classifier.find_location(anfrage) or "keine"
+    return (
+        "KATEGORIE: WERKSTATT_SUCHE\n\nWEITERLEITEN: JA\n\n"
+        f"EXTRAHIERTE PARAMETER:\n- Ort/PLZ: {ort}\n\nBEGRÜNDUNG: Werkstattsuche (offline)"
+    )
+
+
+def antwort_text(tokens: int) -> str:
+    return " ".join(f"wort{i}" for i in range(tokens))
+
+
+def install(llm_latency_ms: float = 800, token_ms: float = 20, search_latency_ms: float = 500,
+            antwort_tokens: int = 120) -> Dict[str, object]:
+    """Ersetzt LLM und Suche im Agenten; liefert die Ersatz-Objekte (für Aufrufzähler)"""
+    text = antwort_text(antwort_tokens)
+    agent1 = OfflineChain(
+        OfflineChatModel("", llm_latency_ms, token_ms),
+        OfflinePrompt(werkstatt_web_agent.CLASSIFICATION_TEMPLATE), "classification", klassifizieren,
+    )
+    agent2 = OfflineChain(
+        OfflineChatModel(text, llm_latency_ms, token_ms),
+        OfflinePrompt(werkstatt_web_agent.WERKSTATT_SEARCH_TEMPLATE), "final_answer", lambda inputs: text,
+    )
+    search = OfflineSearch(search_latency_ms)
+
+    # Der Agent prüft die Keys, bevor er die Fabriken aufruft
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+    os.environ.setdefault("TAVILY_API_KEY", "offline")
+    werkstatt_web_agent.get_agent_chains = lambda: (agent1, agent2)
+    werkstatt_web_agent.get_tavily_client = lambda api_key: search
+    return {"agent1": agent1, "agent2": agent2, "search": search}
+
+
+def install_from_env() -> Dict[str, object]:
+    return install(
+        llm_latency_ms=float(os.getenv("OFFLINE_LLM_LATENCY_MS", "800")),
+        token_ms=float(os.getenv("OFFLINE_LLM_TOKEN_MS", "20")),
+        search_latency_ms=float(os.getenv("OFFLINE_SEARCH_LATENCY_MS", "500")),
+        antwort_tokens=int(os.getenv("OFFLINE_ANTWORT_TOKENS", "120")),
+    )
+
+
+def create_app():
+    """App-Fabrik für uvicorn --factory: Ersatz installieren, dann main importieren"""
+    install_from_env()
+    from main import app
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("anfragen", nargs="+")
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--search-latency-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    install(args.llm_latency_ms, args.token_ms, args.search_latency_ms)
+    for anfrage in args.anfragen:
+        started = time.perf_counter()
+        antwort = werkstatt_web_agent.run_werkstatt_agent_sequential(anfrage)
+        print(f"{anfrage!r}: {(time.perf_counter() - started) * 1000:.0f} ms, {len(antwort.split())} Wörter")
@@ -0,0 +1,368 @@
+"""Lastszenarien gegen die laufende App mit synthetischen Daten und Offline-Agent
+
+Ablauf:
+1. Schema anlegen (`python migrate.py`) und Testdaten erzeugen
+   (benchmarks/datagen.py, --scale/--seed; --scale 0 nutzt vorhandene Daten)
+2. App mit uvicorn starten, LLM und Tavily durch den Offline-Ersatz aus
+   benchmarks/offline_agent.py ersetzt (Latenz über --llm-latency-ms usw.)
+3. Warten, bis Werkstatt-Index und Statistik geladen sind
+4. Jedes Szenario mit --concurrency parallelen Clients (geschlossene
+   Schleife) ausführen, nach einigen Aufwärm-Anfragen
+Szenarien: Listen und Filter (Keyset-Seiten ab zufälligem Cursor),
+Kundenübersicht, Umkreis- und Volltextsuche, Bulk-Anlage, KI-Auftrag,
+Werkstatt-Agent (Antwort am Stück und als SSE-Stream).
+
+Der Bericht (JSON, --json) enthält pro Szenario p50/p95/p99, Durchsatz,
+Fehler und die Spitze des Server-RSS, dazu Commit, Konfiguration und
+Datenmengen. Zwei Berichte vergleicht benchmarks/compare_reports.py.
+RSS und das Zurücksetzen der Spitze pro Szenario lesen /proc (nur Linux).
+
+Aufruf (aus backend/):
+    python -m benchmarks.run_scenarios --scale 100000 --json bericht.json
+    python -m benchmarks.run_scenarios --szenarien liste_kunden agent_stream --anfragen 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.datagen import ARBEITEN, FAHRZEUGE, lade_orte
+
+BERICHT_FORMAT = 1
+
+# (Methode, Pfad, httpx-Argumente)
+Anfrage = Tuple[str, str, dict]
+
+
+@dataclass
+class Szenario:
+    name: str
+    anfrage: Callable[[random.Random, Dict], Anfrage]
+    agent: bool = False    # langsam: eigene Anzahl Anfragen (--agent-anfragen)
+    stream: bool = False   # SSE: Zeit bis zum ersten Token zusätzlich messen
+
+
+def _cursor(rnd: random.Random, n: int) -> dict:
+    return {"after": rnd.randrange(n)} if n > 1 else {}
+
+
+def _agent_frage(rnd: random.Random, ctx: Dict) -> str:
+    ort = rnd.choice(ctx["orte"])
+    return rnd.choice([
+        f"Finde mir eine gute Werkstatt in {ort}",
+        f"Suche Werkstatt für {rnd.choice(list(FAHRZEUGE))} in {ort}",
+        f"Welche Werkstatt in der Nähe von {ort} macht {rnd.choice(ARBEITEN)}?",
+        f"Wie oft sollte ich {rnd.choice(ARBEITEN)} machen lassen? ({rnd.randrange(1000)})",
+    ])
+
+
+SZENARIEN = [
+    Szenario("liste_kunden", lambda rnd, ctx: (
+        "GET", "/kunden", {"params": {"limit": 100, **_cursor(rnd, ctx["kunde"])}})),
+    Szenario("liste_auftraege", lambda rnd, ctx: (
+        "GET", "/auftraege", {"params": {"limit": 100, **_cursor(rnd, ctx["auftrag"])}})),
+    Szenario("auftraege_status", lambda rnd, ctx: (
+        "GET", f"/auftraege/status/{rnd.choice(['offen', 'in_arbeit'])}",
+        {"params": {"limit": 100, **_cursor(rnd, ctx["auftrag"])}})),
+    Szenario("werkstatt_auftraege", lambda rnd, ctx: (
+        "GET", f"/werkstatt/{rnd.randint(1, ctx['werkstatt'])}/auftraege", {"params": {"limit": 50}})),
+    Szenario("kunden_uebersicht", lambda rnd, ctx: (
+        "GET", f"/kunden/{rnd.randint(1, ctx['kunde'])}/uebersicht", {})),
+    Szenario("werkstatt_nearby", lambda rnd, ctx: (
+        "GET", "/werkstatt/nearby", {"params": {"ort": rnd.choice(ctx["orte"]), "radius_km": 50}})),
+    Szenario("volltextsuche", lambda rnd, ctx: (
+        "GET", "/suche", {"params": {"q": rnd.choice(ARBEITEN).split()[0], "limit": 20}})),
+    Szenario("stats", lambda rnd, ctx: ("GET", "/stats", {})),
+    Szenario("bulk_kunden", lambda rnd, ctx: ("POST", "/kunden/bulk", {"json": [
+        {"name": f"Bulk {rnd.randrange(10**9)}", "email": "bulk@example.com", "telefon": "030 1234567"}
+        for _ in range(ctx["bulk_groesse"])
+    ]})),
+    Szenario("bulk_auftraege", lambda rnd, ctx: ("POST", "/auftraege/bulk", {"json": [
+        {
+            "beschreibung": rnd.choice(ARBEITEN), "status": "offen", "erstellt_am": "2025-06-30",
+            "fahrzeug_id": rnd.randint(1, ctx["fahrzeug"]), "werkstatt_id": rnd.randint(1, ctx["werkstatt"]),
+            "kosten": round(rnd.uniform(49, 2500), 2),
+        }
+        for _ in range(ctx["bulk_groesse"])
+    ]})),
+    Szenario("ki_auftrag", lambda rnd, ctx: ("POST", "/ki/auftrag", {"json": {
+        "nachricht": f"Bitte Termin für {rnd.choice(ARBEITEN)}", "fahrzeug_id": rnd.randint(1, ctx["fahrzeug"]),
+    }})),
+    Szenario("ki_auftrag_batch", lambda rnd, ctx: ("POST", "/ki/auftrag/batch", {"json": [
+        {"nachricht": f"Bitte Termin für {rnd.choice(ARBEITEN)}", "fahrzeug_id": rnd.randint(1, ctx["fahrzeug"])}
+        for _ in range(ctx["bulk_groesse"])
+    ]})),
+    # Nach den schreibenden Szenarien: Deltas aus dem Änderungsprotokoll statt ganzer Listen
+    Szenario("aenderungen", lambda rnd, ctx: ("GET", "/changes", {"params": {"since": 0, "limit": 100}})),
+    Szenario("agent_search", lambda rnd, ctx: (
+        "POST", "/werkstatt-agent/search", {"json": {"query": _agent_frage(rnd, ctx)}}), agent=True),
+    Szenario("agent_stream", lambda rnd, ctx: (
+        "POST", "/werkstatt-agent/search", {"params": {"stream": "true"}, "json": {"query": _agent_frage(rnd, ctx)}}),
+        agent=True, stream=True),
+]
+
+
+# ---------------- Messung ----------------
+def perzentile(werte: List[float]) -> Dict[str, float]:
+    if not werte:
+        return {}
+    if len(werte) == 1:
+        return {"p50_ms": round(werte[0], 2), "p95_ms": round(werte[0], 2), "p99_ms": round(werte[0], 2)}
+    q = statistics.quantiles(werte, n=100, method="inclusive")
+    return {"p50_ms": round(q[49], 2), "p95_ms": round(q[94], 2), "p99_ms": round(q[98], 2)}
+
+
+def proc_status_kb(pid: int, feld: str) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for zeile in f:
+                if zeile.startswith(feld + ":"):
+                    return int(zeile.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def rss_spitze_zuruecksetzen(pid: int):
+    """VmHWM auf den aktuellen RSS setzen (Linux ab 4.0), sonst gilt die Spitze seit Start"""
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+async def _einzeln(client: httpx.AsyncClient, anfrage: Anfrage, stream: bool) -> Tuple[bool, float, Optional[float]]:
+    methode, pfad, kwargs = anfrage
+    started = time.perf_counter()
+    erstes_token = None
+    try:
+        if stream:
+            async with client.stream(methode, pfad, **kwargs) as r:
+                ok = r.status_code < 400
+                async for zeile in r.aiter_lines():
+                    if erstes_token is None and zeile.startswith("event: token"):
+                        erstes_token = (time.perf_counter() - started) * 1000
+                    if zeile.startswith("event: error"):
+                        ok = False
+        else:
+            r = await client.request(methode, pfad, **kwargs)
+            ok = r.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    return ok, (time.perf_counter() - started) * 1000, erstes_token
+
+
+async def ausfuehren(client: httpx.AsyncClient, szenario: Szenario, ctx: Dict, anzahl: int,
+                     concurrency: int, rnd: random.Random) -> Dict:
+    # Anfragen vorab erzeugen: gleiche Folge bei gleichem Seed, Erzeugung nicht in der Messung
+    anfragen = [szenario.anfrage(rnd, ctx) for _ in range(anzahl)]
+    latenzen: List[float] = []
+    erste_tokens: List[float] = []
+    fehler = 0
+
+    async def worker():
+        nonlocal fehler
+        while anfragen:
+            ok, ms, erstes_token = await _einzeln(client, anfragen.pop(), szenario.stream)
+            if ok:
+                latenzen.append(ms)
+                if erstes_token is not None:
+                    erste_tokens.append(erstes_token)
+            else:
+                fehler += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    dauer = time.perf_counter() - started
+
+    ergebnis = {
+        "anfragen": anzahl,
+        "fehler": fehler,
+        **perzentile(latenzen),
+        "mittel_ms": round(statistics.mean(latenzen), 2) if latenzen else None,
+        "max_ms": round(max(latenzen), 2) if latenzen else None,
+        "durchsatz_rps": round(len(latenzen) / dauer, 2),
+    }
+    if szenario.stream:
+        ergebnis["erstes_token"] = perzentile(erste_tokens)
+    return ergebnis
+
+
+# ---------------- Ablauf ----------------
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def warten_bis_bereit(client: httpx.Client, server: subprocess.Popen, timeout_s: float = 600):
+    """Bis `/stats` und die Umkreissuche nicht mehr 503 liefern (Indizes im Hintergrund geladen)"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout_s:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server beendet mit Code {server.returncode}")
+        try:
+            if (client.get("/stats").status_code == 200
+                    and client.get("/werkstatt/nearby", params={"ort": "Berlin"}).status_code != 503):
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("App nicht innerhalb des Timeouts bereit")
+
+
+def zeilen_zaehlen(env: Dict[str, str]) -> Dict[str, int]:
+    snippet = (
+        "import json, models; from sqlalchemy import func, select; from database import engine\n"
+        "with engine.connect() as c:\n"
+        "    print(json.dumps({t.__tablename__: c.execute(select(func.count()).select_from(t)).scalar()"
+        " for t in (models.Kunde, models.Fahrzeug, models.Werkstatt, models.Auftrag, models.KIAktion)}))"
+    )
+    out = subprocess.run([sys.executable, "-c", snippet], env=env, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+async def szenarien_ausfuehren(args, server_pid: int, ctx: Dict) -> Dict:
+    rnd = random.Random(args.seed)
+    ergebnis = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=120, limits=limits) as client:
+        for szenario in SZENARIEN:
+            if args.szenarien and szenario.name not in args.szenarien:
+                continue
+            anzahl = args.agent_anfragen if szenario.agent else args.anfragen
+            await ausfuehren(client, szenario, ctx, min(args.aufwaermen, anzahl), args.concurrency, rnd)
+            rss_spitze_zuruecksetzen(server_pid)
+            r = await ausfuehren(client, szenario, ctx, anzahl, args.concurrency, rnd)
+            hwm = proc_status_kb(server_pid, "VmHWM")
+            r["server_rss_spitze_mb"] = round(hwm / 1024, 1) if hwm else None
+            ergebnis[szenario.name] = r
+            print(f"{szenario.name:>20}: p50 {r.get('p50_ms', 0):8.1f} ms   p95 {r.get('p95_ms', 0):8.1f} ms   "
+                  f"p99 {r.get('p99_ms', 0):8.1f} ms   {r['durchsatz_rps']:8.1f} req/s   Fehler {r['fehler']}")
+        for pfad in ("/agent-cache/stats", "/web-search-cache/stats", "/fast-classifier/stats"):
+            ergebnis.setdefault("_caches", {})[pfad.split("/")[1]] = (await client.get(pfad)).json()
+    return ergebnis
+
+
+def main(args) -> Dict:
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        WEB_SEARCH_CACHE_PATH=os.path.join(tmp, "web_search_cache.sqlite3"),
+        KI_LOG_FALLBACK_PATH=os.path.join(tmp, "ki_fallback.ndjson"),
+        KI_LOG_DEAD_LETTER_PATH=os.path.join(tmp, "ki_dead_letter.ndjson"),
+        OFFLINE_LLM_LATENCY_MS=str(args.llm_latency_ms),
+        OFFLINE_LLM_TOKEN_MS=str(args.token_ms),
+        OFFLINE_SEARCH_LATENCY_MS=str(args.search_latency_ms),
+        OFFLINE_ANTWORT_TOKENS=str(args.antwort_tokens),
+        # Alle Anfragen kommen von einer IP; gemessen wird die Pipeline, nicht das Limit
+        LLM_RATE_LIMIT_ENABLED="false",
+    )
+    if args.database_url:
+        env.pop("ASYNC_DATABASE_URL", None)
+    subprocess.run([sys.executable, "migrate.py"], env=env, check=True, stdout=subprocess.DEVNULL)
+
+    datagen = None
+    if args.scale:
+        datei = os.path.join(tmp, "datagen.json")
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.datagen", "--scale", str(args.scale), "--seed", str(args.seed),
+             "--json", datei],
+            env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+        with open(datei) as f:
+            datagen = json.load(f)
+    zeilen = zeilen_zaehlen(env)
+    if not zeilen["kunde"] or not zeilen["werkstatt"] or not zeilen["fahrzeug"]:
+        raise SystemExit("Keine Testdaten: --scale > 0 angeben")
+    ctx = {
+        **zeilen,
+        "orte": sorted({o[0] for o in lade_orte()}),
+        "bulk_groesse": args.bulk_groesse,
+    }
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.offline_agent:create_app", "--factory",
+         "--port", str(args.port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=30) as client:
+            started = time.perf_counter()
+            warten_bis_bereit(client, server)
+            bereit_s = time.perf_counter() - started
+        szenarien = asyncio.run(szenarien_ausfuehren(args, server.pid, ctx))
+        server_hwm = proc_status_kb(server.pid, "VmHWM")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    caches = szenarien.pop("_caches", {})
+    return {
+        "format": BERICHT_FORMAT,
+        "meta": {
+            "commit": git_commit(),
+            "zeit": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plattform": platform.platform(),
+            "datenbank": env["DATABASE_URL"].split(":", 1)[0],
+        },
+        "konfiguration": {
+            "scale": args.scale, "seed": args.seed, "concurrency": args.concurrency,
+            "anfragen": args.anfragen, "agent_anfragen": args.agent_anfragen, "bulk_groesse": args.bulk_groesse,
+            "llm_latency_ms": args.llm_latency_ms, "token_ms": args.token_ms,
+            "search_latency_ms": args.search_latency_ms, "antwort_tokens": args.antwort_tokens,
+        },
+        "daten": {"zeilen": zeilen, "datagen": datagen},
+        "bereit_nach_s": round(bereit_s, 2),
+        "szenarien": szenarien,
+        "caches": caches,
+        "peak_rss_mb": {
+            # VmHWM wurde pro Szenario zurückgesetzt: das Maximum steht in den Szenarien
+            "server": max([s["server_rss_spitze_mb"] or 0 for s in szenarien.values()]
+                          + [round((server_hwm or 0) / 1024, 1)]),
+            "client": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10_000, help="Anzahl Kunden für datagen (0: vorhandene Daten)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="Statt einer temporären SQLite-Datenbank (z.B. Postgres)")
+    parser.add_argument("--szenarien", nargs="*", choices=[s.name for s in SZENARIEN], help="Nur diese Szenarien")
+    parser.add_argument("--anfragen", type=int, default=300, help="Anfragen pro Szenario")
+    parser.add_argument("--agent-anfragen", type=int, default=60, help="Anfragen pro Agent-Szenario")
+    parser.add_argument("--aufwaermen", type=int, default=10, help="Nicht gemessene Anfragen vor jedem Szenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallele Clients")
+    parser.add_argument("--bulk-groesse", type=int, default=500, help="Zeilen pro Bulk-Anfrage")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="Offline-LLM: Zeit bis zum ersten Token")
+    parser.add_argument("--token-ms", type=float, default=20, help="Offline-LLM: Zeit pro weiterem Token")
+    parser.add_argument("--search-latency-ms", type=float, default=500, help="Offline-Tavily: Dauer pro Suche")
+    parser.add_argument("--antwort-tokens", type=int, default=120, help="Offline-LLM: Länge der Antwort von Agent 2")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--json", help="Bericht als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    result = main(args)
+    print(f"Peak-RSS: Server {result['peak_rss_mb']['server']} MB, Client {result['peak_rss_mb']['client']} MB")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
@@ -1,4 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
@@ -12,7 +15,75 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
-# Dependency
+
+# Async-Treiber passend zum synchronen URL-Schema
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Leitet aus der (synchronen) DATABASE_URL die URL für den Async-Treiber ab"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Kein Async-Treiber für Datenbank '{backend}' hinterlegt")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+# Async-Engine für die FastAPI-Endpunkte, die synchrone bleibt für Skripte
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# Optionale Lese-Replika (z.B. RDS Read Replica) für die lesenden Endpunkte;
+# welche Anfrage dort landet, entscheidet services/replika.py
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+ASYNC_READ_DATABASE_URL = os.getenv("ASYNC_READ_DATABASE_URL") or (
+    to_async_url(READ_DATABASE_URL) if READ_DATABASE_URL else None
+)
+REPLICA_CONNECT_TIMEOUT = float(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+
+
+def _create_read_engine(url: str):
+    # Eine ausgefallene Replika soll schnell scheitern (Fallback auf die Primärdatenbank)
+    connect_args = {"timeout": REPLICA_CONNECT_TIMEOUT} if make_url(url).get_backend_name() == "postgresql" else {}
+    return create_async_engine(url, pool_pre_ping=True, connect_args=connect_args)
+
+
+read_async_engine = _create_read_engine(ASYNC_READ_DATABASE_URL) if ASYNC_READ_DATABASE_URL else None
+ReadSessionLocal = async_sessionmaker(read_async_engine, expire_on_commit=False) if read_async_engine else None
+
+
+def add_missing_columns(bind=engine, metadata=None):
+    """create_all legt nur fehlende Tabellen an – neue, nullable Spalten
+    bestehender Tabellen werden hier per ALTER TABLE ergänzt"""
+    metadata = metadata if metadata is not None else Base.metadata
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            vorhanden = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in vorhanden and column.nullable:
+                    typ = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {typ}"))
+
+
+def add_missing_indexes(bind=engine, metadata=None):
+    """Wie add_missing_columns, für neu definierte Indizes bestehender Tabellen"""
+    metadata = metadata if metadata is not None else Base.metadata
+    # IF NOT EXISTS statt Reflection: Ausdrucks-Indizes (lower(...)) werden nicht reflektiert
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+# Dependency (synchron, z.B. für Skripte)
 def get_db():
     db = SessionLocal()
     try:
@@ -20,6 +91,12 @@ def get_db():
     finally:
         db.close()
 
+
+# Dependency (async)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # NOTE: If you want a local SQLite fallback for development, you can use:
 # SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 # engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
@@ -1,20 +1,102 @@
-from fastapi import FastAPI, Depends
-from sqlalchemy.orm import Session
-from database import SessionLocal, engine
+from fastapi import FastAPI, Depends, Query, Request, Response
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, async_engine, engine, read_async_engine
+from services.fulltext import volltext_suche
 import models as models, schemas as schemas
-from datetime import date
+from datetime import date, timedelta
 from fastapi import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
+import asyncio
 import os
-import openai
+import traceback
 from pydantic import BaseModel
-from services.langchain_service import generate_answer_with_langchain
-from services.werkstatt_web_agent import run_werkstatt_agent_sequential
-
-
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Fahrzeugservice API")
+from typing import Literal, Optional
+from services.werkstatt_web_agent import run_werkstatt_agent_async, warmup as agent_warmup
+from services.pagination import (
+    DEFAULT_LIMIT, MAX_LIMIT, NEXT_CURSOR_HEADER, dumps, keyset_page_json, stream_ndjson,
+)
+from services.bulk_import import handle_bulk_upload, parse_rows
+from services.werkstatt_index import WerkstattEintrag, werkstatt_index
+from services.agent_cache import agent_cache
+from services.web_search_cache import web_search_cache
+from services.fast_classifier import fast_classifier
+from services.agent_stream import agent_sse_response
+from services.agent_jobs import AgentJob, QueueFull, agent_jobs
+from services.ki_log import ki_log
+from services.ki_auftrag import (
+    HINWEIS_OHNE_ZUORDNUNG, antwort_auftrag, braucht_auftrag, ki_auftraege_anlegen, standard_werkstatt_id,
+)
+from services.geo import backfill_koordinaten, plz_geocoder
+from services.queries import auftrag_filter, kunden_uebersicht
+from services.statistik import MAX_TAGE, auftrag_statistik
+from services.http_cache import conditional_get, tabellen_versionen
+from services.compression import CompressionMiddleware
+from services.metrics import MetricsMiddleware, instrument_engine, metriken, mit_profil
+from services.rate_limit import llm_rate_limit, llm_rate_limiter
+from services.single_flight import agent_single_flight
+from services.replika import (
+    READ_SOURCE_HEADER, WRITE_TIME_HEADER, WriteTimeMiddleware, lese_routing, lesen_ab,
+)
+from services.aenderungen import AENDERUNGEN_MAX_WAIT_SECONDS, aenderungen_erfassen, aenderungs_feed
+
+# Das Schema legt `python migrate.py` an, nicht der Import der App.
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "true").lower() == "true"
+
+
+async def _indizes_laden():
+    """Werkstatt-Index und Statistik aufbauen; ist die DB nicht erreichbar, später erneut"""
+    pause = 1.0
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await backfill_koordinaten(db)
+            # Die Replika nur, wenn sie alle Schreibzugriffe seit dem Start schon enthält
+            if lese_routing.aktiv:
+                await lese_routing.pruefen()
+            sessions, _ = lese_routing.waehlen(("werkstatt", "auftrag"))
+            async with sessions() as db:
+                await werkstatt_index.load_async(db)
+                await auftrag_statistik.rebuild_async(db)
+            return
+        except Exception:
+            traceback.print_exc()
+            await asyncio.sleep(pause)
+            pause = min(pause * 2, 30)
+
+
+async def _agent_aufwaermen():
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, agent_warmup)
+    except Exception:
+        traceback.print_exc()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nichts davon blockiert den Start: CRUD-Endpunkte antworten sofort,
+    # Indizes und Agent (LangChain-Import) werden im Hintergrund geladen
+    hintergrund = [asyncio.create_task(_indizes_laden())]
+    if AGENT_WARMUP:
+        hintergrund.append(asyncio.create_task(_agent_aufwaermen()))
+    await agent_jobs.start()
+    await ki_log.start()
+    await lese_routing.start()
+    yield
+    await lese_routing.stop()
+    for task in hintergrund:
+        task.cancel()
+    await agent_jobs.stop()
+    # Ausstehende KIAktion-Zeilen vor dem Beenden schreiben
+    await ki_log.stop()
+    await async_engine.dispose()
+    if read_async_engine is not None:
+        await read_async_engine.dispose()
+
+
+app = FastAPI(title="Fahrzeugservice API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -23,16 +105,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", WRITE_TIME_HEADER, READ_SOURCE_HEADER],
 )
+# X-Write-Time auf Schreibzugriffen, für read-your-writes mit X-Read-After (nur mit Lese-Replika)
+app.add_middleware(WriteTimeMiddleware)
+# gzip/Brotli ab COMPRESSION_MIN_BYTES (Listen, Agent-Antworten); SSE bleibt unkomprimiert
+app.add_middleware(CompressionMiddleware)
+# Außen: Dauer inkl. Komprimierung, SQL-Abfragen und Agent-Stufen pro Anfrage (GET /metrics)
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if read_async_engine is not None:
+    instrument_engine(read_async_engine.sync_engine)
+
+
+# Dependency für DB (async, die synchrone Variante liegt in database.py)
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
 
 
-# Dependency für DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Lesende Endpunkte: Replika (READ_DATABASE_URL), wenn sie aktuell genug ist, sonst wie get_db.
+# Die gelesenen Tabellen setzt conditional_get, das als Route-Dependency vorher läuft.
+async def get_read_db(request: Request, response: Response):
+    sessions, quelle = lese_routing.waehlen(getattr(request.state, "tabellen", ()), lesen_ab(request))
+    response.headers[READ_SOURCE_HEADER] = quelle
+    async with sessions() as db:
+        try:
+            yield db
+        except (DBAPIError, OSError) as e:
+            if quelle == "replica":
+                lese_routing.fehler(e)
+            raise
 
 
 # ---------------- HOME ----------------
@@ -42,81 +146,303 @@ def home():
 
 
 # ---------------- KUNDEN ----------------
-@app.get("/kunden", response_model=list[schemas.Kunde])
-def get_kunden(db: Session = Depends(get_db)):
-    return db.query(models.Kunde).all()
+# Alle Listen-Endpunkte blättern per Keyset-Cursor:
+#   ?limit=100&after=<letzte ID>  → nächster Cursor im Header X-Next-Cursor
+#   ?stream=true                  → komplette Tabelle als NDJSON-Stream
+# Seiten tragen eine ETag aus den Tabellen-Versionen; bei passendem If-None-Match → 304
+@app.get("/kunden", response_model=list[schemas.Kunde], dependencies=[conditional_get("kunde")])
+async def get_kunden(
+    response: Response,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    after: Optional[int] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+):
+    if stream:
+        return stream_ndjson(models.Kunde, schemas.Kunde, after, bind=db.bind)
+    return await keyset_page_json(db, response, models.Kunde, schemas.Kunde, limit, after)
 
 
 @app.post("/kunden", response_model=schemas.Kunde)
-def create_kunde(kunde: schemas.KundeCreate, db: Session = Depends(get_db)):
+async def create_kunde(kunde: schemas.KundeCreate, db: AsyncSession = Depends(get_db)):
     neuer_kunde = models.Kunde(**kunde.dict())
     db.add(neuer_kunde)
-    db.commit()
-    db.refresh(neuer_kunde)
+    await db.flush()
+    await aenderungen_erfassen(db, "kunde", [neuer_kunde.id])
+    await db.commit()
+    await db.refresh(neuer_kunde)
+    tabellen_versionen.bump("kunde")
     return neuer_kunde
 
 
+# Bulk-Import: Body als JSON-Array, NDJSON (application/x-ndjson) oder CSV (text/csv)
+@app.post("/kunden/bulk", response_model=schemas.BulkImportResult)
+async def create_kunden_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    return await handle_bulk_upload(
+        request, db, models.Kunde, schemas.KundeCreate,
+        on_commit=lambda rows: tabellen_versionen.bump("kunde"),
+    )
+
+
 # ---------------- FAHRZEUGE ----------------
-@app.get("/fahrzeuge", response_model=list[schemas.Fahrzeug])
-def get_fahrzeuge(db: Session = Depends(get_db)):
-    return db.query(models.Fahrzeug).all()
+@app.get("/fahrzeuge", response_model=list[schemas.Fahrzeug], dependencies=[conditional_get("fahrzeug")])
+async def get_fahrzeuge(
+    response: Response,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    after: Optional[int] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+):
+    if stream:
+        return stream_ndjson(models.Fahrzeug, schemas.Fahrzeug, after, bind=db.bind)
+    return await keyset_page_json(db, response, models.Fahrzeug, schemas.Fahrzeug, limit, after)
 
 @app.post("/fahrzeuge", response_model=schemas.Fahrzeug)
-def create_fahrzeug(fahrzeug: schemas.FahrzeugCreate, db: Session = Depends(get_db)):
+async def create_fahrzeug(fahrzeug: schemas.FahrzeugCreate, db: AsyncSession = Depends(get_db)):
     neues_fahrzeug = models.Fahrzeug(**fahrzeug.dict())
     db.add(neues_fahrzeug)
-    db.commit()
-    db.refresh(neues_fahrzeug)
+    await db.flush()
+    await aenderungen_erfassen(db, "fahrzeug", [neues_fahrzeug.id])
+    await db.commit()
+    await db.refresh(neues_fahrzeug)
+    tabellen_versionen.bump("fahrzeug")
     return neues_fahrzeug
 
 
+@app.post("/fahrzeuge/bulk", response_model=schemas.BulkImportResult)
+async def create_fahrzeuge_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    return await handle_bulk_upload(
+        request, db, models.Fahrzeug, schemas.FahrzeugCreate,
+        foreign_keys={"kunde_id": models.Kunde},
+        on_commit=lambda rows: tabellen_versionen.bump("fahrzeug"),
+    )
+
+
 # ---------------- WERKSTÄTTEN ----------------
-@app.get("/werkstatt", response_model=list[schemas.Werkstatt])
-def get_werkstatt(db: Session = Depends(get_db)):
-    return db.query(models.Werkstatt).all()
+def _koordinaten_setzen(values: dict):
+    if values.get("lat") is not None and values.get("lon") is not None:
+        values["geo_quelle"] = "manuell"
+        return
+    values["lat"], values["lon"], values["geo_quelle"] = (
+        plz_geocoder.locate_mit_quelle(values.get("plz"), values.get("ort")) or (None, None, None)
+    )
+
+
+def _index_werkstaetten(rows: list[dict]):
+    for row in rows:
+        werkstatt_index.add_werkstatt(WerkstattEintrag(
+            row["id"], row["name"], row["adresse"], row["plz"], row["ort"], row["lat"], row["lon"]
+        ))
+    agent_cache.invalidate_werkstatt()
+    tabellen_versionen.bump("werkstatt")
+
+
+@app.get("/werkstatt", response_model=list[schemas.Werkstatt], dependencies=[conditional_get("werkstatt")])
+async def get_werkstatt(
+    response: Response,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    after: Optional[int] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+):
+    if stream:
+        return stream_ndjson(models.Werkstatt, schemas.Werkstatt, after, bind=db.bind)
+    return await keyset_page_json(db, response, models.Werkstatt, schemas.Werkstatt, limit, after)
 
 @app.post("/werkstatt", response_model=schemas.Werkstatt)
-def create_werkstatt(werkstatt: schemas.WerkstattCreate, db: Session = Depends(get_db)):
-    neue_werkstatt = models.Werkstatt(**werkstatt.dict())
+async def create_werkstatt(werkstatt: schemas.WerkstattCreate, db: AsyncSession = Depends(get_db)):
+    values = werkstatt.dict()
+    _koordinaten_setzen(values)
+    neue_werkstatt = models.Werkstatt(**values)
     db.add(neue_werkstatt)
-    db.commit()
-    db.refresh(neue_werkstatt)
+    await db.flush()
+    await aenderungen_erfassen(db, "werkstatt", [neue_werkstatt.id])
+    await db.commit()
+    await db.refresh(neue_werkstatt)
+    werkstatt_index.add_werkstatt(neue_werkstatt)
+    agent_cache.invalidate_werkstatt()
+    tabellen_versionen.bump("werkstatt")
     return neue_werkstatt
 
 
+@app.post("/werkstatt/bulk", response_model=schemas.BulkImportResult)
+async def create_werkstatt_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    return await handle_bulk_upload(
+        request, db, models.Werkstatt, schemas.WerkstattCreate,
+        prepare=_koordinaten_setzen,
+        on_commit=_index_werkstaetten,
+    )
+
+
+@app.get("/werkstatt/nearby", response_model=list[schemas.WerkstattNearby])
+def get_werkstatt_nearby(
+    plz: Optional[str] = None,
+    ort: Optional[str] = None,
+    radius_km: float = Query(25.0, gt=0, le=500),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """Nächste Werkstätten um eine PLZ oder einen Ort (aus dem In-Memory-Index)"""
+    if not plz and not ort:
+        raise HTTPException(status_code=400, detail="plz oder ort angeben")
+    punkt = plz_geocoder.locate(plz, ort)
+    if punkt is None:
+        raise HTTPException(status_code=404, detail="PLZ/Ort unbekannt")
+    if not werkstatt_index.loaded:
+        raise HTTPException(status_code=503, detail="Werkstatt-Index wird geladen", headers={"Retry-After": "2"})
+    return [
+        {**vars(w), "distanz_km": round(distanz, 2)}
+        for w, distanz in werkstatt_index.nearby(punkt[0], punkt[1], radius_km, limit)
+    ]
+
+
 # ---------------- AUFTRÄGE ----------------
-@app.get("/auftraege", response_model=list[schemas.Auftrag])
-def get_auftraege(db: Session = Depends(get_db)):
-    return db.query(models.Auftrag).all()
+def _auftrag_angelegt(auftrag: models.Auftrag):
+    auftrag_statistik.add_auftrag(
+        auftrag.id, auftrag.werkstatt_id, auftrag.status, auftrag.erstellt_am, auftrag.kosten
+    )
+    tabellen_versionen.bump("auftrag")
+
+
+def _auftraege_importiert(rows: list[dict]):
+    auftrag_statistik.add_rows(rows)
+    tabellen_versionen.bump("auftrag")
+
+
+@app.get("/auftraege", response_model=list[schemas.Auftrag], dependencies=[conditional_get("auftrag")])
+async def get_auftraege(
+    response: Response,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    after: Optional[int] = None,
+    stream: bool = False,
+    status: Optional[str] = None,
+    fahrzeug_id: Optional[int] = None,
+    werkstatt_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    where = auftrag_filter(status=status, fahrzeug_id=fahrzeug_id, werkstatt_id=werkstatt_id)
+    if stream:
+        return stream_ndjson(models.Auftrag, schemas.Auftrag, after, where=where, bind=db.bind)
+    return await keyset_page_json(db, response, models.Auftrag, schemas.Auftrag, limit, after, where=where)
 
 @app.post("/auftraege", response_model=schemas.Auftrag)
-def create_auftrag(auftrag: schemas.AuftragCreate, db: Session = Depends(get_db)):
+async def create_auftrag(auftrag: schemas.AuftragCreate, db: AsyncSession = Depends(get_db)):
     neuer_auftrag = models.Auftrag(**auftrag.dict())
     if not neuer_auftrag.erstellt_am:
         neuer_auftrag.erstellt_am = date.today()
     db.add(neuer_auftrag)
-    db.commit()
-    db.refresh(neuer_auftrag)
+    await db.flush()
+    await aenderungen_erfassen(db, "auftrag", [neuer_auftrag.id])
+    await db.commit()
+    await db.refresh(neuer_auftrag)
+    _auftrag_angelegt(neuer_auftrag)
     return neuer_auftrag
 
 
+@app.patch("/auftraege/{auftrag_id}/status", response_model=schemas.Auftrag)
+async def update_auftrag_status(
+    auftrag_id: int, update: schemas.AuftragStatusUpdate, db: AsyncSession = Depends(get_db)
+):
+    auftrag = await db.get(models.Auftrag, auftrag_id)
+    if not auftrag:
+        raise HTTPException(status_code=404, detail="Auftrag nicht gefunden")
+    alter_status = auftrag.status
+    auftrag.status = update.status
+    await aenderungen_erfassen(db, "auftrag", [auftrag.id], "update")
+    await db.commit()
+    auftrag_statistik.change_status(auftrag.werkstatt_id, alter_status, auftrag.status)
+    tabellen_versionen.bump("auftrag")
+    return auftrag
+
+
+@app.post("/auftraege/bulk", response_model=schemas.BulkImportResult)
+async def create_auftraege_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    return await handle_bulk_upload(
+        request, db, models.Auftrag, schemas.AuftragCreate,
+        foreign_keys={"fahrzeug_id": models.Fahrzeug, "werkstatt_id": models.Werkstatt},
+        defaults={"erstellt_am": date.today()},
+        on_commit=_auftraege_importiert,
+    )
+
+
+# ---------------- STATISTIK ----------------
+# Aus inkrementell gepflegten Zählern (services/statistik.py), ohne Aufträge zu laden
+def _statistik_geladen():
+    # Direkt nach dem Start wird die Statistik noch im Hintergrund aufgebaut
+    if not auftrag_statistik.loaded:
+        raise HTTPException(status_code=503, detail="Statistik wird aufgebaut", headers={"Retry-After": "2"})
+
+
+@app.get("/stats", response_model=schemas.StatistikUebersicht)
+def get_stats(werkstatt_id: Optional[int] = None):
+    _statistik_geladen()
+    werkstaetten = auftrag_statistik.werkstaetten(werkstatt_id)
+    for eintrag in werkstaetten:
+        werkstatt = werkstatt_index.werkstaetten.get(eintrag["werkstatt_id"])
+        eintrag["name"] = werkstatt.name if werkstatt else None
+    return {"gesamt": auftrag_statistik.gesamt(), "werkstaetten": werkstaetten}
+
+
+@app.get("/stats/auftraege-pro-tag", response_model=list[schemas.TagesStatistik])
+def get_stats_pro_tag(
+    von: Optional[date] = None,
+    bis: Optional[date] = None,
+    werkstatt_id: Optional[int] = None,
+):
+    bis = bis or date.today()
+    von = von or bis - timedelta(days=29)
+    if von > bis:
+        raise HTTPException(status_code=400, detail="von liegt nach bis")
+    if (bis - von).days >= MAX_TAGE:
+        raise HTTPException(status_code=400, detail=f"Zeitraum höchstens {MAX_TAGE} Tage")
+    _statistik_geladen()
+    return auftrag_statistik.pro_tag(von, bis, werkstatt_id)
+
+
+@app.post("/stats/rebuild", response_model=schemas.StatistikUebersicht)
+async def rebuild_stats(db: AsyncSession = Depends(get_db)):
+    """Zähler komplett aus der Datenbank neu aufbauen"""
+    await auftrag_statistik.rebuild_async(db)
+    return get_stats()
+
+
+# ---------------- VOLLTEXTSUCHE ----------------
+@app.get("/suche", response_model=list[schemas.SuchTreffer])
+async def suche(
+    response: Response,
+    q: str = Query(..., min_length=1, description="Suchbegriffe, z.B. 'Motorschaden'"),
+    typ: Literal["auftraege", "ki_aktionen"] = "auftraege",
+    status: Optional[str] = None,
+    werkstatt_id: Optional[int] = None,
+    marke: Optional[str] = None,
+    von: Optional[date] = None,
+    bis: Optional[date] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Volltextsuche in Auftragsbeschreibungen bzw. KI-Nachrichten, nach Relevanz sortiert"""
+    return await volltext_suche(
+        db, response, q, typ, limit, after,
+        status=status, werkstatt_id=werkstatt_id, marke=marke, von=von, bis=bis,
+    )
+
+
 # ---------------- KI-ENDPOINT ----------------
 @app.post("/ki/auftrag", response_model=schemas.KIAktionSchema)
-def ki_create_auftrag(action: schemas.KIAktionCreate, db: Session = Depends(get_db)):
+async def ki_create_auftrag(action: schemas.KIAktionCreate, db: AsyncSession = Depends(get_db)):
     # Einfache Heuristik: wenn werkstatt_id gegeben, verwende sie, sonst wähle erste Werkstatt
     werkstatt_id = action.werkstatt_id
     if werkstatt_id is None:
-        werk = db.query(models.Werkstatt).first()
-        if werk:
-            werkstatt_id = werk.id
+        werkstatt_id = await standard_werkstatt_id(db)
 
     # Falls Fahrzeuginfo fehlt, versuchen wir es nicht automatisch zuzuordnen
-    if action.fahrzeug_id is None and action.kunde_id is None:
-        antwort = "Danke für Ihre Nachricht. Bitte geben Sie mindestens eine Fahrzeug- oder Kunden-ID an."
-        ki = models.KIAktion(nachricht=action.nachricht, antwort=antwort, auftrag_id=None)
+    if not braucht_auftrag(action.dict()):
+        ki = models.KIAktion(nachricht=action.nachricht, antwort=HINWEIS_OHNE_ZUORDNUNG, auftrag_id=None)
         db.add(ki)
-        db.commit()
-        db.refresh(ki)
+        await db.flush()
+        await aenderungen_erfassen(db, "ki_aktionen", [ki.id])
+        await db.commit()
+        tabellen_versionen.bump("ki_aktionen")
         return ki
 
     # Erstelle Auftrag
@@ -129,49 +455,226 @@ def ki_create_auftrag(action: schemas.KIAktionCreate, db: Session = Depends(get_
         kosten=0,
     )
     db.add(auftrag)
-    db.commit()
-    db.refresh(auftrag)
+    # flush vergibt die Auftrags-ID; Auftrag und KIAktion landen in einer Transaktion
+    await db.flush()
 
     # Schreibe KIAktion
-    antwort = f"Ihr Auftrag wurde erstellt (ID {auftrag.id}). Wir haben Werkstatt-ID {werkstatt_id} zugewiesen."
-    ki = models.KIAktion(nachricht=action.nachricht, antwort=antwort, auftrag_id=auftrag.id)
+    ki = models.KIAktion(nachricht=action.nachricht, antwort=antwort_auftrag(auftrag.id, werkstatt_id),
+                         auftrag_id=auftrag.id)
     db.add(ki)
-    db.commit()
-    db.refresh(ki)
+    await db.flush()
+    await aenderungen_erfassen(db, "auftrag", [auftrag.id])
+    await aenderungen_erfassen(db, "ki_aktionen", [ki.id])
+    await db.commit()
+    _auftrag_angelegt(auftrag)
+    tabellen_versionen.bump("ki_aktionen")
 
     return ki
 
 
+def _ki_auftraege_angelegt(rows: list[dict]):
+    if rows:
+        _auftraege_importiert(rows)
+    tabellen_versionen.bump("ki_aktionen")
+
+
+@app.post("/ki/auftrag/batch", response_model=schemas.KIAuftragBatchResult)
+async def ki_create_auftrag_batch(request: Request, db: AsyncSession = Depends(get_db)):
+    """Viele Nachrichten (JSON-Array von KIAktionCreate oder NDJSON) in einer Transaktion
+
+    Ergebnis pro Nachricht mit Zeilennummer: KIAktion- und Auftrags-ID oder Fehler.
+    """
+    rows = parse_rows(await request.body(), request.headers.get("content-type", "application/json"))
+    return await ki_auftraege_anlegen(db, rows, on_commit=_ki_auftraege_angelegt)
+
+
+# ---------------- ÄNDERUNGEN ----------------
+# Deltas statt kompletter Listen (services/aenderungen.py):
+#   GET /changes                   → nur der aktuelle Cursor, vor dem ersten vollständigen Laden abfragen
+#   GET /changes?since=<cursor>    → angelegte/geänderte Zeilen aller Tabellen in Reihenfolge,
+#                                    mit `wait=<s>` als Long-Poll
+#   GET /changes/stream            → dasselbe als Server-Sent Events
+# Immer von der Primärdatenbank: geweckt wird beim Commit, die Replika hätte die Änderung evtl. noch nicht.
+@app.get("/changes", response_model=schemas.AenderungsSeite)
+async def get_changes(
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    wait: float = Query(0, ge=0, le=AENDERUNGEN_MAX_WAIT_SECONDS, description="Sekunden auf neue Änderungen warten"),
+):
+    if since is None:
+        return {"changes": [], "cursor": await aenderungs_feed.cursor(), "has_more": False}
+    seite = await aenderungs_feed.lesen_oder_warten(since, limit, wait)
+    return Response(dumps(seite), media_type="application/json")
+
+
+@app.get("/changes/stream")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+):
+    """Ereignisse `change` (id = seq); nach einem Verbindungsabbruch geht es ab Last-Event-ID weiter"""
+    letzte = request.headers.get("last-event-id", "")
+    if letzte.isdigit():
+        since = int(letzte)
+    elif since is None:
+        since = await aenderungs_feed.cursor()
+    return StreamingResponse(
+        aenderungs_feed.sse(since, limit),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/changes/stats")
+def changes_stats():
+    return aenderungs_feed.stats()
+
+
 # ---------------- OPENAI CHAT ----------------
 
 
 
+# ---------------- AGENT-CACHE ----------------
+async def _agent_antwort(query: str, generation: int) -> str:
+    """Antwort des Werkstatt-Agenten nach einem Cache-Fehlschlag berechnen und speichern
+
+    `generation` stammt von vor dem Cache-Zugriff (siehe _job_einreichen).
+    """
+    answer = await run_werkstatt_agent_async(query)
+    agent_cache.put(query, answer, generation)
+    return answer
+
+
+@app.get("/agent-cache/stats")
+def agent_cache_stats():
+    return agent_cache.stats()
+
+
+@app.get("/http-cache/stats")
+def http_cache_stats():
+    return tabellen_versionen.stats()
+
+
+@app.get("/web-search-cache/stats")
+def web_search_cache_stats():
+    return web_search_cache.stats()
+
+
+@app.get("/replika/stats")
+def replika_stats():
+    return lese_routing.stats()
+
+
+@app.get("/fast-classifier/stats")
+def fast_classifier_stats():
+    return fast_classifier.stats()
+
+
+# ---------------- METRIKEN ----------------
+# Prometheus-Textformat; die stats()-Endpunkte der Caches und Jobs kommen als Gauges dazu
+metriken.sammler("agent_cache", agent_cache.stats)
+metriken.sammler("web_search_cache", web_search_cache.stats)
+metriken.sammler("fast_classifier", fast_classifier.stats)
+metriken.sammler("agent_jobs", agent_jobs.stats)
+metriken.sammler("ki_log", ki_log.stats)
+metriken.sammler("agent_single_flight", agent_single_flight.stats)
+metriken.sammler("llm_rate_limit", llm_rate_limiter.stats)
+metriken.sammler("replika", lese_routing.stats)
+metriken.sammler("aenderungen", aenderungs_feed.stats)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metriken.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ---------------- AGENT-JOBS ----------------
+# Agent-Anfragen laufen über einen begrenzten Worker-Pool (services/agent_jobs.py),
+# synchron (auf das Ergebnis warten) oder per ?job=true mit späterem Abruf.
+# Treffer im Agent-Cache werden vorher beantwortet und belegen keinen Platz.
+# Gleiche Anfragen, die eintreffen, solange ein Job dafür wartet oder läuft,
+# bekommen denselben Job (services/single_flight.py).
+async def _agent_anfrage(query: str, generation: int) -> str:
+    """Inhalt eines Agent-Jobs: Antwort holen und als KIAktion protokollieren (auch für Mitläufer)"""
+    try:
+        answer = await _agent_antwort(query, generation)
+    finally:
+        mitlaeufer = agent_single_flight.beenden(query)
+    for anfrage in [query] + mitlaeufer:
+        ki_log.log(anfrage, answer)
+    return answer
+
+
+def _job_einreichen(query: str) -> AgentJob:
+    generation = agent_cache.generation()
+    answer = agent_cache.get(query)
+    if answer is not None:
+        ki_log.log(query, answer)
+        return agent_jobs.submit_done(answer)
+    agent_job = agent_single_flight.anhaengen(query)
+    if agent_job is not None:
+        return agent_job
+    try:
+        agent_job = agent_jobs.submit(mit_profil(lambda: _agent_anfrage(query, generation)))
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    agent_single_flight.starten(query, agent_job)
+    return agent_job
+
+
+def _agent_stream(query: str, extra: Optional[dict] = None):
+    """SSE-Streams teilen sich die Worker-Plätze mit den Jobs und werden ebenso abgelehnt (außer Cache-Treffer)"""
+    try:
+        return agent_sse_response(query, extra=extra)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+
+async def _job_ergebnis(agent_job: AgentJob) -> str:
+    await agent_job.done.wait()
+    if agent_job.status == "error":
+        raise HTTPException(status_code=500, detail=agent_job.error)
+    return agent_job.result
+
+
+@app.get("/ki-log/stats")
+def ki_log_stats():
+    return ki_log.stats()
+
+
+@app.get("/agent-jobs/stats")
+def agent_jobs_stats():
+    return agent_jobs.stats()
+
+
+@app.get("/agent-jobs/{job_id}")
+def get_agent_job(job_id: str):
+    agent_job = agent_jobs.get(job_id)
+    if not agent_job:
+        raise HTTPException(status_code=404, detail="Job nicht gefunden")
+    return agent_job.to_dict()
+
+
 # ---------------- LANGCHAIN CHAT ----------------
 class LangChainRequest(BaseModel):
     message: str
 
 
-@app.post("/langchain/chat")
-def langchain_chat(req: LangChainRequest, db: Session = Depends(get_db)):
+@app.post("/langchain/chat", dependencies=[Depends(llm_rate_limit)])
+async def langchain_chat(req: LangChainRequest, stream: bool = False, job: bool = False):
     """Forward user message to LangChain (ChatOpenAI) and store a KIAktion.
 
     This mirrors the behavior of /openai/chat but uses the LangChain wrapper.
+    With ?stream=true progress events and tokens are sent as Server-Sent Events,
+    with ?job=true the request is queued and the job id returned (202).
     """
-    try:
-        answer = run_werkstatt_agent_sequential(req.message)
-
-        # persist the KIAktion (optional)
-        ki = models.KIAktion(nachricht=req.message, antwort=answer, auftrag_id=None)
-        db.add(ki)
-        db.commit()
-        db.refresh(ki)
-
-        return {"response": answer}
-    except Exception as e:
-        import traceback
-        tb = traceback.format_exc()
-        print("LangChain call failed:", tb)
-        raise HTTPException(status_code=500, detail=str(e))
+    if stream:
+        return _agent_stream(req.message)
+    agent_job = _job_einreichen(req.message)
+    if job:
+        return JSONResponse(agent_job.to_dict(), status_code=200 if agent_job.status == "done" else 202)
+    return {"response": await _job_ergebnis(agent_job)}
 
 
 # ---------------- WERKSTATT-AGENT (Sequential Chain mit Web-Suche) ----------------
@@ -179,8 +682,8 @@ class WerkstattAgentRequest(BaseModel):
     query: str
 
 
-@app.post("/werkstatt-agent/search")
-def werkstatt_agent_search(req: WerkstattAgentRequest, db: Session = Depends(get_db)):
+@app.post("/werkstatt-agent/search", dependencies=[Depends(llm_rate_limit)])
+async def werkstatt_agent_search(req: WerkstattAgentRequest, stream: bool = False, job: bool = False):
     """Sequential Chain mit 2 Agenten für intelligente Werkstattsuche
     
     AGENT 1 (Klassifizierung):
@@ -205,42 +708,105 @@ def werkstatt_agent_search(req: WerkstattAgentRequest, db: Session = Depends(get
     {
         "query": "Wie oft sollte ich Ölwechsel machen?"  # Wird von Agent 1 direkt beantwortet
     }
+
+    Mit ?stream=true kommen Zwischenstände (Klassifizierung, DB-, Web-Ergebnisse)
+    und die Tokens von Agent 2 als Server-Sent Events. Mit ?job=true wird die
+    Anfrage nur eingereiht (202 + job_id, Ergebnis über GET /agent-jobs/{job_id}).
     """
-    try:
-        answer = run_werkstatt_agent_sequential(req.query)
+    if stream:
+        return _agent_stream(req.query, extra={"agent_type": "sequential_werkstatt_agent"})
+    agent_job = _job_einreichen(req.query)
+    if job:
+        return JSONResponse(agent_job.to_dict(), status_code=200 if agent_job.status == "done" else 202)
+    return {
+        "response": await _job_ergebnis(agent_job),
+        "agent_type": "sequential_werkstatt_agent"
+    }
+
+
+# ---------------- FILTER ÜBER BEZIEHUNGEN ----------------
+# Blättern wie bei den Listen (?limit, ?after, X-Next-Cursor); jede Abfrage ist
+# durch einen Index (Filterspalte, id) gedeckt, siehe models.py.
 
-        # Log die Agent-Anfrage
-        ki = models.KIAktion(nachricht=req.query, antwort=answer, auftrag_id=None)
-        db.add(ki)
-        db.commit()
-        db.refresh(ki)
-
-        return {
-            "response": answer,
-            "agent_type": "sequential_werkstatt_agent"
-        }
-    except Exception as e:
-        import traceback
-        tb = traceback.format_exc()
-        print("Werkstatt-Agent call failed:", tb)
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# --- Zusätzliche Filterfunktionen ---
-#
 # 🔹 Alle Fahrzeuge eines Kunden abrufen
-#@app.get("/kunden/{kunde_id}/fahrzeuge", response_model=list[schemas.Fahrzeug])
-#def get_fahrzeuge_von_kunde(kunde_id: int, db: Session = Depends(get_db)):
-#    return db.query(models.Fahrzeug).filter(models.Fahrzeug.kunde_id == kunde_id).all()
+@app.get(
+    "/kunden/{kunde_id}/fahrzeuge",
+    response_model=list[schemas.Fahrzeug],
+    dependencies=[conditional_get("fahrzeug")],
+)
+async def get_fahrzeuge_von_kunde(
+    kunde_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    after: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await keyset_page_json(
+        db, response, models.Fahrzeug, schemas.Fahrzeug, limit, after, where=[models.Fahrzeug.kunde_id == kunde_id]
+    )
 
 
-# 🔹 Alle Aufträge eines Fahrzeugs abrufen
-#@app.get("/fahrzeuge/{fahrzeug_id}/auftraege", response_model=list[schemas.Auftrag])
-#def get_auftraege_von_fahrzeug(fahrzeug_id: int, db: Session = Depends(get_db)):
-#   return db.query(models.Auftrag).filter(models.Auftrag.fahrzeug_id == fahrzeug_id).all()
+# 🔹 Kunde mit allen Fahrzeugen und deren Aufträgen (drei Abfragen, unabhängig von der Anzahl)
+@app.get(
+    "/kunden/{kunde_id}/uebersicht",
+    response_model=schemas.KundeUebersicht,
+    dependencies=[conditional_get("kunde", "fahrzeug", "auftrag")],
+)
+async def get_kunden_uebersicht(kunde_id: int, db: AsyncSession = Depends(get_read_db)):
+    kunde = (await db.scalars(kunden_uebersicht(kunde_id))).first()
+    if not kunde:
+        raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
+    return kunde
 
 
-# 🔹 Aufträge nach Status (z. B. offen oder abgeschlossen)
-#@app.get("/auftraege/status/{status}", response_model=list[schemas.Auftrag])
-#def get_auftraege_nach_status(status: str, db: Session = Depends(get_db)):
- #   return db.query(models.Auftrag).filter(models.Auftrag.status.ilike(status)).all()
+# 🔹 Alle Aufträge eines Fahrzeugs abrufen
+@app.get(
+    "/fahrzeuge/{fahrzeug_id}/auftraege",
+    response_model=list[schemas.Auftrag],
+    dependencies=[conditional_get("auftrag")],
+)
+async def get_auftraege_von_fahrzeug(
+    fahrzeug_id: int,
+    response: Response,
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    after: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    where = auftrag_filter(status=status, fahrzeug_id=fahrzeug_id)
+    return await keyset_page_json(db, response, models.Auftrag, schemas.Auftrag, limit, after, where=where)
+
+
+# 🔹 Alle Aufträge einer Werkstatt abrufen
+@app.get(
+    "/werkstatt/{werkstatt_id}/auftraege",
+    response_model=list[schemas.Auftrag],
+    dependencies=[conditional_get("auftrag")],
+)
+async def get_auftraege_von_werkstatt(
+    werkstatt_id: int,
+    response: Response,
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    after: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    where = auftrag_filter(status=status, werkstatt_id=werkstatt_id)
+    return await keyset_page_json(db, response, models.Auftrag, schemas.Auftrag, limit, after, where=where)
+
+
+# 🔹 Aufträge nach Status (z. B. offen oder abgeschlossen, ohne Groß-/Kleinschreibung)
+@app.get(
+    "/auftraege/status/{status}",
+    response_model=list[schemas.Auftrag],
+    dependencies=[conditional_get("auftrag")],
+)
+async def get_auftraege_nach_status(
+    status: str,
+    response: Response,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    after: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    where = auftrag_filter(status=status)
+    return await keyset_page_json(db, response, models.Auftrag, schemas.Auftrag, limit, after, where=where)
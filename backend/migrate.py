@@ -0,0 +1,44 @@
+"""Legt das Datenbankschema an bzw. ergänzt es (Tabellen, Spalten, Indizes, Volltextsuche)
+
+Läuft bewusst getrennt vom App-Start, damit ein Worker nicht beim Import die
+Datenbank braucht. Alle Schritte sind idempotent. Ist die Datenbank kurz nicht
+erreichbar, wird mit wachsender Pause erneut versucht.
+
+Aufruf (aus backend/):
+    python migrate.py
+"""
+import os
+import sys
+import time
+from sqlalchemy.exc import OperationalError
+from database import add_missing_columns, add_missing_indexes, engine
+from services.fulltext import ensure_fulltext
+import models
+
+MIGRATE_RETRIES = int(os.getenv("MIGRATE_RETRIES", "5"))
+
+
+def migrate(bind=engine):
+    models.Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind)
+    add_missing_indexes(bind)
+    ensure_fulltext(bind)
+
+
+def migrate_with_retry(bind=engine, retries: int = MIGRATE_RETRIES):
+    pause = 1.0
+    for versuch in range(retries + 1):
+        try:
+            migrate(bind)
+            return
+        except OperationalError as e:
+            if versuch == retries:
+                raise
+            print(f"Datenbank nicht erreichbar ({e.orig}), neuer Versuch in {pause:.0f} s", file=sys.stderr)
+            time.sleep(pause)
+            pause = min(pause * 2, 30)
+
+
+if __name__ == "__main__":
+    migrate_with_retry()
+    print("Schema ist aktuell")
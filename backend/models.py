@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Numeric
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Numeric, Float, Index, func
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -27,6 +27,11 @@ class Fahrzeug(Base):
     baujahr = Column(Integer)
     kunde_id = Column(Integer, ForeignKey("kunde.id"))
 
+    # Fremdschlüssel + ID: Filter nach Kunde und Keyset-Sortierung aus einem Index
+    __table_args__ = (
+        Index("ix_fahrzeug_kunde_id_id", kunde_id, id),
+    )
+
     # Beziehungen
     kunde = relationship("Kunde", back_populates="fahrzeuge")
     auftraege = relationship("Auftrag", back_populates="fahrzeug")
@@ -41,6 +46,11 @@ class Werkstatt(Base):
     adresse = Column(String(200))
     plz = Column(String(20))
     ort = Column(String(100))
+    # Beim Anlegen aus PLZ/Ort ermittelt (services/geo.py)
+    lat = Column(Float, nullable=True)
+    lon = Column(Float, nullable=True)
+    # Herkunft von lat/lon (geo.GEO_QUELLEN); grobe Quellen werden beim Start verbessert
+    geo_quelle = Column(String(20), nullable=True)
 
     # Beziehung zu Auftrag (eine Werkstatt kann viele Aufträge haben)
     auftraege = relationship("Auftrag", back_populates="werkstatt")
@@ -58,6 +68,14 @@ class Auftrag(Base):
     werkstatt_id = Column(Integer, ForeignKey("werkstatt.id"))
     kosten = Column(Numeric(10, 2))
 
+    __table_args__ = (
+        Index("ix_auftrag_fahrzeug_id_id", fahrzeug_id, id),
+        Index("ix_auftrag_werkstatt_id_id", werkstatt_id, id),
+        # Status wird ohne Groß-/Kleinschreibung gefiltert (lower(status) = ...)
+        Index("ix_auftrag_status_lower_id", func.lower(status), id),
+        Index("ix_auftrag_werkstatt_id_status", werkstatt_id, func.lower(status)),
+    )
+
     # Beziehungen
     fahrzeug = relationship("Fahrzeug", back_populates="auftraege")
     werkstatt = relationship("Werkstatt", back_populates="auftraege")
@@ -72,6 +90,29 @@ class KIAktion(Base):
     nachricht = Column(String)  # was der Kunde geschrieben hat
     antwort = Column(String)    # was die KI geantwortet hat
     erstellt_am = Column(Date, default=datetime.date.today)
-    auftrag_id = Column(Integer, ForeignKey("auftrag.id"), nullable=True)
+    auftrag_id = Column(Integer, ForeignKey("auftrag.id"), nullable=True, index=True)
 
     auftrag = relationship("Auftrag")
+
+
+# --- Tabelle: Replika-Heartbeat ---
+# Eine Zeile, die die App bei konfigurierter Lese-Replika regelmäßig auf der
+# Primärdatenbank aktualisiert; der Wert auf der Replika zeigt, bis wann sie
+# aufgeholt hat (services/replika.py)
+class ReplikaHeartbeat(Base):
+    __tablename__ = "replika_heartbeat"
+
+    id = Column(Integer, primary_key=True)
+    zeit = Column(Float, nullable=False)  # Unix-Zeit des letzten Heartbeats
+
+
+# --- Tabelle: Änderungsprotokoll ---
+# Eine Zeile pro angelegter oder geänderter Zeile, in derselben Transaktion
+# geschrieben; `seq` ist der Cursor von GET /changes (services/aenderungen.py)
+class Aenderung(Base):
+    __tablename__ = "aenderung"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    tabelle = Column(String(50), nullable=False)
+    zeilen_id = Column(Integer, nullable=False)
+    art = Column(String(10), nullable=False)  # insert / update
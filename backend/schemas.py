@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, Optional, List
 from datetime import date
+from decimal import Decimal
 
 # ------------------- KUNDE -------------------
 class KundeBase(BaseModel):
@@ -16,8 +17,7 @@ class KundeCreate(KundeBase):
 class Kunde(KundeBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ------------------- FAHRZEUG -------------------
@@ -35,8 +35,7 @@ class FahrzeugCreate(FahrzeugBase):
 class Fahrzeug(FahrzeugBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ------------------- WERKSTATT -------------------
@@ -48,14 +47,21 @@ class WerkstattBase(BaseModel):
 
 
 class WerkstattCreate(WerkstattBase):
-    pass
+    # Ohne Angabe aus PLZ/Ort ermittelt
+    lat: Optional[float] = None
+    lon: Optional[float] = None
 
 
 class Werkstatt(WerkstattBase):
     id: int
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
 
-    class Config:
-        orm_mode = True
+class WerkstattNearby(Werkstatt):
+    distanz_km: float
 
 
 # ------------------- AUFTRAG -------------------
@@ -74,11 +80,34 @@ class AuftragCreate(AuftragBase):
 class Auftrag(AuftragBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AuftragStatusUpdate(BaseModel):
+    status: str
+
+
+# ------------------- ÜBERSICHT (verschachtelt) -------------------
+class FahrzeugMitAuftraegen(Fahrzeug):
+    auftraege: List[Auftrag] = []
+
+
+class KundeUebersicht(Kunde):
+    fahrzeuge: List[FahrzeugMitAuftraegen] = []
 
 
 # ------------------- KI-AKTION -------------------
+class SuchTreffer(BaseModel):
+    id: int
+    rang: float
+    auszug: Optional[str]
+    status: Optional[str]
+    werkstatt_id: Optional[int]
+    fahrzeug_id: Optional[int]
+    erstellt_am: Optional[date]
+    auftrag_id: Optional[int]
+
+
 class KIAktionCreate(BaseModel):
     nachricht: str
     werkstatt_id: Optional[int] = None
@@ -93,5 +122,71 @@ class KIAktionSchema(BaseModel):
     erstellt_am: Optional[date]
     auftrag_id: Optional[int]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ------------------- BULK-IMPORT -------------------
+class BulkImportError(BaseModel):
+    row: int
+    detail: Any
+
+
+class BulkImportResult(BaseModel):
+    created_ids: List[int]
+    errors: List[BulkImportError]
+    rows_received: int
+    rows_per_second: Optional[float]
+
+
+class KIAuftragBatchItem(BaseModel):
+    row: int
+    ki_aktion_id: int
+    auftrag_id: Optional[int]
+    antwort: str
+
+
+class KIAuftragBatchResult(BaseModel):
+    results: List[KIAuftragBatchItem]
+    errors: List[BulkImportError]
+    rows_received: int
+    rows_per_second: Optional[float]
+
+
+# ------------------- STATISTIK -------------------
+class AuftragZahlen(BaseModel):
+    anzahl: int
+    offen: int
+    abgeschlossen: int
+    pro_status: Dict[str, int]
+    kosten_summe: Decimal
+    kosten_durchschnitt: Optional[Decimal]
+
+
+class WerkstattStatistik(AuftragZahlen):
+    werkstatt_id: int
+    name: Optional[str] = None
+
+
+class StatistikUebersicht(BaseModel):
+    gesamt: AuftragZahlen
+    werkstaetten: List[WerkstattStatistik]
+
+
+class TagesStatistik(BaseModel):
+    datum: date
+    anzahl: int
+
+
+# ------------------- ÄNDERUNGEN -------------------
+class AenderungEintrag(BaseModel):
+    seq: int
+    table: str
+    id: int
+    op: str  # insert / update
+    data: Optional[Dict[str, Any]]  # aktueller Stand der Zeile
+
+
+class AenderungsSeite(BaseModel):
+    changes: List[AenderungEintrag]
+    cursor: int  # als `since` für die nächste Abfrage
+    has_more: bool
@@ -0,0 +1,230 @@
+import asyncio
+import os
+from collections import defaultdict
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import models as models, schemas as schemas
+from database import AsyncSessionLocal
+from services.pagination import dumps, rows_to_dicts, schema_columns
+
+
+# ============================================
+# Änderungsprotokoll und Feed (GET /changes)
+# ============================================
+# Jeder Schreibzugriff in main.py (einzeln, Bulk, KI-Aufträge, KI-Log)
+# protokolliert die angelegten bzw. geänderten IDs in der Tabelle `aenderung`,
+# in derselben Transaktion und direkt vor dem Commit. `seq` steigt monoton und
+# ist der Cursor für Clients: sie laden einmal vollständig und holen danach
+# nur noch die Änderungen seit ihrem Cursor. Mit Postgres sorgt eine
+# Advisory-Sperre bis zum Commit dafür, dass Transaktionen in der Reihenfolge
+# ihrer `seq` sichtbar werden; sonst könnte ein Client `seq` 12 sehen, während
+# 11 noch nicht committet ist, und 11 nie abholen. SQLite schreibt ohnehin
+# nacheinander.
+# Ausgeliefert wird der aktuelle Stand der Zeile. Wurde sie seitdem wieder
+# geändert, kommt sie mit der späteren `seq` ein weiteres Mal.
+
+AENDERUNGEN_POLL_SECONDS = float(os.getenv("AENDERUNGEN_POLL_SECONDS", "1"))
+AENDERUNGEN_MAX_WAIT_SECONDS = float(os.getenv("AENDERUNGEN_MAX_WAIT_SECONDS", "60"))
+AENDERUNGEN_SSE_PING_SECONDS = float(os.getenv("AENDERUNGEN_SSE_PING_SECONDS", "15"))
+
+# Beliebiger, fester Schlüssel für pg_advisory_xact_lock
+_SPERR_SCHLUESSEL = 0x41454E44
+
+# Tabelle → (Modell, Schema der Listen-Endpunkte)
+TABELLEN = {
+    "kunde": (models.Kunde, schemas.Kunde),
+    "fahrzeug": (models.Fahrzeug, schemas.Fahrzeug),
+    "werkstatt": (models.Werkstatt, schemas.Werkstatt),
+    "auftrag": (models.Auftrag, schemas.Auftrag),
+    "ki_aktionen": (models.KIAktion, schemas.KIAktionSchema),
+}
+
+_INFO_KEY = "aenderungen_erfasst"
+
+
+async def aenderungen_erfassen(db: AsyncSession, tabelle: str, ids: Iterable[int], art: str = "insert"):
+    """Änderungen in der laufenden Transaktion protokollieren (direkt vor dem Commit aufrufen)"""
+    rows = [{"tabelle": tabelle, "zeilen_id": zeilen_id, "art": art} for zeilen_id in ids]
+    if not rows:
+        return
+    if db.bind.dialect.name == "postgresql":
+        # Hält bis zum Commit: seq-Vergabe und Sichtbarkeit in derselben Reihenfolge
+        await db.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _SPERR_SCHLUESSEL})
+    await db.execute(insert(models.Aenderung.__table__), rows)
+    db.sync_session.info[_INFO_KEY] = True
+
+
+# Wartende Clients nach dem Commit wecken (nur in diesem Prozess; andere
+# Worker bemerken neue Änderungen spätestens nach AENDERUNGEN_POLL_SECONDS)
+@event.listens_for(Session, "after_commit")
+def _nach_commit(session: Session):
+    if session.info.pop(_INFO_KEY, False):
+        aenderungs_feed.melden()
+
+
+@event.listens_for(Session, "after_rollback")
+def _nach_rollback(session: Session):
+    session.info.pop(_INFO_KEY, None)
+
+
+class AenderungsFeed:
+    def __init__(self, poll_s: float):
+        self.poll_s = poll_s
+        self._ereignis: Optional[asyncio.Event] = None
+        self._stand: Optional[int] = None  # höchste seq, für alle Wartenden gemeinsam
+        self._stand_am = 0.0
+        self._stand_lock: Optional[asyncio.Lock] = None
+        self.abfragen = 0
+        self.ausgeliefert = 0
+        self.wartend = 0
+        self.streams = 0
+        self.meldungen = 0
+
+    # ---------------- Benachrichtigung ----------------
+    def ereignis(self) -> asyncio.Event:
+        """Vor der Abfrage holen: wird gesetzt, sobald danach etwas committet wird"""
+        if self._ereignis is None:
+            self._ereignis = asyncio.Event()
+        return self._ereignis
+
+    def melden(self):
+        self.meldungen += 1
+        self._stand = None
+        if self._ereignis is not None:
+            self._ereignis.set()
+            self._ereignis = None
+
+    async def _warten(self, ereignis: asyncio.Event, timeout: float):
+        self.wartend += 1
+        try:
+            await asyncio.wait_for(ereignis.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.wartend -= 1
+
+    # ---------------- Lesen ----------------
+    async def cursor(self) -> int:
+        """Aktueller Stand; vor dem ersten vollständigen Laden abfragen"""
+        async with AsyncSessionLocal() as db:
+            return (await db.scalar(select(func.max(models.Aenderung.seq)))) or 0
+
+    async def stand(self) -> int:
+        """Höchste seq, höchstens AENDERUNGEN_POLL_SECONDS alt
+
+        Wartende Clients fragen erst die Änderungen ab, wenn der Stand über
+        ihrem Cursor liegt; ohne Schreibzugriffe kostet das eine Abfrage pro
+        Intervall, egal wie viele Clients warten.
+        """
+        if self._stand_lock is None:
+            self._stand_lock = asyncio.Lock()
+        async with self._stand_lock:
+            jetzt = asyncio.get_running_loop().time()
+            if self._stand is None or jetzt - self._stand_am >= self.poll_s:
+                meldungen = self.meldungen
+                stand = await self.cursor()
+                # Kam währenddessen ein Commit, ist der Wert schon überholt: nicht merken
+                if meldungen == self.meldungen:
+                    self._stand, self._stand_am = stand, jetzt
+                return stand
+            return self._stand
+
+    async def _neue(self, since: int, limit: int) -> dict:
+        if await self.stand() <= since:
+            return {"changes": [], "cursor": since, "has_more": False}
+        return await self.lesen(since, limit)
+
+    async def lesen(self, since: int, limit: int) -> dict:
+        """Änderungen mit seq > since samt aktuellem Stand der Zeilen (eine IN-Abfrage pro Tabelle)
+
+        Eigene kurze Session statt get_db, damit beim Warten keine Verbindung belegt ist.
+        """
+        self.abfragen += 1
+        async with AsyncSessionLocal() as db:
+            eintraege = (await db.execute(
+                select(models.Aenderung.seq, models.Aenderung.tabelle, models.Aenderung.zeilen_id,
+                       models.Aenderung.art)
+                .where(models.Aenderung.seq > since)
+                .order_by(models.Aenderung.seq)
+                .limit(limit + 1)
+            )).all()
+            has_more = len(eintraege) > limit
+            eintraege = eintraege[:limit]
+
+            # Mehrfach geänderte Zeilen nur einmal, an ihrer letzten Position
+            letzte: Dict[Tuple[str, int], int] = {}
+            for i, (_, tabelle, zeilen_id, _) in enumerate(eintraege):
+                letzte[(tabelle, zeilen_id)] = i
+            ids_pro_tabelle: Dict[str, List[int]] = defaultdict(list)
+            for tabelle, zeilen_id in letzte:
+                ids_pro_tabelle[tabelle].append(zeilen_id)
+
+            daten: Dict[Tuple[str, int], dict] = {}
+            for tabelle, ids in ids_pro_tabelle.items():
+                if tabelle not in TABELLEN:
+                    continue
+                model, schema = TABELLEN[tabelle]
+                names, columns = schema_columns(model, schema)
+                rows = (await db.execute(select(*columns).where(model.id.in_(ids)))).all()
+                for row in rows_to_dicts(names, rows):
+                    daten[(tabelle, row["id"])] = row
+
+        changes = [
+            {"seq": seq, "table": tabelle, "id": zeilen_id, "op": art, "data": daten.get((tabelle, zeilen_id))}
+            for i, (seq, tabelle, zeilen_id, art) in enumerate(eintraege)
+            if letzte[(tabelle, zeilen_id)] == i
+        ]
+        self.ausgeliefert += len(changes)
+        return {"changes": changes, "cursor": eintraege[-1].seq if eintraege else since, "has_more": has_more}
+
+    async def lesen_oder_warten(self, since: int, limit: int, wait_s: float) -> dict:
+        """Long-Poll: ohne neue Änderungen bis zu `wait_s` Sekunden auf die nächste warten"""
+        frist = asyncio.get_running_loop().time() + wait_s
+        while True:
+            ereignis = self.ereignis()
+            seite = await self._neue(since, limit)
+            rest = frist - asyncio.get_running_loop().time()
+            if seite["changes"] or seite["has_more"] or rest <= 0:
+                return seite
+            await self._warten(ereignis, min(rest, self.poll_s))
+
+    async def sse(self, since: int, limit: int) -> AsyncIterator[bytes]:
+        """Server-Sent Events: `change` pro Änderung (id = seq, für Last-Event-ID), sonst Pings"""
+        self.streams += 1
+        try:
+            yield b"event: cursor\ndata: " + dumps({"cursor": since}) + b"\n\n"
+            seit_ping = 0.0
+            while True:
+                ereignis = self.ereignis()
+                # Bricht der Client ab, läuft die Abfrage noch zu Ende (Session sauber schließen)
+                seite = await asyncio.shield(self._neue(since, limit))
+                for change in seite["changes"]:
+                    yield b"id: %d\nevent: change\ndata: %s\n\n" % (change["seq"], dumps(change))
+                since = seite["cursor"]
+                if seite["has_more"]:
+                    continue
+                if seite["changes"]:
+                    seit_ping = 0.0
+                elif seit_ping >= AENDERUNGEN_SSE_PING_SECONDS:
+                    # Kommentarzeile hält Proxies und Browser-Verbindung offen
+                    yield b": ping\n\n"
+                    seit_ping = 0.0
+                start = asyncio.get_running_loop().time()
+                await self._warten(ereignis, self.poll_s)
+                seit_ping += asyncio.get_running_loop().time() - start
+        finally:
+            self.streams -= 1
+
+    def stats(self) -> dict:
+        return {
+            "queries": self.abfragen,
+            "changes_served": self.ausgeliefert,
+            "waiting": self.wartend,
+            "streams": self.streams,
+            "commits_notified": self.meldungen,
+        }
+
+
+aenderungs_feed = AenderungsFeed(AENDERUNGEN_POLL_SECONDS)
@@ -0,0 +1,107 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+# ============================================
+# Antwort-Cache für den Werkstatt-Agenten
+# ============================================
+
+_UMLAUTE = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Groß-/Kleinschreibung, Umlaute, Leerzeichen und Satzzeichen am Rand angleichen
+
+    "  Werkstatt in  MÜNCHEN? " → "werkstatt in muenchen"
+    """
+    text = query.casefold().translate(_UMLAUTE)
+    text = _WHITESPACE_RE.sub(" ", text)
+    return text.strip(" .,!?;:")
+
+
+class AgentCache:
+    """LRU-Cache mit TTL für fertige Agent-Antworten.
+
+    Jeder Eintrag merkt sich die Werkstatt-Generation, unter der er entstanden
+    ist. Ändert sich die Werkstatt-Tabelle, wird die Generation erhöht und alle
+    älteren Einträge gelten als verfallen, ohne die LRU-Liste umzubauen.
+    Die Generation wird vor dem Agent-Lauf gelesen (generation()) und an put
+    übergeben: hat sich die Werkstatt-Tabelle währenddessen geändert, beruht
+    die Antwort auf altem Stand und wird nicht gespeichert.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._werkstatt_generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_puts = 0
+
+    def generation(self) -> int:
+        """Vor get bzw. vor dem Agent-Lauf lesen und an put übergeben"""
+        with self._lock:
+            return self._werkstatt_generation
+
+    def get(self, query: str) -> Optional[str]:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                answer, expires_at, generation = entry
+                if expires_at > time.monotonic() and generation == self._werkstatt_generation:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return answer
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, query: str, answer: str, generation: int):
+        key = normalize_query(query)
+        with self._lock:
+            if generation != self._werkstatt_generation:
+                self.stale_puts += 1
+                return
+            self._entries[key] = (answer, time.monotonic() + self.ttl_seconds, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_werkstatt(self):
+        """Nach Änderungen an der Werkstatt-Tabelle aufrufen"""
+        with self._lock:
+            self._werkstatt_generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_puts": self.stale_puts,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+agent_cache = AgentCache(
+    max_entries=int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=float(os.getenv("AGENT_CACHE_TTL_SECONDS", "3600")),
+)
@@ -0,0 +1,237 @@
+import asyncio
+import os
+import time
+import traceback
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+# ============================================
+# Job-Queue mit begrenztem Worker-Pool für Agent-Anfragen
+# ============================================
+
+class QueueFull(Exception):
+    """Warteschlange voll – der Aufrufer soll es später erneut versuchen (HTTP 429)"""
+
+
+@dataclass
+class AgentJob:
+    id: str
+    run: Optional[Callable[[], Awaitable[Any]]]  # None: Ergebnis stand schon fest (Cache)
+    status: str = "queued"  # queued → running → done | error
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobBackend(ABC):
+    """Schnittstelle für Job-Backends (Einreichen, Abfragen, Start/Stopp).
+
+    Implementierungen: InProcessJobBackend. Ein anderes lokales Backend
+    (z.B. eine Warteschlange in SQLite oder Redis) muss nur diese Methoden
+    bereitstellen und in create_job_backend eingetragen werden.
+    """
+
+    @abstractmethod
+    async def start(self):
+        ...
+
+    @abstractmethod
+    async def stop(self):
+        ...
+
+    @abstractmethod
+    def submit(self, run: Callable[[], Awaitable[Any]]) -> AgentJob:
+        ...
+
+    @abstractmethod
+    def submit_done(self, result: Any) -> AgentJob:
+        """Bereits vorliegendes Ergebnis (z.B. aus dem Agent-Cache) als fertigen Job ablegen, ohne Worker"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[AgentJob]:
+        ...
+
+    @abstractmethod
+    def admit_stream(self):
+        """Wirft QueueFull, wenn ein weiterer Stream keinen Platz mehr bekäme (vor Antwortbeginn aufrufen)"""
+
+    @abstractmethod
+    def slot(self) -> AsyncContextManager[None]:
+        """Einen der Worker-Plätze belegen, für Agent-Läufe außerhalb der Queue (SSE-Streams)"""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class InProcessJobBackend(JobBackend):
+    """asyncio-Queue mit fester Länge und einer festen Zahl von Workern.
+
+    Es laufen höchstens `workers` Agent-Anfragen gleichzeitig, höchstens
+    `max_queue` warten. Alles darüber wird mit QueueFull abgelehnt, statt den
+    Event-Loop und die Threadpools der CRUD-Endpunkte zu belasten.
+    SSE-Streams laufen nicht über die Queue, teilen sich aber dieselben
+    `workers` Plätze (Semaphore) und dasselbe Limit für Wartende.
+    Fertige Jobs bleiben `result_ttl` Sekunden abrufbar.
+    """
+
+    def __init__(self, workers: int, max_queue: int, result_ttl: float):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, AgentJob] = {}
+        self._plaetze: Optional[asyncio.Semaphore] = None
+        self.streams_waiting = 0
+        self.streams = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cached = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._plaetze = asyncio.Semaphore(self.workers)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, run: Callable[[], Awaitable[Any]]) -> AgentJob:
+        if self._queue is None:
+            raise RuntimeError("Job-Backend ist nicht gestartet")
+        self._purge()
+        if self._queue.qsize() + self.streams_waiting >= self.max_queue:
+            self._ablehnen()
+        job = AgentJob(id=uuid.uuid4().hex, run=run)
+        self._queue.put_nowait(job)
+        self._jobs[job.id] = job
+        return job
+
+    def submit_done(self, result: Any) -> AgentJob:
+        self._purge()
+        jetzt = time.time()
+        job = AgentJob(id=uuid.uuid4().hex, run=None, status="done", result=result,
+                       started_at=jetzt, finished_at=jetzt)
+        job.done.set()
+        self._jobs[job.id] = job
+        self.cached += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[AgentJob]:
+        return self._jobs.get(job_id)
+
+    def admit_stream(self):
+        if self._plaetze is None:
+            raise RuntimeError("Job-Backend ist nicht gestartet")
+        if self._plaetze.locked() and self._queue.qsize() + self.streams_waiting >= self.max_queue:
+            self._ablehnen()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        self.streams_waiting += 1
+        try:
+            await self._plaetze.acquire()
+        finally:
+            self.streams_waiting -= 1
+        self.streams += 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self.streams -= 1
+            self._plaetze.release()
+
+    def _ablehnen(self):
+        self.rejected += 1
+        raise QueueFull(f"Zu viele Agent-Anfragen in der Warteschlange ({self.max_queue})")
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                # Plätze teilen sich Jobs und SSE-Streams
+                async with self._plaetze:
+                    await self._ausfuehren(job)
+            finally:
+                self._queue.task_done()
+
+    async def _ausfuehren(self, job: AgentJob):
+        job.status = "running"
+        job.started_at = time.time()
+        self.running += 1
+        try:
+            job.result = await job.run()
+            job.status = "done"
+            self.completed += 1
+        except asyncio.CancelledError:
+            job.status = "error"
+            job.error = "Abgebrochen"
+            raise
+        except Exception as e:
+            print("Agent-Job fehlgeschlagen:", traceback.format_exc())
+            job.status = "error"
+            job.error = str(e)
+            self.failed += 1
+        finally:
+            self.running -= 1
+            job.finished_at = time.time()
+            job.done.set()
+
+    def _purge(self):
+        grenze = time.time() - self.result_ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < grenze]:
+            del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        return {
+            "backend": "inprocess",
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "streams_waiting": self.streams_waiting,
+            "running": self.running,
+            "streams": self.streams,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "cached": self.cached,
+        }
+
+
+def create_job_backend() -> JobBackend:
+    name = os.getenv("AGENT_JOB_BACKEND", "inprocess")
+    if name == "inprocess":
+        return InProcessJobBackend(
+            workers=int(os.getenv("AGENT_JOB_WORKERS", "4")),
+            max_queue=int(os.getenv("AGENT_JOB_MAX_QUEUE", "32")),
+            result_ttl=float(os.getenv("AGENT_JOB_RESULT_TTL_SECONDS", "600")),
+        )
+    raise ValueError(f"Unbekanntes AGENT_JOB_BACKEND: {name}")
+
+
+agent_jobs = create_job_backend()
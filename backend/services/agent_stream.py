@@ -0,0 +1,64 @@
+import json
+import traceback
+from typing import Optional
+from fastapi.responses import StreamingResponse
+from services.agent_cache import agent_cache
+from services.agent_jobs import agent_jobs
+from services.ki_log import ki_log
+from services.werkstatt_web_agent import stream_werkstatt_agent
+
+
+# ============================================
+# Agent-Antworten als Server-Sent Events
+# ============================================
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def agent_sse_response(query: str, extra: Optional[dict] = None) -> StreamingResponse:
+    """Streamt den Werkstatt-Agenten als text/event-stream.
+
+    Ereignisse: start (sofort), classification, db_results, web_results,
+    token (Stücke der Antwort von Agent 2), done (vollständige Antwort) bzw.
+    error. Die KIAktion wird erst vorgemerkt, wenn die Antwort vollständig ist.
+    Bei einem Cache-Fehlschlag belegt der Agent währenddessen einen Platz des
+    Job-Pools (agent_jobs.slot); ist keiner frei und die Warteschlange voll,
+    wirft der Aufruf QueueFull, bevor die Antwort beginnt. Cache-Treffer
+    werden immer sofort gestreamt.
+    """
+    generation = agent_cache.generation()
+    treffer = agent_cache.get(query)
+    if treffer is None:
+        agent_jobs.admit_stream()
+
+    async def generate():
+        yield sse_event("start", {"query": query})
+
+        answer = treffer
+        if answer is not None:
+            yield sse_event("token", {"text": answer, "cached": True})
+        else:
+            try:
+                async with agent_jobs.slot():
+                    async for ereignis in stream_werkstatt_agent(query):
+                        name = ereignis.pop("event")
+                        if name == "done":
+                            answer = ereignis["response"]
+                        else:
+                            yield sse_event(name, ereignis)
+            except Exception as e:
+                print("Agent-Stream fehlgeschlagen:", traceback.format_exc())
+                yield sse_event("error", {"detail": str(e)})
+                return
+            agent_cache.put(query, answer, generation)
+
+        ki_log.log(query, answer)
+        yield sse_event("done", {"response": answer, **(extra or {})})
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        # Proxies (z.B. nginx) sollen die Ereignisse nicht puffern
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,154 @@
+import csv
+import io
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.aenderungen import aenderungen_erfassen
+
+
+# ============================================
+# Bulk-Import (JSON-Array, NDJSON, CSV)
+# ============================================
+
+BATCH_SIZE = 1000
+
+# (Zeilennummer, Rohdaten) – Zeilennummern beginnen bei 1
+RawRow = Tuple[int, Any]
+
+
+def parse_rows(body: bytes, content_type: str) -> List[RawRow]:
+    """Zerlegt den Request-Body je nach Content-Type in einzelne Zeilen"""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Ungültiges UTF-8: {e}")
+    content_type = content_type.split(";")[0].strip().lower()
+
+    if content_type == "text/csv":
+        reader = csv.DictReader(io.StringIO(text))
+        # Leere CSV-Zellen als "nicht gesetzt" behandeln, damit Optional-Felder greifen
+        return [
+            (nr, {k: (v if v != "" else None) for k, v in row.items()})
+            for nr, row in enumerate(reader, start=1)
+        ]
+
+    if content_type in ("application/x-ndjson", "application/ndjson"):
+        rows = []
+        for nr, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append((nr, json.loads(line)))
+            except json.JSONDecodeError as e:
+                rows.append((nr, e))
+        return rows
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Ungültiges JSON: {e}")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Erwartet wird ein JSON-Array")
+    return list(enumerate(data, start=1))
+
+
+def batches(rows: List[RawRow], size: int) -> Iterable[List[RawRow]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+async def check_foreign_keys(db: AsyncSession, valid: list, errors: list, foreign_keys: Dict[str, Any]) -> list:
+    """Prüft alle Fremdschlüssel eines Batches mit je einer IN-Abfrage pro Spalte"""
+    for column, ref_model in foreign_keys.items():
+        wanted = {values[column] for _, values in valid if values.get(column) is not None}
+        if not wanted:
+            continue
+        existing = set(await db.scalars(select(ref_model.id).where(ref_model.id.in_(wanted))))
+        still_valid = []
+        for nr, values in valid:
+            if values.get(column) is not None and values[column] not in existing:
+                errors.append({"row": nr, "detail": f"{column}={values[column]} existiert nicht"})
+            else:
+                still_valid.append((nr, values))
+        valid = still_valid
+    return valid
+
+
+async def bulk_insert(
+    db: AsyncSession,
+    model,
+    create_schema: Type[BaseModel],
+    rows: List[RawRow],
+    foreign_keys: Optional[Dict[str, Any]] = None,
+    defaults: Optional[Dict[str, Any]] = None,
+    prepare: Optional[Callable[[dict], None]] = None,
+    on_commit: Optional[Callable[[List[dict]], None]] = None,
+) -> dict:
+    """Validiert die Zeilen batchweise und schreibt sie mit mehrzeiligen INSERTs.
+
+    Alle Batches laufen in einer Transaktion; ungültige Zeilen werden
+    übersprungen und im Fehlerbericht aufgeführt. `prepare` kann jede gültige
+    Zeile vor dem INSERT ergänzen (z.B. abgeleitete Spalten). `on_commit`
+    bekommt nach dem Commit die geschriebenen Zeilen (inkl. `id`), z.B. für
+    Caches/Indizes.
+    """
+    started = time.perf_counter()
+    created_ids: List[int] = []
+    created_rows: List[dict] = []
+    errors: List[dict] = []
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+
+    try:
+        for batch in batches(rows, BATCH_SIZE):
+            valid = []
+            for nr, raw in batch:
+                if isinstance(raw, Exception):
+                    errors.append({"row": nr, "detail": f"Ungültiges JSON: {raw}"})
+                    continue
+                try:
+                    values = create_schema.model_validate(raw).model_dump()
+                except ValidationError as e:
+                    errors.append({"row": nr, "detail": e.errors(include_url=False, include_context=False)})
+                    continue
+                for key, default in (defaults or {}).items():
+                    if values.get(key) is None:
+                        values[key] = default
+                if prepare:
+                    prepare(values)
+                valid.append((nr, values))
+
+            if foreign_keys:
+                valid = await check_foreign_keys(db, valid, errors, foreign_keys)
+
+            if valid:
+                ids = (await db.scalars(stmt, [values for _, values in valid])).all()
+                created_ids.extend(ids)
+                created_rows.extend(dict(values, id=new_id) for (_, values), new_id in zip(valid, ids))
+
+        await aenderungen_erfassen(db, model.__tablename__, created_ids)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    if on_commit and created_rows:
+        on_commit(created_rows)
+
+    elapsed = time.perf_counter() - started
+    errors.sort(key=lambda e: e["row"])
+    return {
+        "created_ids": created_ids,
+        "errors": errors,
+        "rows_received": len(rows),
+        "rows_per_second": round(len(created_ids) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+async def handle_bulk_upload(request: Request, db: AsyncSession, model, create_schema: Type[BaseModel], **kwargs) -> dict:
+    """Liest den Upload und führt den Import aus"""
+    rows = parse_rows(await request.body(), request.headers.get("content-type", "application/json"))
+    return await bulk_insert(db, model, create_schema, rows, **kwargs)
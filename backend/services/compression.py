@@ -0,0 +1,178 @@
+import os
+import zlib
+from abc import ABC, abstractmethod
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional, ohne Paket nur gzip
+    brotli = None
+
+
+# ============================================
+# Komprimierung der Antworten (Brotli oder gzip)
+# ============================================
+# Antworten ab `minimum_size` Bytes werden komprimiert, kleinere und
+# Server-Sent Events bleiben unverändert. Gestreamte Antworten (NDJSON)
+# werden pro Chunk geflusht, damit der Client jede Zeile sofort bekommt.
+# Eine vorhandene ETag bekommt die Kodierung als Suffix ("...-gzip"),
+# da sich die Bytes der Darstellung unterscheiden (starke ETag).
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1000"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+KODIERUNGEN = ("br", "gzip")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Bevorzugte unterstützte Kodierung aus Accept-Encoding (q=0 schließt aus)"""
+    akzeptiert = set()
+    for teil in accept_encoding.lower().split(","):
+        name, _, params = teil.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        akzeptiert.add(name.strip())
+    if brotli is not None and "br" in akzeptiert:
+        return "br"
+    if "gzip" in akzeptiert:
+        return "gzip"
+    return None
+
+
+class Kompressor(ABC):
+    """Zustand der Komprimierung einer einzelnen Antwort"""
+
+    content_encoding: str
+
+    @abstractmethod
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        """Nächstes Stück komprimieren; mit more_body=False wird der Strom abgeschlossen"""
+
+
+class GzipKompressor(Kompressor):
+    content_encoding = "gzip"
+
+    def __init__(self, level: int):
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip-Header
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self._zlib.compress(body)
+        return data + self._zlib.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+
+class BrotliKompressor(Kompressor):
+    content_encoding = "br"
+
+    def __init__(self, quality: int):
+        self._brotli = brotli.Compressor(quality=quality)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self._brotli.process(body)
+        return data + (self._brotli.flush() if more_body else self._brotli.finish())
+
+
+class _KomprimiertesSenden:
+    """send-Wrapper für eine Antwort
+
+    Der Header (http.response.start) wird zurückgehalten, bis der erste
+    Body-Teil zeigt, ob komprimiert wird. Ohne `kompressor` (Client akzeptiert
+    keine Kodierung) bleibt der Body unverändert, bekommt aber ebenfalls
+    `Vary: Accept-Encoding`.
+    """
+
+    def __init__(self, send: Send, kompressor: Optional[Kompressor], minimum_size: int):
+        self.send = send
+        self.kompressor = kompressor
+        self.minimum_size = minimum_size
+        self._start: Optional[Message] = None
+        self._durchreichen = False
+        self._komprimieren = False
+
+    async def __call__(self, message: Message):
+        if message["type"] == "http.response.start":
+            self._start = message
+            headers = Headers(raw=message["headers"])
+            # Schon kodiert oder Server-Sent Events: unverändert weitergeben
+            self._durchreichen = (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith("text/event-stream")
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            # z.B. http.response.pathsend: unverändert
+            await self._header_senden()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self._start is None:
+            # Folgende Teile einer gestreamten Antwort
+            if self._komprimieren:
+                message["body"] = self.kompressor.compress(body, more_body)
+            await self.send(message)
+            return
+
+        if not self._durchreichen and (more_body or len(body) >= self.minimum_size):
+            headers = MutableHeaders(raw=list(self._start["headers"]))
+            headers.add_vary_header("Accept-Encoding")
+            if self.kompressor is not None:
+                self._komprimieren = True
+                headers["Content-Encoding"] = self.kompressor.content_encoding
+                # Andere Bytes als die unkomprimierte Darstellung: eigene (starke) ETag
+                etag = headers.get("etag")
+                if etag and etag.endswith('"'):
+                    headers["etag"] = f'{etag[:-1]}-{self.kompressor.content_encoding}"'
+                message["body"] = self.kompressor.compress(body, more_body)
+                if more_body:
+                    del headers["content-length"]
+                else:
+                    headers["content-length"] = str(len(message["body"]))
+            self._start["headers"] = headers.raw
+        await self._header_senden()
+        await self.send(message)
+
+    async def _header_senden(self):
+        if self._start is not None:
+            start, self._start = self._start, None
+            await self.send(start)
+
+
+class CompressionMiddleware:
+    """Reine ASGI-Middleware (ohne Starlette-Interna), Kodierung nach Accept-Encoding"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_BYTES,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _kompressor(self, encoding: Optional[str]) -> Optional[Kompressor]:
+        if encoding == "br":
+            return BrotliKompressor(self.brotli_quality)
+        if encoding == "gzip":
+            return GzipKompressor(self.gzip_level)
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        senden = _KomprimiertesSenden(send, self._kompressor(encoding), self.minimum_size)
+        await self.app(scope, receive, senden)
@@ -0,0 +1,200 @@
+import csv
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+# ============================================
+# Regelbasierte Vorklassifizierung (spart Agent 1)
+# ============================================
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+_UMLAUTE = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_TOKEN_RE = re.compile(r"\w+")
+_PLZ_RE = re.compile(r"(?<!\d)(\d{5})(?!\d)")
+
+# Werkstatt-Substantive: als Wortteil (Autowerkstatt, Kfz-Werkstätten) ...
+WERKSTATT_TEILWOERTER = ("werkstatt", "werkstaett", "autohaus", "autohaeuser")
+# ... bzw. nur als ganzes Wort ("kfz" steckt auch in "Kfz-Steuer")
+WERKSTATT_WOERTER = {"kfz", "mechaniker", "mechanikerin", "kfzmeister", "reparaturbetrieb"}
+# Suchverben; sicher ist nur Suchverb + Werkstatt-Substantiv + Ort
+SUCH_WOERTER = {
+    "finde", "finden", "suche", "suchen", "empfiehl", "empfehle", "empfehlen", "empfehlung",
+    "brauche", "benoetige", "gesucht", "zeig", "zeige",
+}
+# Themen rund ums Auto, die keine Werkstattsuche sind: immer an das LLM
+NEGATIV_TEILWOERTER = ("steuer", "versicher", "beschwer", "reklamation", "schadenersatz", "anwalt")
+NEGATIV_WORTANFAENGE = ("job", "stelle", "ausbildung", "praktikum", "bewerb", "gehalt", "klage", "verklag")
+NEGATIV_PHRASEN = ("kaputt gemacht", "kaputtgemacht", "falsch repariert", "meine werkstatt", "meiner werkstatt")
+
+# Ortsnamen, die auch normale Wörter sind: nur mit großem Anfangsbuchstaben als Ort werten
+MEHRDEUTIGE_ORTE = {
+    "essen", "hof", "lage", "forst", "horn", "senden", "wetter", "leer", "haar", "aue",
+    "heide", "wangen", "weiden", "waren", "kamen", "norden", "enger", "werder", "springe",
+    "singen", "damme", "much", "roth", "brake", "hille", "wedel", "weil", "achim", "schmelz",
+    "lohne", "halle", "bergen", "laufen",
+}
+
+MARKEN = {
+    "vw": "VW", "volkswagen": "VW", "bmw": "BMW", "audi": "Audi", "mercedes": "Mercedes",
+    "opel": "Opel", "ford": "Ford", "skoda": "Skoda", "seat": "Seat", "cupra": "Cupra",
+    "toyota": "Toyota", "renault": "Renault", "peugeot": "Peugeot", "citroen": "Citroën",
+    "fiat": "Fiat", "hyundai": "Hyundai", "kia": "Kia", "tesla": "Tesla", "porsche": "Porsche",
+    "mazda": "Mazda", "nissan": "Nissan", "volvo": "Volvo", "dacia": "Dacia", "mini": "Mini",
+    "smart": "Smart", "honda": "Honda", "suzuki": "Suzuki", "mitsubishi": "Mitsubishi",
+}
+
+ANFORDERUNGEN = {
+    "guenstig": "günstig", "billig": "günstig", "preiswert": "günstig",
+    "gut": "gute Bewertungen", "gute": "gute Bewertungen", "bewertungen": "gute Bewertungen",
+    "spezialist": "Spezialist", "schnell": "schnell", "sofort": "schnell",
+}
+
+
+def _fold(token: str) -> str:
+    return token.casefold().translate(_UMLAUTE)
+
+
+def _ort_aliase(ort: str) -> List[str]:
+    """Kurzformen: "Halle (Saale)" → "Halle", "Frankfurt am Main" → "Frankfurt" """
+    aliase = [ort]
+    kurz = re.sub(r"\s*\(.*?\)", "", ort).strip()
+    for trenner in (" am ", " an der ", " im ", " in ", " bei ", " vor der ", " unter "):
+        if trenner in kurz:
+            kurz = kurz.split(trenner)[0]
+    if kurz != ort:
+        aliase.append(kurz)
+    return aliase
+
+
+class FastClassifier:
+    """Erkennt eindeutige Werkstattsuchen lokal (PLZ/Ort + Suchverb + Werkstatt-Substantiv).
+
+    Liefert denselben Text wie Agent 1, damit extract_search_query und die
+    Weiterleitungsprüfung unverändert funktionieren. Bei Unsicherheit wird
+    None zurückgegeben und der Aufrufer fragt das LLM.
+    """
+
+    def __init__(self, orte_path: str, leitregionen_path: str, enabled: bool = True):
+        self.enabled = enabled
+        self._orte: Dict[Tuple[str, ...], str] = {}
+        self._max_phrase = 1
+        self._leitregionen = set()
+        self._lock = threading.Lock()
+        self.fast_path = 0
+        self.llm_fallback = 0
+
+        with open(orte_path, encoding="utf-8") as f:
+            # Nach Einwohnern absteigend, damit bei gleichen Kurzformen die größere Stadt gewinnt
+            rows = sorted(csv.DictReader(f), key=lambda r: -int(r["einwohner"]))
+        for row in rows:
+            for alias in _ort_aliase(row["ort"]):
+                key = tuple(_fold(t) for t in _TOKEN_RE.findall(alias))
+                if key and key not in self._orte:
+                    self._orte[key] = row["ort"]
+                    self._max_phrase = max(self._max_phrase, len(key))
+
+        with open(leitregionen_path, encoding="utf-8") as f:
+            self._leitregionen = {row["leitregion"] for row in csv.DictReader(f)}
+
+    # ---------------- Erkennung ----------------
+    def find_plz(self, text: str) -> Optional[str]:
+        for plz in _PLZ_RE.findall(text):
+            if plz[:2] in self._leitregionen:
+                return plz
+        return None
+
+    def find_ort(self, text: str) -> Optional[str]:
+        tokens = _TOKEN_RE.findall(text)
+        folded = [_fold(t) for t in tokens]
+        for start in range(len(tokens)):
+            for length in range(min(self._max_phrase, len(tokens) - start), 0, -1):
+                key = tuple(folded[start:start + length])
+                ort = self._orte.get(key)
+                if ort is None:
+                    continue
+                if length == 1 and key[0] in MEHRDEUTIGE_ORTE and not tokens[start][0].isupper():
+                    continue
+                return ort
+        return None
+
+    def find_location(self, text: str) -> Optional[str]:
+        """PLZ und/oder Ort aus dem Text, z.B. "10115 Berlin", "10115" oder "Berlin" """
+        teile = [t for t in (self.find_plz(text), self.find_ort(text)) if t]
+        return " ".join(teile) if teile else None
+
+    def _fahrzeugtyp(self, tokens: List[str]) -> Optional[str]:
+        for i, token in enumerate(tokens):
+            marke = MARKEN.get(_fold(token))
+            if marke:
+                if i + 1 < len(tokens) and tokens[i + 1][:1].isupper() and _fold(tokens[i + 1]) not in SUCH_WOERTER:
+                    return f"{marke} {tokens[i + 1]}"
+                return marke
+        return None
+
+    # ---------------- Klassifizierung ----------------
+    @staticmethod
+    def _negativ(folded: List[str]) -> bool:
+        """Steuer, Versicherung, Jobs, Beschwerden über eine Werkstatt usw."""
+        text = " ".join(folded)
+        return (
+            any(w in t for t in folded for w in NEGATIV_TEILWOERTER)
+            or any(t.startswith(NEGATIV_WORTANFAENGE) for t in folded)
+            or any(p in text for p in NEGATIV_PHRASEN)
+        )
+
+    def classify(self, user_query: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        tokens = _TOKEN_RE.findall(user_query)
+        folded = [_fold(t) for t in tokens]
+        werkstatt_wort = next(
+            (t for t in folded if t in WERKSTATT_WOERTER or any(w in t for w in WERKSTATT_TEILWOERTER)), None
+        )
+        such_wort = next((t for t in folded if t in SUCH_WOERTER), None)
+        ort = self.find_location(user_query) if werkstatt_wort and such_wort else None
+
+        if not ort or self._negativ(folded):
+            self._count(fast=False)
+            return None
+
+        self._count(fast=True)
+        fahrzeug = self._fahrzeugtyp(tokens) or "nicht angegeben"
+        anforderungen = sorted({ANFORDERUNGEN[t] for t in folded if t in ANFORDERUNGEN})
+        return (
+            "KATEGORIE: WERKSTATT_SUCHE\n\n"
+            "WEITERLEITEN: JA\n\n"
+            "EXTRAHIERTE PARAMETER:\n"
+            f"- Ort/PLZ: {ort}\n"
+            f"- Fahrzeugtyp: {fahrzeug}\n"
+            f"- Spezielle Anforderungen: {', '.join(anforderungen) or 'keine'}\n\n"
+            f"BEGRÜNDUNG: Regelbasiert erkannt (\"{such_wort}\" + \"{werkstatt_wort}\", Ort/PLZ \"{ort}\")\n\n"
+            f"ANWEISUNG FÜR AGENT 2: Passende Werkstätten in {ort} aus Datenbank und Internet empfehlen."
+        )
+
+    def _count(self, fast: bool):
+        with self._lock:
+            if fast:
+                self.fast_path += 1
+            else:
+                self.llm_fallback += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.fast_path + self.llm_fallback
+            return {
+                "enabled": self.enabled,
+                "fast_path": self.fast_path,
+                "llm_fallback": self.llm_fallback,
+                "fast_path_rate": round(self.fast_path / total, 3) if total else 0.0,
+            }
+
+
+fast_classifier = FastClassifier(
+    orte_path=os.path.join(DATA_DIR, "orte.csv"),
+    leitregionen_path=os.path.join(DATA_DIR, "plz_leitregionen.csv"),
+    enabled=os.getenv("AGENT_FAST_PATH", "1") != "0",
+)
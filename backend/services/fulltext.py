@@ -0,0 +1,181 @@
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.pagination import NEXT_CURSOR_HEADER
+
+
+# ============================================
+# Volltextsuche über Aufträge und KI-Aktionen
+# ============================================
+# Postgres: generierte tsvector-Spalte (deutsche Wortstämme) + GIN-Index.
+# SQLite:   FTS5-Tabelle mit Triggern (Präfixsuche statt Stemming).
+# In beiden Fällen pflegt die Datenbank den Index beim Schreiben selbst.
+
+_POSTGRES_DDL = [
+    "ALTER TABLE auftrag ADD COLUMN IF NOT EXISTS suchvektor tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('german', coalesce(beschreibung, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_auftrag_suchvektor ON auftrag USING GIN (suchvektor)",
+    "ALTER TABLE ki_aktionen ADD COLUMN IF NOT EXISTS suchvektor tsvector GENERATED ALWAYS AS "
+    "(setweight(to_tsvector('german', coalesce(nachricht, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(antwort, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_ki_aktionen_suchvektor ON ki_aktionen USING GIN (suchvektor)",
+]
+
+# (FTS-Tabelle, Quelltabelle, Spalten)
+_SQLITE_FTS = [
+    ("auftrag_fts", "auftrag", ["beschreibung"]),
+    ("ki_aktionen_fts", "ki_aktionen", ["nachricht", "antwort"]),
+]
+
+
+def _sqlite_ddl(fts: str, table: str, columns: List[str]) -> List[str]:
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        # Bestehende Zeilen einmalig übernehmen
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def ensure_fulltext(bind):
+    """Legt Suchspalten/-tabellen, Indizes und Trigger an (idempotent)"""
+    with bind.begin() as conn:
+        if bind.dialect.name == "postgresql":
+            for stmt in _POSTGRES_DDL:
+                conn.execute(text(stmt))
+        elif bind.dialect.name == "sqlite":
+            for fts, table, columns in _SQLITE_FTS:
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts}
+                ).first()
+                if not exists:
+                    for stmt in _sqlite_ddl(fts, table, columns):
+                        conn.execute(text(stmt))
+
+
+# ---------------- Suche ----------------
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _fts5_query(q: str) -> str:
+    """"Motorschaden VW" → '"Motorschaden"* AND "VW"*' (alle Begriffe, als Präfix)"""
+    return " AND ".join(f'"{t}"*' for t in _TOKEN_RE.findall(q))
+
+
+def _parse_cursor(after: Optional[str]) -> Optional[Tuple[float, int]]:
+    if not after:
+        return None
+    try:
+        rang, last_id = after.rsplit("_", 1)
+        return float(rang), int(last_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor")
+
+
+def _inner_query(dialect: str, typ: str) -> str:
+    """Treffer mit Rang (höher = besser) und Auszug, noch ohne Filter/Sortierung"""
+    if typ == "auftraege":
+        if dialect == "postgresql":
+            return (
+                "SELECT a.id, ts_rank(a.suchvektor, q)::float8 AS rang, a.beschreibung AS auszug,"
+                " a.status, a.werkstatt_id, a.fahrzeug_id, a.erstellt_am, a.id AS auftrag_id"
+                " FROM auftrag a, websearch_to_tsquery('german', :q) q WHERE a.suchvektor @@ q"
+            )
+        return (
+            "SELECT a.id, -bm25(auftrag_fts) AS rang,"
+            " snippet(auftrag_fts, 0, '[', ']', '…', 16) AS auszug,"
+            " a.status, a.werkstatt_id, a.fahrzeug_id, a.erstellt_am, a.id AS auftrag_id"
+            " FROM auftrag_fts JOIN auftrag a ON a.id = auftrag_fts.rowid WHERE auftrag_fts MATCH :q"
+        )
+
+    if dialect == "postgresql":
+        return (
+            "SELECT k.id, ts_rank(k.suchvektor, q)::float8 AS rang,"
+            " k.nachricht || ' → ' || coalesce(k.antwort, '') AS auszug,"
+            " a.status, a.werkstatt_id, a.fahrzeug_id, k.erstellt_am, k.auftrag_id"
+            " FROM ki_aktionen k CROSS JOIN websearch_to_tsquery('german', :q) q"
+            " LEFT JOIN auftrag a ON a.id = k.auftrag_id WHERE k.suchvektor @@ q"
+        )
+    return (
+        "SELECT k.id, -bm25(ki_aktionen_fts) AS rang,"
+        " snippet(ki_aktionen_fts, -1, '[', ']', '…', 16) AS auszug,"
+        " a.status, a.werkstatt_id, a.fahrzeug_id, k.erstellt_am, k.auftrag_id"
+        " FROM ki_aktionen_fts JOIN ki_aktionen k ON k.id = ki_aktionen_fts.rowid"
+        " LEFT JOIN auftrag a ON a.id = k.auftrag_id WHERE ki_aktionen_fts MATCH :q"
+    )
+
+
+async def volltext_suche(
+    db: AsyncSession,
+    response: Response,
+    q: str,
+    typ: str,
+    limit: int,
+    after: Optional[str] = None,
+    status: Optional[str] = None,
+    werkstatt_id: Optional[int] = None,
+    marke: Optional[str] = None,
+    von: Optional[date] = None,
+    bis: Optional[date] = None,
+) -> List[dict]:
+    """Treffer nach Rang absteigend, Keyset-Cursor "<rang>_<id>" im Header X-Next-Cursor"""
+    if not _TOKEN_RE.search(q):
+        raise HTTPException(status_code=400, detail="Suchbegriff fehlt")
+    dialect = db.bind.dialect.name
+    params = {"q": q if dialect == "postgresql" else _fts5_query(q)}
+
+    filters = []
+    if status is not None:
+        filters.append("lower(t.status) = lower(:status)")
+        params["status"] = status
+    if werkstatt_id is not None:
+        filters.append("t.werkstatt_id = :werkstatt_id")
+        params["werkstatt_id"] = werkstatt_id
+    if marke is not None:
+        filters.append("t.fahrzeug_id IN (SELECT id FROM fahrzeug WHERE lower(marke) = lower(:marke))")
+        params["marke"] = marke
+    if von is not None:
+        filters.append("t.erstellt_am >= :von")
+        params["von"] = von
+    if bis is not None:
+        filters.append("t.erstellt_am <= :bis")
+        params["bis"] = bis
+    cursor = _parse_cursor(after)
+    if cursor is not None:
+        filters.append("(t.rang < :after_rang OR (t.rang = :after_rang AND t.id > :after_id))")
+        params["after_rang"], params["after_id"] = cursor
+
+    where = f" WHERE {' AND '.join(filters)}" if filters else ""
+    if dialect == "postgresql":
+        # Auszug mit markierten Treffern, nur für die Zeilen der Seite berechnet
+        columns = (
+            "t.id, t.rang, ts_headline('german', t.auszug, websearch_to_tsquery('german', :q),"
+            " 'StartSel=[, StopSel=], MaxWords=30, MinWords=10') AS auszug,"
+            " t.status, t.werkstatt_id, t.fahrzeug_id, t.erstellt_am, t.auftrag_id"
+        )
+    else:
+        columns = "t.*"
+    sql = (
+        f"SELECT {columns} FROM ({_inner_query(dialect, typ)}) t{where}"
+        " ORDER BY t.rang DESC, t.id LIMIT :limit"
+    )
+    params["limit"] = limit + 1
+    rows = [dict(r) for r in (await db.execute(text(sql), params)).mappings()]
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = f"{rows[-1]['rang']!r}_{rows[-1]['id']}"
+    return rows
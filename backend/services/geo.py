@@ -0,0 +1,196 @@
+import csv
+import math
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import or_, select, update
+from services.aenderungen import aenderungen_erfassen
+from services.fast_classifier import DATA_DIR, fast_classifier
+from services.http_cache import tabellen_versionen
+import models
+
+
+# ============================================
+# Koordinaten zu PLZ/Ort und räumlicher Index
+# ============================================
+
+ERDRADIUS_KM = 6371.0088
+KM_PRO_GRAD_LAT = 110.574
+KM_PRO_GRAD_LON_AEQUATOR = 111.320
+
+
+# Herkunft der Koordinaten einer Werkstatt (Spalte werkstatt.geo_quelle), genaueste
+# zuerst. "manuell": beim Anlegen mitgeschickt, wird nie neu berechnet.
+GEO_QUELLEN = ("manuell", "plz", "ort", "leitregion")
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dlat, dlon = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dlon / 2) ** 2
+    return 2 * ERDRADIUS_KM * math.asin(math.sqrt(a))
+
+
+class PlzGeocoder:
+    """Koordinaten aus PLZ und Ort, komplett offline.
+
+    Reihenfolge: Mittelpunkt der fünfstelligen PLZ (`plz_koordinaten.csv`),
+    dann Ortsname aus dem Ortsverzeichnis, zuletzt das Zentrum der
+    zweistelligen Leitregion. Die Leitregion ist grob (Größenordnung 50 km)
+    und nur der Notnagel für PLZ, die im Datensatz fehlen.
+    """
+
+    def __init__(self, orte_path: str, leitregionen_path: str, plz_path: Optional[str] = None):
+        with open(orte_path, encoding="utf-8") as f:
+            self._orte = {row["ort"]: (float(row["lat"]), float(row["lon"])) for row in csv.DictReader(f)}
+        with open(leitregionen_path, encoding="utf-8") as f:
+            self._leitregionen = {
+                row["leitregion"]: (float(row["lat"]), float(row["lon"])) for row in csv.DictReader(f)
+            }
+        self._plz: Dict[str, Tuple[float, float]] = {}
+        if plz_path and os.path.exists(plz_path):
+            with open(plz_path, encoding="utf-8") as f:
+                self._plz = {row["plz"]: (float(row["lat"]), float(row["lon"])) for row in csv.DictReader(f)}
+
+    def locate_plz(self, plz: Optional[str]) -> Optional[Tuple[float, float]]:
+        plz = (plz or "").strip()
+        if plz in self._plz:
+            return self._plz[plz]
+        if len(plz) == 5 and plz.isdigit():
+            return self._leitregionen.get(plz[:2])
+        return None
+
+    def locate_ort(self, ort: Optional[str]) -> Optional[Tuple[float, float]]:
+        name = fast_classifier.find_ort(ort) if ort else None
+        return self._orte.get(name) if name else None
+
+    def locate(self, plz: Optional[str], ort: Optional[str]) -> Optional[Tuple[float, float]]:
+        """Koordinaten einer Adresse (genaueste verfügbare Quelle zuerst)"""
+        treffer = self.locate_mit_quelle(plz, ort)
+        return treffer[:2] if treffer else None
+
+    def locate_mit_quelle(self, plz: Optional[str], ort: Optional[str]) -> Optional[Tuple[float, float, str]]:
+        """Wie locate, zusätzlich mit der Quelle aus GEO_QUELLEN"""
+        plz = (plz or "").strip()
+        if plz in self._plz:
+            return (*self._plz[plz], "plz")
+        punkt = self.locate_ort(ort)
+        if punkt:
+            return (*punkt, "ort")
+        punkt = self.locate_plz(plz)
+        if punkt:
+            return (*punkt, "leitregion")
+        return None
+
+    def herkunft(self, plz: Optional[str], ort: Optional[str], lat: float, lon: float) -> str:
+        """Quelle vorhandener Koordinaten ohne geo_quelle (vor Einführung der Spalte gespeichert)"""
+        plz = (plz or "").strip()
+        kandidaten = (
+            ("plz", self._plz.get(plz)),
+            ("ort", self.locate_ort(ort)),
+            ("leitregion", self._leitregionen.get(plz[:2]) if len(plz) == 5 else None),
+        )
+        for quelle, punkt in kandidaten:
+            if punkt and abs(punkt[0] - lat) < 1e-6 and abs(punkt[1] - lon) < 1e-6:
+                return quelle
+        return "manuell"
+
+    def locate_text(self, text: str) -> Optional[Tuple[float, float]]:
+        """Koordinaten zu PLZ oder Ort, die in einem Freitext vorkommen"""
+        return self.locate(fast_classifier.find_plz(text), text)
+
+
+class GeoGrid:
+    """Räumlicher Index als Gitter aus Zellen mit mindestens `cell_km` Kantenlänge.
+
+    Für die nächsten N Punkte werden nur Zellringe um den Mittelpunkt
+    abgesucht, bis N Treffer näher liegen als der nächste Ring überhaupt
+    sein kann. Die Längengrad-Breite der Zellen ist für die nördlichste
+    Breite (`max_lat`) berechnet, südlich davon sind die Zellen breiter;
+    die Abbruchbedingung bleibt damit gültig.
+    """
+
+    def __init__(self, cell_km: float = 10.0, max_lat: float = 55.1):
+        self.cell_km = cell_km
+        self._dlat = cell_km / KM_PRO_GRAD_LAT
+        self._dlon = cell_km / (KM_PRO_GRAD_LON_AEQUATOR * math.cos(math.radians(max_lat)))
+        self._cells: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self._points: Dict[int, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self._dlat)), int(math.floor(lon / self._dlon))
+
+    def add(self, key: int, lat: float, lon: float):
+        self.remove(key)
+        self._points[key] = (lat, lon)
+        self._cells[self._cell(lat, lon)].add(key)
+
+    def remove(self, key: int):
+        alt = self._points.pop(key, None)
+        if alt is not None:
+            self._cells[self._cell(*alt)].discard(key)
+
+    def nearest(self, lat: float, lon: float, radius_km: float, limit: int) -> List[Tuple[float, int]]:
+        """Bis zu `limit` (Entfernung in km, key) innerhalb von `radius_km`, nächste zuerst"""
+        if not self._points:
+            return []
+        ci, cj = self._cell(lat, lon)
+        max_ring = int(math.ceil(radius_km / self.cell_km)) + 1
+        treffer: List[Tuple[float, int]] = []
+
+        for ring in range(max_ring + 1):
+            for i in range(ci - ring, ci + ring + 1):
+                for j in range(cj - ring, cj + ring + 1):
+                    if max(abs(i - ci), abs(j - cj)) != ring:
+                        continue
+                    for key in self._cells.get((i, j), ()):
+                        distanz = haversine_km(lat, lon, *self._points[key])
+                        if distanz <= radius_km:
+                            treffer.append((distanz, key))
+            # Alles außerhalb von Ring `ring` ist mindestens ring * cell_km entfernt
+            treffer.sort()
+            if len(treffer) >= limit and treffer[limit - 1][0] <= ring * self.cell_km:
+                break
+        return treffer[:limit]
+
+
+async def backfill_koordinaten(db):
+    """Beim Start: fehlende Koordinaten nachtragen, grobe verbessern
+
+    Werkstätten, die nur über Ort oder Leitregion verortet sind, werden neu
+    geocodiert. Liefert der Datensatz inzwischen eine genauere Quelle (z.B. nach
+    einer Aktualisierung von plz_koordinaten.csv), werden die Koordinaten ersetzt.
+    """
+    W = models.Werkstatt
+    rows = (await db.execute(
+        select(W.id, W.plz, W.ort, W.lat, W.lon, W.geo_quelle)
+        .where(or_(W.lat.is_(None), W.geo_quelle.is_(None), W.geo_quelle.in_(("ort", "leitregion"))))
+    )).all()
+    werte, verschoben = [], []
+    for werkstatt_id, plz, ort, lat, lon, quelle in rows:
+        if lat is not None and quelle is None:
+            quelle = plz_geocoder.herkunft(plz, ort, lat, lon)
+        treffer = plz_geocoder.locate_mit_quelle(plz, ort)
+        if treffer and (lat is None or GEO_QUELLEN.index(treffer[2]) < GEO_QUELLEN.index(quelle)):
+            werte.append({"id": werkstatt_id, "lat": treffer[0], "lon": treffer[1], "geo_quelle": treffer[2]})
+            verschoben.append(werkstatt_id)
+        elif lat is not None:
+            # Nur die Herkunft nachtragen, Koordinaten bleiben
+            werte.append({"id": werkstatt_id, "lat": lat, "lon": lon, "geo_quelle": quelle})
+    if werte:
+        await db.execute(update(W), werte)
+        await aenderungen_erfassen(db, "werkstatt", verschoben, "update")
+        await db.commit()
+        if verschoben:
+            # ETags der Werkstatt-Listen verfallen, Lesezugriffe warten auf die Replika
+            tabellen_versionen.bump("werkstatt")
+
+
+plz_geocoder = PlzGeocoder(
+    orte_path=os.path.join(DATA_DIR, "orte.csv"),
+    leitregionen_path=os.path.join(DATA_DIR, "plz_leitregionen.csv"),
+    plz_path=os.getenv("PLZ_KOORDINATEN_PATH", os.path.join(DATA_DIR, "plz_koordinaten.csv")),
+)
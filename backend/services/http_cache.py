@@ -0,0 +1,91 @@
+import hashlib
+import re
+import secrets
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, Response
+from services.compression import KODIERUNGEN
+
+
+# ============================================
+# Tabellen-Versionen und bedingte GETs (ETag / If-None-Match)
+# ============================================
+# Jeder Schreibzugriff erhöht nach dem Commit die Version seiner Tabelle(n).
+# Die ETag einer Liste besteht aus Instanz-Kennung, den Versionen der
+# gelesenen Tabellen und einem Hash von Pfad + Query-String. Stimmt sie mit
+# If-None-Match überein, antwortet der Endpunkt mit 304, ohne die Datenbank
+# anzufassen. Die Versionen werden vor der Abfrage gelesen: ein paralleler
+# Schreibzugriff führt höchstens zu einer unnötigen 200-Antwort, nie zu einer
+# veralteten 304. Die Zähler gelten pro Prozess; die Instanz-Kennung sorgt
+# dafür, dass ETags nach einem Neustart nicht mehr passen.
+
+CACHE_CONTROL = "no-cache"  # Browser darf speichern, muss aber jedes Mal revalidieren
+_KODIERUNG_SUFFIX = re.compile(r'-(?:%s)"$' % "|".join(KODIERUNGEN))
+
+
+class TabellenVersionen:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versionen: Dict[str, int] = defaultdict(int)
+        self._geaendert: Dict[str, float] = {}
+        self.instanz = secrets.token_hex(4)
+
+    def bump(self, *tabellen: str):
+        jetzt = time.time()
+        with self._lock:
+            for tabelle in tabellen:
+                self._versionen[tabelle] += 1
+                self._geaendert[tabelle] = jetzt
+
+    def geaendert(self, *tabellen: str) -> float:
+        """Unix-Zeit des letzten Schreibzugriffs auf eine der Tabellen (0 = keiner seit dem Start)"""
+        with self._lock:
+            return max((self._geaendert.get(t, 0.0) for t in tabellen), default=0.0)
+
+    def version(self, *tabellen: str) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versionen.get(t, 0) for t in tabellen)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"instanz": self.instanz, "versionen": dict(self._versionen)}
+
+
+def etag_fuer(request: Request, tabellen: Tuple[str, ...]) -> str:
+    versionen = ".".join(str(v) for v in tabellen_versionen.version(*tabellen))
+    anfrage = hashlib.sha1(f"{request.url.path}?{request.url.query}".encode()).hexdigest()[:16]
+    return f'"{tabellen_versionen.instanz}-{versionen}-{anfrage}"'
+
+
+def passende_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """Die vom Client gesendete ETag, die der aktuellen entspricht (schwacher Vergleich,
+    Kodierungs-Suffix der Komprimierung wird ignoriert)"""
+    if not if_none_match:
+        return None
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return etag
+        if _KODIERUNG_SUFFIX.sub('"', tag.removeprefix("W/")) == etag:
+            return tag
+    return None
+
+
+def conditional_get(*tabellen: str):
+    """Dependency für Listen-Endpunkte: setzt die ETag oder beendet die Anfrage mit 304"""
+    def dependency(request: Request, response: Response):
+        # Für get_read_db (main.py): Replika nur, wenn sie diese Tabellen aktuell enthält
+        request.state.tabellen = tabellen
+        etag = etag_fuer(request, tabellen)
+        treffer = passende_etag(request.headers.get("if-none-match"), etag)
+        if treffer:
+            raise HTTPException(status_code=304, headers={"ETag": treffer, "Cache-Control": CACHE_CONTROL})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+
+    return Depends(dependency)
+
+
+tabellen_versionen = TabellenVersionen()
@@ -0,0 +1,130 @@
+import time
+from datetime import date
+from typing import Callable, List, Optional
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models as models, schemas as schemas
+from services.aenderungen import aenderungen_erfassen
+from services.bulk_import import BATCH_SIZE, RawRow, batches, check_foreign_keys
+
+
+# ============================================
+# KI-Aufträge aus Kundennachrichten (einzeln und als Batch)
+# ============================================
+
+HINWEIS_OHNE_ZUORDNUNG = "Danke für Ihre Nachricht. Bitte geben Sie mindestens eine Fahrzeug- oder Kunden-ID an."
+
+
+def antwort_auftrag(auftrag_id: int, werkstatt_id: Optional[int]) -> str:
+    return f"Ihr Auftrag wurde erstellt (ID {auftrag_id}). Wir haben Werkstatt-ID {werkstatt_id} zugewiesen."
+
+
+def braucht_auftrag(values: dict) -> bool:
+    """Ohne Fahrzeug- und Kunden-ID wird nur die KIAktion mit Hinweis geschrieben"""
+    return values.get("fahrzeug_id") is not None or values.get("kunde_id") is not None
+
+
+async def standard_werkstatt_id(db: AsyncSession) -> Optional[int]:
+    """Werkstatt für Nachrichten ohne werkstatt_id (einfache Heuristik: die erste)"""
+    return (await db.scalars(select(models.Werkstatt.id).limit(1))).first()
+
+
+async def ki_auftraege_anlegen(
+    db: AsyncSession,
+    rows: List[RawRow],
+    on_commit: Optional[Callable[[List[dict]], None]] = None,
+) -> dict:
+    """Legt für viele Nachrichten Aufträge und KIAktionen in einer Transaktion an.
+
+    Gleiche Regeln wie POST /ki/auftrag, aber die gemeinsamen Abfragen laufen
+    einmal pro Batch: Standard-Werkstatt einmal insgesamt, Existenz von
+    Fahrzeug, Kunde und Werkstatt je eine IN-Abfrage. Aufträge und KIAktionen
+    werden mit mehrzeiligen INSERTs geschrieben. Ungültige Nachrichten landen
+    im Fehlerbericht, die übrigen werden trotzdem angelegt. `on_commit` bekommt
+    die geschriebenen Aufträge (inkl. `id`).
+    """
+    started = time.perf_counter()
+    results: List[dict] = []
+    errors: List[dict] = []
+    auftraege: List[dict] = []
+    heute = date.today()
+    standard: Optional[int] = None
+    standard_geladen = False
+    # Core-INSERT auf die Tabelle: Zeilen mit und ohne NULL (fahrzeug_id, auftrag_id) bleiben in
+    # einem Statement; der ORM-Bulk-Insert teilt sie nach gesetzten Spalten in viele kleine auf
+    auftrag_tabelle, ki_tabelle = models.Auftrag.__table__, models.KIAktion.__table__
+    auftrag_stmt = insert(auftrag_tabelle).returning(auftrag_tabelle.c.id, sort_by_parameter_order=True)
+    ki_stmt = insert(ki_tabelle).returning(ki_tabelle.c.id, sort_by_parameter_order=True)
+
+    try:
+        for batch in batches(rows, BATCH_SIZE):
+            valid = []
+            for nr, raw in batch:
+                if isinstance(raw, Exception):
+                    errors.append({"row": nr, "detail": f"Ungültiges JSON: {raw}"})
+                    continue
+                try:
+                    valid.append((nr, schemas.KIAktionCreate.model_validate(raw).model_dump()))
+                except ValidationError as e:
+                    errors.append({"row": nr, "detail": e.errors(include_url=False, include_context=False)})
+
+            valid = await check_foreign_keys(db, valid, errors, {
+                "fahrzeug_id": models.Fahrzeug, "kunde_id": models.Kunde, "werkstatt_id": models.Werkstatt,
+            })
+            if not valid:
+                continue
+
+            neue_auftraege = []
+            for _, values in valid:
+                if not braucht_auftrag(values):
+                    continue
+                werkstatt_id = values["werkstatt_id"]
+                if werkstatt_id is None:
+                    if not standard_geladen:
+                        standard, standard_geladen = await standard_werkstatt_id(db), True
+                    werkstatt_id = standard
+                neue_auftraege.append({
+                    "beschreibung": values["nachricht"], "status": "offen", "erstellt_am": heute,
+                    "fahrzeug_id": values["fahrzeug_id"], "werkstatt_id": werkstatt_id, "kosten": 0,
+                })
+            if neue_auftraege:
+                ids = (await db.scalars(auftrag_stmt, neue_auftraege)).all()
+                for auftrag, new_id in zip(neue_auftraege, ids):
+                    auftrag["id"] = new_id
+                auftraege.extend(neue_auftraege)
+
+            offene = iter(neue_auftraege)
+            ki_rows = []
+            for nr, values in valid:
+                if braucht_auftrag(values):
+                    auftrag = next(offene)
+                    antwort = antwort_auftrag(auftrag["id"], auftrag["werkstatt_id"])
+                    ki_rows.append({"nachricht": values["nachricht"], "antwort": antwort,
+                                    "erstellt_am": heute, "auftrag_id": auftrag["id"]})
+                else:
+                    ki_rows.append({"nachricht": values["nachricht"], "antwort": HINWEIS_OHNE_ZUORDNUNG,
+                                    "erstellt_am": heute, "auftrag_id": None})
+            ki_ids = (await db.scalars(ki_stmt, ki_rows)).all()
+            for (nr, _), ki, ki_id in zip(valid, ki_rows, ki_ids):
+                results.append({"row": nr, "ki_aktion_id": ki_id, "auftrag_id": ki["auftrag_id"],
+                                "antwort": ki["antwort"]})
+
+        await aenderungen_erfassen(db, "auftrag", [auftrag["id"] for auftrag in auftraege])
+        await aenderungen_erfassen(db, "ki_aktionen", [result["ki_aktion_id"] for result in results])
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    if on_commit and (results or auftraege):
+        on_commit(auftraege)
+
+    elapsed = time.perf_counter() - started
+    errors.sort(key=lambda e: e["row"])
+    return {
+        "results": results,
+        "errors": errors,
+        "rows_received": len(rows),
+        "rows_per_second": round(len(results) / elapsed, 1) if elapsed > 0 else None,
+    }
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import threading
+import traceback
+from datetime import date
+from typing import List, Optional, Set
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from database import AsyncSessionLocal
+import models
+from services.aenderungen import aenderungen_erfassen
+
+
+# ============================================
+# Write-behind-Protokoll für KIAktion
+# ============================================
+
+# Fehler, die an einzelnen Zeilen liegen (z.B. unbekannte auftrag_id), nicht an der DB
+ZEILENFEHLER = (IntegrityError, DataError)
+
+
+class KIAktionLogger:
+    """Sammelt KIAktion-Zeilen im Speicher und schreibt sie gebündelt.
+
+    Geschrieben wird per Multi-Row-INSERT, sobald `batch_size` Zeilen anstehen
+    oder spätestens alle `flush_interval` Sekunden. Ist die Datenbank nicht
+    erreichbar, landen die Zeilen als NDJSON in einer lokalen Datei und werden
+    bei späteren Flushes getrennt von neuen Zeilen nachgetragen. Zeilen, die
+    auch einzeln nicht geschrieben werden können, kommen in eine
+    Dead-Letter-Datei, damit sie nicht jeden weiteren Flush blockieren.
+    Beim Herunterfahren wird der Puffer vollständig geleert.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, fallback_path: str, dead_letter_path: str):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fallback_path = fallback_path
+        self.dead_letter_path = dead_letter_path
+        self._lock = threading.Lock()
+        self._pending: List[dict] = []
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        # Referenzen halten, sonst kann der Garbage Collector laufende Flushes einsammeln
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self.written = 0
+        self.batches = 0
+        self.fallback_rows = 0
+        self.dead_letter_rows = 0
+
+    def log(self, nachricht: str, antwort: str, auftrag_id: Optional[int] = None):
+        """Zeile vormerken; kehrt sofort zurück"""
+        row = {"nachricht": nachricht, "antwort": antwort, "erstellt_am": date.today(), "auftrag_id": auftrag_id}
+        with self._lock:
+            self._pending.append(row)
+            voll = len(self._pending) >= self.batch_size
+        if voll and self._task is not None:
+            task = asyncio.get_running_loop().create_task(self.flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    # ---------------- Lebenszyklus ----------------
+    async def start(self):
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._periodic_flush())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.flush()
+
+    async def _periodic_flush(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    # ---------------- Schreiben ----------------
+    async def flush(self):
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if rows:
+                try:
+                    await self._schreiben(rows)
+                except Exception:
+                    print("KIAktion-Protokoll: Schreiben fehlgeschlagen, Zeilen in Datei:", traceback.format_exc())
+                    self._append_fallback(rows)
+                    return
+            await self._nachtragen()
+
+    async def _schreiben(self, rows: List[dict]):
+        async with AsyncSessionLocal() as db:
+            stmt = insert(models.KIAktion).returning(models.KIAktion.id, sort_by_parameter_order=True)
+            ids = (await db.scalars(stmt, rows)).all()
+            await aenderungen_erfassen(db, "ki_aktionen", ids)
+            await db.commit()
+        self.written += len(rows)
+        self.batches += 1
+
+    async def _nachtragen(self):
+        """Zeilen aus der Fallback-Datei nachtragen, erst als Batch, bei Zeilenfehlern einzeln
+
+        Was auch einzeln an der Zeile scheitert, kommt in die Dead-Letter-Datei.
+        Ist die DB (wieder) nicht erreichbar, bleibt der Rest für den nächsten Flush liegen.
+        """
+        rows = self._read_fallback()
+        if not rows:
+            return
+        try:
+            await self._schreiben(rows)
+            rest = []
+        except ZEILENFEHLER:
+            rest = await self._einzeln_schreiben(rows)
+        except Exception:
+            print("KIAktion-Protokoll: Nachtragen fehlgeschlagen:", traceback.format_exc())
+            return
+        self._rewrite_fallback(rest)
+
+    async def _einzeln_schreiben(self, rows: List[dict]) -> List[dict]:
+        """Zeile für Zeile; liefert die Zeilen, die wegen eines DB-Fehlers offen bleiben"""
+        for i, row in enumerate(rows):
+            try:
+                await self._schreiben([row])
+            except ZEILENFEHLER as e:
+                self._append_dead_letter(row, e)
+            except Exception:
+                print("KIAktion-Protokoll: Nachtragen abgebrochen:", traceback.format_exc())
+                return rows[i:]
+        return []
+
+    @staticmethod
+    def _zeile(row: dict, **extra) -> str:
+        return json.dumps({**row, "erstellt_am": row["erstellt_am"].isoformat(), **extra}, ensure_ascii=False) + "\n"
+
+    @staticmethod
+    def _schreibe_datei(path: str, zeilen: List[str], modus: str):
+        with open(path, modus, encoding="utf-8") as f:
+            f.writelines(zeilen)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _append_fallback(self, rows: List[dict]):
+        self._schreibe_datei(self.fallback_path, [self._zeile(row) for row in rows], "a")
+        self.fallback_rows += len(rows)
+
+    def _rewrite_fallback(self, rows: List[dict]):
+        if not rows:
+            os.remove(self.fallback_path)
+            return
+        tmp = self.fallback_path + ".tmp"
+        self._schreibe_datei(tmp, [self._zeile(row) for row in rows], "w")
+        os.replace(tmp, self.fallback_path)
+
+    def _append_dead_letter(self, row: dict, fehler: Exception):
+        print(f"KIAktion-Protokoll: Zeile nach {self.dead_letter_path} verschoben: {type(fehler).__name__}")
+        self._schreibe_datei(self.dead_letter_path, [self._zeile(row, fehler=str(fehler))], "a")
+        self.dead_letter_rows += 1
+
+    def _read_fallback(self) -> List[dict]:
+        if not os.path.exists(self.fallback_path):
+            return []
+        rows = []
+        with open(self.fallback_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    row["erstellt_am"] = date.fromisoformat(row["erstellt_am"])
+                    rows.append(row)
+        return rows
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "written": self.written,
+            "batches": self.batches,
+            "fallback_rows": self.fallback_rows,
+            "fallback_pending": os.path.exists(self.fallback_path),
+            "dead_letter_rows": self.dead_letter_rows,
+        }
+
+
+ki_log = KIAktionLogger(
+    batch_size=int(os.getenv("KI_LOG_BATCH_SIZE", "100")),
+    flush_interval=float(os.getenv("KI_LOG_FLUSH_SECONDS", "2")),
+    fallback_path=os.getenv("KI_LOG_FALLBACK_PATH", "ki_aktionen_fallback.ndjson"),
+    dead_letter_path=os.getenv("KI_LOG_DEAD_LETTER_PATH", "ki_aktionen_dead_letter.ndjson"),
+)
@@ -0,0 +1,320 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services import tokens
+
+
+# ============================================
+# Metriken: Anfragen, SQL, Agent-Stufen, LLM-Tokens (Prometheus-Textformat)
+# ============================================
+# Die Middleware legt pro Anfrage ein Anfrageprofil in einer ContextVar ab.
+# SQL-Events der Engines, die Stufen-Timer des Agenten und die Token-Zählung
+# schreiben in globale Histogramme/Zähler und zusätzlich ins Profil der
+# laufenden Anfrage. Nach der Anfrage landen Dauer und Anzahl der SQL-Abfragen
+# pro Route im Histogramm; dauert sie länger als SLOW_REQUEST_MS, wird sie mit
+# Aufschlüsselung nach Stufen ausgegeben. Labels sind Routen-Vorlagen
+# (/kunden/{kunde_id}), nie rohe Pfade, damit die Zahl der Reihen begrenzt bleibt.
+# Kosten pro Anfrage: ein paar Wörterbuchzugriffe unter einem Lock.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))  # 0 = keine Ausgabe
+
+DAUER_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+ANZAHL_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SQL_OPERATIONEN = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+Labels = Tuple[Tuple[str, str], ...]
+_LE_INF = 'le="+Inf"'
+T = TypeVar("T")
+
+
+class Histogramm:
+    __slots__ = ("buckets", "counts", "summe", "anzahl")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.summe = 0.0
+        self.anzahl = 0
+
+    def observe(self, wert: float):
+        self.counts[bisect_left(self.buckets, wert)] += 1
+        self.summe += wert
+        self.anzahl += 1
+
+
+@dataclass
+class Anfrageprofil:
+    methode: str
+    pfad: str
+    start: float = field(default_factory=time.perf_counter)
+    sql_anzahl: int = 0
+    sql_s: float = 0.0
+    stufen: Dict[str, float] = field(default_factory=dict)
+    tokens: Dict[str, int] = field(default_factory=dict)
+
+
+_profil: contextvars.ContextVar[Optional[Anfrageprofil]] = contextvars.ContextVar("anfrageprofil", default=None)
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    teile = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        teile.append(extra)
+    return "{" + ",".join(teile) + "}" if teile else ""
+
+
+def _escape(wert: str) -> str:
+    return str(wert).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _zahl(wert: float) -> str:
+    return str(int(wert)) if float(wert).is_integer() else repr(float(wert))
+
+
+class Metriken:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._typen: Dict[str, Tuple[str, str]] = {}
+        self._zaehler: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self._histogramme: Dict[str, Dict[Labels, Histogramm]] = defaultdict(dict)
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = defaultdict(dict)
+        self._sammler: Dict[str, Callable[[], dict]] = {}
+
+    def zaehler(self, name: str, hilfe: str):
+        self._typen[name] = ("counter", hilfe)
+
+    def histogramm(self, name: str, hilfe: str, buckets: Tuple[float, ...]):
+        self._typen[name] = ("histogram", hilfe)
+        self._buckets[name] = buckets
+
+    def gauge(self, name: str, hilfe: str):
+        self._typen[name] = ("gauge", hilfe)
+
+    def sammler(self, praefix: str, fn: Callable[[], dict]):
+        """Zahlenwerte aus einem stats()-Dict beim Abruf als Gauges `<praefix>_<key>`"""
+        self._sammler[praefix] = fn
+
+    def inc(self, name: str, labels: Labels = (), wert: float = 1):
+        with self._lock:
+            self._zaehler[name][labels] += wert
+
+    def setzen(self, name: str, labels: Labels, wert: float):
+        with self._lock:
+            self._gauges[name][labels] = wert
+
+    def observe(self, name: str, labels: Labels, wert: float):
+        with self._lock:
+            self._observe(name, labels, wert)
+
+    def _observe(self, name: str, labels: Labels, wert: float):
+        histogramm = self._histogramme[name].get(labels)
+        if histogramm is None:
+            histogramm = self._histogramme[name][labels] = Histogramm(self._buckets[name])
+        histogramm.observe(wert)
+
+    # ---------------- Aufrufer ----------------
+    def anfrage_fertig(self, route: str, profil: Anfrageprofil, status: int) -> float:
+        dauer = time.perf_counter() - profil.start
+        labels = (("method", profil.methode), ("route", route))
+        with self._lock:
+            self._observe(HTTP_DAUER, labels, dauer)
+            self._observe(HTTP_SQL_ANZAHL, labels, profil.sql_anzahl)
+            self._zaehler[HTTP_ANFRAGEN][labels + (("status", str(status)),)] += 1
+        return dauer
+
+    def sql(self, operation: str, dauer: float):
+        profil = _profil.get()
+        with self._lock:
+            self._observe(SQL_DAUER, (("operation", operation),), dauer)
+            if profil is not None:
+                profil.sql_anzahl += 1
+                profil.sql_s += dauer
+
+    def stufe(self, name: str, dauer: float):
+        profil = _profil.get()
+        with self._lock:
+            self._observe(AGENT_STUFE, (("stage", name),), dauer)
+            if profil is not None:
+                profil.stufen[name] = profil.stufen.get(name, 0.0) + dauer
+
+    def llm_tokens(self, stufe: str, prompt: int, antwort: int):
+        profil = _profil.get()
+        with self._lock:
+            self._zaehler[LLM_TOKENS][(("stage", stufe), ("type", "prompt"))] += prompt
+            self._zaehler[LLM_TOKENS][(("stage", stufe), ("type", "completion"))] += antwort
+            if profil is not None:
+                profil.tokens["prompt"] = profil.tokens.get("prompt", 0) + prompt
+                profil.tokens["completion"] = profil.tokens.get("completion", 0) + antwort
+
+    # ---------------- Ausgabe ----------------
+    def render(self) -> str:
+        gesammelt: Dict[str, float] = {}
+        for praefix, fn in list(self._sammler.items()):
+            for key, wert in fn().items():
+                if isinstance(wert, (int, float)):
+                    gesammelt[f"{praefix}_{key}"] = float(wert)
+
+        zeilen: List[str] = []
+        with self._lock:
+            for name in sorted(self._typen):
+                typ, hilfe = self._typen[name]
+                zeilen.append(f"# HELP {name} {hilfe}")
+                zeilen.append(f"# TYPE {name} {typ}")
+                if typ == "counter":
+                    for labels, wert in sorted(self._zaehler[name].items()):
+                        zeilen.append(f"{name}{_format_labels(labels)} {_zahl(wert)}")
+                elif typ == "gauge":
+                    for labels, wert in sorted(self._gauges[name].items()):
+                        zeilen.append(f"{name}{_format_labels(labels)} {_zahl(wert)}")
+                else:
+                    for labels, h in sorted(self._histogramme[name].items()):
+                        kumuliert = 0
+                        for grenze, anzahl in zip(h.buckets, h.counts):
+                            kumuliert += anzahl
+                            le = 'le="%s"' % _zahl(grenze)
+                            zeilen.append(f"{name}_bucket{_format_labels(labels, le)} {kumuliert}")
+                        zeilen.append(f"{name}_bucket{_format_labels(labels, _LE_INF)} {h.anzahl}")
+                        zeilen.append(f"{name}_sum{_format_labels(labels)} {_zahl(h.summe)}")
+                        zeilen.append(f"{name}_count{_format_labels(labels)} {h.anzahl}")
+        for name, wert in sorted(gesammelt.items()):
+            zeilen.append(f"# TYPE {name} gauge")
+            zeilen.append(f"{name} {_zahl(wert)}")
+        return "\n".join(zeilen) + "\n"
+
+
+HTTP_ANFRAGEN = "http_requests_total"
+HTTP_DAUER = "http_request_duration_seconds"
+HTTP_SQL_ANZAHL = "http_request_db_queries"
+HTTP_LAUFEND = "http_requests_in_flight"
+SQL_DAUER = "db_query_duration_seconds"
+AGENT_STUFE = "agent_stage_duration_seconds"
+LLM_TOKENS = "llm_tokens_total"
+
+metriken = Metriken()
+metriken.zaehler(HTTP_ANFRAGEN, "Anfragen nach Methode, Route und Status")
+metriken.histogramm(HTTP_DAUER, "Dauer der Anfragen (bis zum letzten Byte)", DAUER_BUCKETS)
+metriken.histogramm(HTTP_SQL_ANZAHL, "SQL-Abfragen pro Anfrage", ANZAHL_BUCKETS)
+metriken.gauge(HTTP_LAUFEND, "Gerade bearbeitete Anfragen")
+metriken.histogramm(SQL_DAUER, "Dauer einzelner SQL-Abfragen", SQL_BUCKETS)
+metriken.histogramm(AGENT_STUFE, "Dauer der Agent-Stufen (regel, agent1, db, web, agent2)", DAUER_BUCKETS)
+metriken.zaehler(LLM_TOKENS, "LLM-Tokens nach Stufe und Art (tiktoken, sonst geschätzt)")
+
+
+# ============================================
+# Messpunkte
+# ============================================
+
+def aktuelles_profil() -> Optional[Anfrageprofil]:
+    return _profil.get()
+
+
+@contextmanager
+def stufe(name: str) -> Iterator[None]:
+    """Misst eine Agent-Stufe; abgebrochene (cancel) Stufen zählen nicht"""
+    started = time.perf_counter()
+    abgebrochen = False
+    try:
+        yield
+    except asyncio.CancelledError:
+        abgebrochen = True
+        raise
+    finally:
+        if not abgebrochen:
+            metriken.stufe(name, time.perf_counter() - started)
+
+
+def llm_tokens(stufe_name: str, prompt: str, antwort: str):
+    metriken.llm_tokens(stufe_name, tokens.anzahl(prompt), tokens.anzahl(antwort))
+
+
+def mit_profil(run: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[T]]:
+    """Für Job-Queue/Worker-Tasks: führt `run` im Profil der aufrufenden Anfrage aus"""
+    profil = _profil.get()
+
+    async def wrapped() -> T:
+        token = _profil.set(profil)
+        try:
+            return await run()
+        finally:
+            _profil.reset(token)
+
+    return wrapped
+
+
+def instrument_engine(engine):
+    """Zählt und misst alle SQL-Abfragen einer (synchronen) Engine"""
+    if not METRICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def vorher(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrik_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def nachher(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrik_start", None)
+        if started is None:
+            return
+        operation = statement.lstrip()[:6].upper()
+        metriken.sql(operation if operation in SQL_OPERATIONEN else "OTHER", time.perf_counter() - started)
+
+
+def _slow_log(route: str, profil: Anfrageprofil, status: int, dauer: float):
+    teile = [f"SQL {profil.sql_anzahl}× {profil.sql_s * 1000:.0f} ms"]
+    if profil.stufen:
+        teile.append(", ".join(f"{name} {s * 1000:.0f} ms" for name, s in profil.stufen.items()))
+    if profil.tokens:
+        teile.append(f"Tokens {profil.tokens.get('prompt', 0)}/{profil.tokens.get('completion', 0)}")
+    print(f"Langsame Anfrage: {profil.methode} {route} → {status} in {dauer * 1000:.0f} ms | " + " | ".join(teile))
+
+
+# ============================================
+# ASGI-Middleware
+# ============================================
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.laufend = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        profil = Anfrageprofil(scope["method"], scope["path"])
+        token = _profil.set(profil)
+        status = 500
+
+        async def send_mit_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.laufend += 1
+        metriken.setzen(HTTP_LAUFEND, (), self.laufend)
+        try:
+            await self.app(scope, receive, send_mit_status)
+        finally:
+            _profil.reset(token)
+            self.laufend -= 1
+            metriken.setzen(HTTP_LAUFEND, (), self.laufend)
+            # Vom Router gesetzt (FastAPI); unbekannte Pfade teilen sich ein Label
+            route = getattr(scope.get("route"), "path", None) or "unbekannt"
+            dauer = metriken.anfrage_fertig(route, profil, status)
+            if SLOW_REQUEST_MS and dauer * 1000 >= SLOW_REQUEST_MS:
+                _slow_log(route, profil, status, dauer)
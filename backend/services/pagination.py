@@ -0,0 +1,126 @@
+from decimal import Decimal
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Type
+import orjson
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+
+
+# ============================================
+# Keyset-Pagination (Cursor = letzte ID)
+# ============================================
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+STREAM_CHUNK_SIZE = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def keyset_select(model, limit: int, after: Optional[int] = None, where: Sequence = (), columns: Sequence = ()):
+    """SELECT für eine Seite: optionale Filter, `id > after`, sortiert nach ID
+
+    Mit `columns` werden nur diese Spalten als Tupel geladen statt ORM-Objekten.
+    """
+    stmt = (select(*columns) if columns else select(model)).where(*where)
+    if after is not None:
+        stmt = stmt.where(model.id > after)
+    return stmt.order_by(model.id).limit(limit + 1)
+
+
+async def keyset_page(db: AsyncSession, response: Response, model, limit: int, after: Optional[int] = None,
+                      where: Sequence = ()):
+    """Liefert eine Seite sortiert nach ID und setzt den Cursor für die nächste Seite.
+
+    Statt OFFSET wird mit `id > after` weitergeblättert, dadurch bleibt jede
+    Seite ein Index-Range-Scan, egal wie weit hinten sie liegt. Es wird eine
+    Zeile mehr geladen als angefordert, um zu erkennen, ob es weitergeht.
+    Filter in `where` sollten durch einen Index (Filterspalte, id) gedeckt sein.
+    """
+    rows = (await db.scalars(keyset_select(model, limit, after, where))).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(rows[-1].id)
+
+    return rows
+
+
+# ============================================
+# Schneller JSON-Pfad für große Listen
+# ============================================
+# Lädt nur die Spalten des Antwort-Schemas als Tupel und kodiert sie direkt
+# mit orjson, ohne ORM-Objekte und ohne Validierung pro Zeile. Gedacht für
+# Schemas, deren Felder 1:1 Spalten des Modells sind; die Ausgabe ist
+# byte-identisch zum Weg über `response_model` (siehe benchmarks/bench_serialization.py).
+# Voraussetzung: die Daten sind vertrauenswürdig (z.B. keine NULL-Werte in
+# Pflichtfeldern), da das Schema sie nicht mehr prüft.
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} ist nicht JSON-serialisierbar")
+
+
+def dumps(value) -> bytes:
+    """Kompaktes JSON wie FastAPIs JSONResponse (UTF-8, ohne Leerzeichen)"""
+    return orjson.dumps(value, default=_json_default)
+
+
+@lru_cache(maxsize=None)
+def schema_columns(model, schema: Type[BaseModel]) -> Tuple[Tuple[str, ...], list]:
+    """Feldnamen des Schemas (in dessen Reihenfolge) und die passenden Spalten des Modells"""
+    names = tuple(schema.model_fields)
+    return names, [getattr(model, name) for name in names]
+
+
+def rows_to_dicts(names: Tuple[str, ...], rows) -> List[dict]:
+    return [dict(zip(names, row)) for row in rows]
+
+
+async def keyset_page_json(db: AsyncSession, response: Response, model, schema: Type[BaseModel], limit: int,
+                           after: Optional[int] = None, where: Sequence = ()) -> Response:
+    """Wie `keyset_page`, liefert aber die fertig kodierte Antwort (Header von `response` inklusive)"""
+    names, columns = schema_columns(model, schema)
+    rows = (await db.execute(keyset_select(model, limit, after, where, columns))).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(rows[-1].id)
+
+    fast = Response(dumps(rows_to_dicts(names, rows)), media_type="application/json")
+    fast.headers.raw.extend(response.headers.raw)
+    return fast
+
+
+# ============================================
+# NDJSON-Streaming (serverseitiger Cursor)
+# ============================================
+
+def stream_ndjson(model, schema: Type[BaseModel], after: Optional[int] = None,
+                  chunk_size: int = STREAM_CHUNK_SIZE, where: Sequence = (), bind=None) -> StreamingResponse:
+    """Streamt die komplette Tabelle zeilenweise als NDJSON.
+
+    `yield_per` sorgt bei Postgres für einen serverseitigen Cursor, es liegen
+    also nie mehr als `chunk_size` Zeilen gleichzeitig im Speicher. Die Zeilen
+    laufen über den schnellen JSON-Pfad (Spalten-Tupel + orjson).
+    Die Session gehört dem Generator, weil sie bis zum letzten Chunk offen
+    bleiben muss; `bind` wählt die Engine (z.B. die Lese-Replika).
+    """
+    names, columns = schema_columns(model, schema)
+
+    async def generate():
+        async with (AsyncSession(bind, expire_on_commit=False) if bind is not None else AsyncSessionLocal()) as db:
+            stmt = select(*columns).where(*where).order_by(model.id).execution_options(yield_per=chunk_size)
+            if after is not None:
+                stmt = stmt.where(model.id > after)
+
+            result = await db.stream(stmt)
+            async for partition in result.partitions():
+                yield b"".join(dumps(row) + b"\n" for row in rows_to_dicts(names, partition))
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,194 @@
+import json
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+from services import tokens
+from services.werkstatt_index import WerkstattEintrag, tokenize
+
+
+# ============================================
+# Kontext für Agent 2 mit Token-Budget
+# ============================================
+# DB- und Web-Kandidaten werden nach Relevanz zu Ort/PLZ und Fahrzeugtyp
+# aus der Klassifizierung sortiert, je Kandidat in eine Zeile gebracht und
+# so lange übernommen, wie das Budget (AGENT2_CONTEXT_TOKENS, gezählt mit
+# services/tokens.py) reicht. Der beste Kandidat jeder Quelle kommt immer
+# zuerst, danach entscheidet nur die Relevanz. Die Anzeige der Zwischenstände
+# (SSE-Ereignisse db_results/web_results) bleibt ausführlich.
+
+AGENT2_CONTEXT_TOKENS = int(os.getenv("AGENT2_CONTEXT_TOKENS", "600"))
+WEB_SNIPPET_CHARS = int(os.getenv("AGENT2_WEB_SNIPPET_CHARS", "280"))
+
+_LEER = {"", "keine", "keiner", "nicht vorhanden", "nicht angegeben", "k.a.", "unbekannt", "-"}
+
+
+@dataclass
+class Kandidat:
+    zeile: str
+    score: float
+    tokens: int = 0
+
+
+@dataclass
+class DBErgebnis:
+    """Treffer der DB-Stufe; `fehler` statt Treffern bei leerer Datenbank oder Fehler"""
+    werkstaetten: List[WerkstattEintrag] = field(default_factory=list)
+    distanzen: Dict[int, float] = field(default_factory=dict)
+    auftraege: Dict[int, int] = field(default_factory=dict)
+    ueberschrift: str = ""
+    fehler: Optional[str] = None
+
+
+@dataclass
+class WebErgebnis:
+    """Ergebnis der Web-Stufe: Rohtreffer von Tavily oder `fehler` (kein Key, Timeout, ...)"""
+    query: str = ""
+    roh: Any = None
+    fehler: Optional[str] = None
+
+
+@dataclass
+class Kontext:
+    db_text: str
+    web_text: str
+    tokens: int
+    db: Dict[str, int] = field(default_factory=dict)   # {"gesamt": ..., "verwendet": ...}
+    web: Dict[str, int] = field(default_factory=dict)
+
+
+def parameter(classification: str, name: str) -> Optional[str]:
+    """Wert einer Zeile "- <name>: ..." aus der Klassifizierung von Agent 1"""
+    for line in classification.splitlines():
+        if f"{name}:" in line:
+            wert = line.split(f"{name}:", 1)[1].strip().strip("[]").strip()
+            return None if wert.lower() in _LEER else wert
+    return None
+
+
+def _plz(text: Optional[str]) -> Optional[str]:
+    treffer = re.search(r"\b\d{5}\b", text or "")
+    return treffer.group(0) if treffer else None
+
+
+def _woerter(text: Optional[str]) -> set:
+    return {t for t in tokenize(text) if len(t) > 2 and not t.isdigit()}
+
+
+# ---------------- Kandidaten ----------------
+def db_kandidaten(werkstaetten: Sequence[WerkstattEintrag], distanzen: Dict[int, float],
+                  auftraege: Dict[int, int], ort: Optional[str], fahrzeug: Optional[str]) -> List[Kandidat]:
+    ort_woerter, plz = _woerter(ort), _plz(ort)
+    fahrzeug_woerter = _woerter(fahrzeug)
+    kandidaten = []
+    for rang, w in enumerate(werkstaetten):
+        score = 1.0 - rang * 0.01
+        if ort_woerter and ort_woerter <= _woerter(w.ort):
+            score += 3
+        if plz and w.plz:
+            score += 2 if w.plz == plz else (1 if w.plz[:2] == plz[:2] else 0)
+        if w.id in distanzen:
+            score += 2 / (1 + distanzen[w.id] / 10)
+        if fahrzeug_woerter & _woerter(w.name):
+            score += 1.5
+        anzahl = auftraege.get(w.id, 0)
+        score += min(1.0, math.log10(1 + anzahl) / 3)
+
+        zeile = f"{w.name} | {w.adresse}, {w.plz} {w.ort}"
+        if w.id in distanzen:
+            zeile += f" | {distanzen[w.id]:.0f} km"
+        zeile += f" | {anzahl} Aufträge | ID {w.id}"
+        kandidaten.append(Kandidat(zeile, score))
+    return kandidaten
+
+
+def _web_treffer(roh) -> List[dict]:
+    """Tavily liefert eine Liste von Dicts (url, content, ggf. title), im Cache als JSON"""
+    if isinstance(roh, list):
+        return [t for t in roh if isinstance(t, dict)]
+    if isinstance(roh, str) and roh.lstrip().startswith("["):
+        try:
+            wert = json.loads(roh)
+        except ValueError:
+            wert = None
+        if isinstance(wert, list):
+            return [t for t in wert if isinstance(t, dict)]
+    return [{"content": str(roh)}] if roh else []
+
+
+def _kuerzen(text: str, zeichen: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= zeichen:
+        return text
+    return text[:zeichen].rsplit(" ", 1)[0] + " …"
+
+
+def web_kandidaten(roh, ort: Optional[str], fahrzeug: Optional[str]) -> List[Kandidat]:
+    ort_woerter, plz = _woerter(ort), _plz(ort)
+    fahrzeug_woerter = _woerter(fahrzeug)
+    kandidaten = []
+    for rang, treffer in enumerate(_web_treffer(roh)):
+        text = f"{treffer.get('title', '')} {treffer.get('content', '')}"
+        woerter = _woerter(text)
+        score = 1.0 - rang * 0.1
+        if ort_woerter and ort_woerter <= woerter:
+            score += 2
+        if plz and plz in text:
+            score += 1
+        if fahrzeug_woerter & woerter:
+            score += 1
+        quelle = treffer.get("title") or re.sub(r"^https?://(www\.)?", "", treffer.get("url", "")).split("/")[0]
+        inhalt = _kuerzen(treffer.get("content", ""), WEB_SNIPPET_CHARS)
+        kandidaten.append(Kandidat(f"{quelle}: {inhalt}" if quelle else inhalt, score))
+    return kandidaten
+
+
+# ---------------- Budget ----------------
+def packen(db: List[Kandidat], web: List[Kandidat], budget: int, kopf_tokens: int = 0):
+    """Wählt Kandidaten nach Relevanz, bis das Budget erschöpft ist (Reihenfolge je Quelle bleibt sortiert)"""
+    db = sorted(db, key=lambda k: -k.score)
+    web = sorted(web, key=lambda k: -k.score)
+    reihenfolge = db[:1] + web[:1]
+    reihenfolge += sorted(db[1:] + web[1:], key=lambda k: -k.score)
+
+    verbraucht = kopf_tokens
+    gewaehlt = set()
+    for k in reihenfolge:
+        k.tokens = tokens.anzahl(k.zeile) + 1  # + Zeilenumbruch/Nummer
+        if verbraucht + k.tokens <= budget:
+            gewaehlt.add(id(k))
+            verbraucht += k.tokens
+    return [k for k in db if id(k) in gewaehlt], [k for k in web if id(k) in gewaehlt], verbraucht
+
+
+def bauen(classification: str, db: DBErgebnis, web: WebErgebnis, budget: int = AGENT2_CONTEXT_TOKENS) -> Kontext:
+    """Texte für {db_results}/{web_results} im Prompt von Agent 2"""
+    ort = parameter(classification, "Ort/PLZ")
+    fahrzeug = parameter(classification, "Fahrzeugtyp")
+    db_alle = [] if db.fehler else db_kandidaten(db.werkstaetten, db.distanzen, db.auftraege, ort, fahrzeug)
+    web_alle = [] if web.fehler else web_kandidaten(web.roh, ort, fahrzeug)
+
+    def db_kopf(n: int) -> str:
+        return f"Werkstätten aus unserer Datenbank, nach Relevanz ({n} von {len(db_alle)}):"
+
+    def web_kopf(n: int) -> str:
+        return f"Internet-Recherche zu '{web.query}', nach Relevanz ({n} von {len(web_alle)}):"
+
+    feste_texte = (db.fehler or db_kopf(len(db_alle)), web.fehler or web_kopf(len(web_alle)))
+    db_gewaehlt, web_gewaehlt, verbraucht = packen(db_alle, web_alle, budget, sum(map(tokens.anzahl, feste_texte)))
+
+    def text(fehler, kopf, gewaehlt, alle, leer) -> str:
+        if fehler:
+            return fehler
+        if not alle:
+            return leer
+        return "\n".join([kopf(len(gewaehlt))] + [f"{i}. {k.zeile}" for i, k in enumerate(gewaehlt, 1)])
+
+    return Kontext(
+        db_text=text(db.fehler, db_kopf, db_gewaehlt, db_alle, "Keine passenden Werkstätten in unserer Datenbank."),
+        web_text=text(web.fehler, web_kopf, web_gewaehlt, web_alle, "Keine Treffer im Internet."),
+        tokens=verbraucht,
+        db={"gesamt": len(db_alle), "verwendet": len(db_gewaehlt)},
+        web={"gesamt": len(web_alle), "verwendet": len(web_gewaehlt)},
+    )
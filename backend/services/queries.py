@@ -0,0 +1,35 @@
+from typing import List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+import models
+
+
+# ============================================
+# Gefilterte Abfragen über Beziehungen
+# ============================================
+# Jede Abfrage ist durch einen Index in models.py gedeckt;
+# benchmarks/check_query_plans.py prüft die Ausführungspläne.
+
+def auftrag_filter(
+    status: Optional[str] = None,
+    fahrzeug_id: Optional[int] = None,
+    werkstatt_id: Optional[int] = None,
+) -> List:
+    """WHERE-Bedingungen für Auftragslisten (Status ohne Groß-/Kleinschreibung)"""
+    where = []
+    if status is not None:
+        where.append(func.lower(models.Auftrag.status) == status.lower())
+    if fahrzeug_id is not None:
+        where.append(models.Auftrag.fahrzeug_id == fahrzeug_id)
+    if werkstatt_id is not None:
+        where.append(models.Auftrag.werkstatt_id == werkstatt_id)
+    return where
+
+
+def kunden_uebersicht(kunde_id: int):
+    """Kunde mit Fahrzeugen und deren Aufträgen in drei Abfragen (je eine pro Ebene)"""
+    return (
+        select(models.Kunde)
+        .where(models.Kunde.id == kunde_id)
+        .options(selectinload(models.Kunde.fahrzeuge).selectinload(models.Fahrzeug.auftraege))
+    )
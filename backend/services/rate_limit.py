@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import httpx
+from fastapi import HTTPException, Request
+
+try:
+    import jwt
+except ImportError:  # optional (PyJWT[crypto]), ohne Paket zählt nur die IP
+    jwt = None
+
+
+# ============================================
+# Token-Bucket pro Client für die LLM-Endpunkte
+# ============================================
+# Jeder Client hat einen Eimer mit höchstens `burst` Marken, der mit
+# `refill_per_s` Marken pro Sekunde nachläuft; jede Anfrage kostet eine Marke.
+# Ist der Eimer leer, antwortet der Endpunkt mit 429 und Retry-After.
+# Client ist das Keycloak-Subject (`sub`) aus einem Bearer-Token des Realms
+# KEYCLOAK_ISSUER, sonst die IP. Das Subject zählt nur, wenn die Signatur zu
+# einem Schlüssel aus dem JWKS des Realms passt und Aussteller und Ablaufzeit
+# stimmen; jedes andere Token (gefälscht, abgelaufen, Keycloak nicht
+# erreichbar) wird wie eine Anfrage ohne Token behandelt. Ein Token kann den
+# Eimer eines Clients also nie vergrößern. Hinter einem Proxy liefert uvicorn
+# --proxy-headers die echte IP.
+
+KEYCLOAK_ISSUER = os.getenv("KEYCLOAK_ISSUER", "http://localhost:8080/realms/fahrzeugservice")
+# Im Docker-Netz ist Keycloak meist unter einem anderen Host erreichbar als im Aussteller
+KEYCLOAK_JWKS_URL = os.getenv("KEYCLOAK_JWKS_URL", f"{KEYCLOAK_ISSUER}/protocol/openid-connect/certs")
+KEYCLOAK_JWKS_TTL_SECONDS = float(os.getenv("KEYCLOAK_JWKS_TTL_SECONDS", "300"))
+
+
+class KeycloakSchluessel:
+    """Öffentliche Schlüssel des Realms (JWKS), zwischengespeichert.
+
+    Neu geladen wird nach `ttl_s` oder bei unbekannter `kid` (Schlüsselwechsel),
+    aber höchstens alle `min_abstand_s` Sekunden: Tokens mit erfundener `kid`
+    lösen so keine Anfrage an Keycloak pro Request aus.
+    """
+
+    def __init__(self, url: str, ttl_s: float, min_abstand_s: float = 30.0, timeout_s: float = 2.0):
+        self.url = url
+        self.ttl_s = ttl_s
+        self.min_abstand_s = min_abstand_s
+        self.timeout_s = timeout_s
+        self._lock = threading.Lock()
+        self._schluessel: Dict[str, "jwt.PyJWK"] = {}
+        self._geladen_am: Optional[float] = None
+        self._versucht_am: Optional[float] = None
+        self.ladefehler = 0
+
+    def setzen(self, jwks: dict):
+        """Schlüssel aus einem JWKS-Dokument übernehmen (Schlüssel ohne `kid` oder mit fremdem Typ fallen weg)"""
+        schluessel = {}
+        for eintrag in jwks.get("keys", []):
+            try:
+                k = jwt.PyJWK.from_dict(eintrag)
+            except jwt.PyJWTError:
+                continue
+            if k.key_id:
+                schluessel[k.key_id] = k
+        self._schluessel = schluessel
+        self._geladen_am = time.monotonic()
+
+    def _laden(self):
+        try:
+            antwort = httpx.get(self.url, timeout=self.timeout_s)
+            antwort.raise_for_status()
+            self.setzen(antwort.json())
+        except Exception:
+            self.ladefehler += 1
+            print("Keycloak-JWKS nicht ladbar:", traceback.format_exc(limit=1))
+
+    def schluessel(self, kid: str) -> Optional["jwt.PyJWK"]:
+        with self._lock:
+            jetzt = time.monotonic()
+            veraltet = self._geladen_am is None or jetzt - self._geladen_am >= self.ttl_s
+            if (veraltet or kid not in self._schluessel) and (
+                self._versucht_am is None or jetzt - self._versucht_am >= self.min_abstand_s
+            ):
+                self._versucht_am = jetzt
+                self._laden()
+            return self._schluessel.get(kid)
+
+
+keycloak_schluessel = KeycloakSchluessel(KEYCLOAK_JWKS_URL, KEYCLOAK_JWKS_TTL_SECONDS)
+
+
+def _token_subject(authorization: Optional[str]) -> Optional[str]:
+    """`sub` eines gültig signierten Keycloak-Tokens aus dem Authorization-Header, sonst None"""
+    if jwt is None or not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    token = authorization[7:].strip()
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+        schluessel = keycloak_schluessel.schluessel(kid) if kid else None
+        if schluessel is None:
+            return None
+        claims = jwt.decode(
+            token, schluessel.key, algorithms=[schluessel.algorithm_name], issuer=KEYCLOAK_ISSUER,
+            options={"require": ["exp", "iss", "sub"], "verify_aud": False},
+        )
+    except jwt.PyJWTError:
+        return None
+    return claims["sub"]
+
+
+def client_schluessel(request: Request) -> str:
+    """`sub:<subject>` für gültig signierte Keycloak-Tokens, sonst `ip:<adresse>`"""
+    subject = _token_subject(request.headers.get("authorization"))
+    if subject:
+        return f"sub:{subject}"
+    return f"ip:{request.client.host if request.client else 'unbekannt'}"
+
+
+class RateLimiter:
+    """Token-Buckets je Client, LRU-begrenzt auf `max_clients` Einträge.
+
+    Ein verdrängter Client startet wieder mit vollem Eimer; bei `max_clients`
+    deutlich über der Zahl gleichzeitig aktiver Clients spielt das keine Rolle.
+    """
+
+    def __init__(self, burst: float, refill_per_s: float, max_clients: int = 10000, enabled: bool = True):
+        self.burst = burst
+        self.refill_per_s = refill_per_s
+        self.max_clients = max_clients
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._eimer: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # client → (marken, zeitpunkt)
+        self.erlaubt = 0
+        self.abgelehnt = 0
+
+    def erlauben(self, client: str) -> Tuple[bool, float]:
+        """(erlaubt, Sekunden bis zur nächsten Marke)"""
+        if not self.enabled:
+            return True, 0.0
+        jetzt = time.monotonic()
+        with self._lock:
+            marken, zeitpunkt = self._eimer.pop(client, (self.burst, jetzt))
+            marken = min(self.burst, marken + (jetzt - zeitpunkt) * self.refill_per_s)
+            erlaubt = marken >= 1
+            if erlaubt:
+                marken -= 1
+                self.erlaubt += 1
+            else:
+                self.abgelehnt += 1
+            self._eimer[client] = (marken, jetzt)
+            while len(self._eimer) > self.max_clients:
+                self._eimer.popitem(last=False)
+        if erlaubt:
+            return True, 0.0
+        return False, (1 - marken) / self.refill_per_s if self.refill_per_s > 0 else 3600.0
+
+    def clear(self):
+        with self._lock:
+            self._eimer.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "burst": self.burst,
+                "refill_per_s": self.refill_per_s,
+                "clients": len(self._eimer),
+                "allowed": self.erlaubt,
+                "rejected": self.abgelehnt,
+            }
+
+
+llm_rate_limiter = RateLimiter(
+    burst=float(os.getenv("LLM_RATE_LIMIT_BURST", "10")),
+    refill_per_s=float(os.getenv("LLM_RATE_LIMIT_PER_MINUTE", "30")) / 60,
+    max_clients=int(os.getenv("LLM_RATE_LIMIT_MAX_CLIENTS", "10000")),
+    enabled=os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true",
+)
+
+
+def llm_rate_limit(request: Request):
+    """Abhängigkeit der LLM-Endpunkte: 429 mit Retry-After, wenn der Eimer des Clients leer ist"""
+    erlaubt, warten = llm_rate_limiter.erlauben(client_schluessel(request))
+    if not erlaubt:
+        raise HTTPException(
+            status_code=429,
+            detail="Zu viele Anfragen an den Assistenten, bitte kurz warten",
+            headers={"Retry-After": str(max(1, int(warten + 0.999)))},
+        )
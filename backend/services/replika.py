@@ -0,0 +1,175 @@
+import asyncio
+import os
+import time
+import traceback
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+from fastapi import Request
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from database import AsyncSessionLocal, ReadSessionLocal
+from models import ReplikaHeartbeat
+from services.http_cache import tabellen_versionen
+
+
+# ============================================
+# Lese-Replika: Routing, Heartbeat und Fallback
+# ============================================
+# Lesende Endpunkte bekommen ihre Session über get_read_db (main.py). Sie
+# landen auf der Replika (READ_DATABASE_URL), wenn
+# - die Replika erreichbar ist und höchstens REPLICA_MAX_LAG_SECONDS zurückliegt
+# - sie jeden Schreibzugriff dieses Prozesses auf die gelesenen Tabellen schon
+#   enthält (sonst passte die ETag aus den Tabellen-Versionen nicht zum Inhalt)
+# - sie den Zeitpunkt aus dem Header X-Read-After enthält (read-your-writes:
+#   der Client schickt den Wert von X-Write-Time seiner letzten Änderung mit)
+# Sonst liest die Anfrage von der Primärdatenbank. Wie weit die Replika ist,
+# zeigt ein Heartbeat: die App schreibt alle REPLICA_CHECK_SECONDS die Uhrzeit
+# in die Primärdatenbank und liest den replizierten Wert auf der Replika.
+# Alles, was auf der Primärdatenbank vor diesem Heartbeat committet wurde,
+# ist dann auch auf der Replika.
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "1"))
+
+READ_AFTER_HEADER = "X-Read-After"
+WRITE_TIME_HEADER = "X-Write-Time"
+READ_SOURCE_HEADER = "X-Read-Source"
+
+_LESENDE_METHODEN = {"GET", "HEAD", "OPTIONS"}
+
+
+class LeseRouting:
+    def __init__(self, primaer: async_sessionmaker, replika: Optional[async_sessionmaker],
+                 max_lag_s: float, intervall_s: float):
+        self.primaer = primaer
+        self.replika = replika
+        self.max_lag_s = max_lag_s
+        self.intervall_s = intervall_s
+        self.erreichbar = False  # bis zur ersten erfolgreichen Prüfung liest alles von der Primärdatenbank
+        self.stand: Optional[float] = None  # Heartbeat, den die Replika zuletzt enthielt
+        self.lag_s: Optional[float] = None
+        self.geprueft_am: Optional[float] = None
+        self.fehler_text: Optional[str] = None
+        self.lesungen: Dict[str, int] = defaultdict(int)
+        self.fallbacks: Dict[str, int] = defaultdict(int)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def aktiv(self) -> bool:
+        return self.replika is not None
+
+    # ---------------- Lebenszyklus ----------------
+    async def start(self):
+        if self.aktiv:
+            self._task = asyncio.create_task(self._periodisch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _periodisch(self):
+        while True:
+            await self.pruefen()
+            await asyncio.sleep(self.intervall_s)
+
+    async def pruefen(self):
+        """Heartbeat auf der Primärdatenbank schreiben und den Stand der Replika lesen"""
+        jetzt = time.time()
+        try:
+            async with self.primaer() as db:
+                geaendert = await db.execute(
+                    update(ReplikaHeartbeat).where(ReplikaHeartbeat.id == 1).values(zeit=jetzt)
+                )
+                if geaendert.rowcount == 0:
+                    db.add(ReplikaHeartbeat(id=1, zeit=jetzt))
+                await db.commit()
+        except Exception:
+            # Ohne Primärdatenbank nützt auch der Fallback nichts; Stand der Replika trotzdem prüfen
+            traceback.print_exc()
+        try:
+            async with self.replika() as db:
+                stand = await asyncio.wait_for(
+                    db.scalar(select(ReplikaHeartbeat.zeit).where(ReplikaHeartbeat.id == 1)),
+                    timeout=self.intervall_s + 1,
+                )
+        except Exception as e:
+            self.erreichbar = False
+            self.fehler_text = f"{type(e).__name__}: {e}"
+        else:
+            self.erreichbar = True
+            self.fehler_text = None
+            self.stand = stand
+            self.lag_s = jetzt - stand if stand is not None else None
+        self.geprueft_am = jetzt
+
+    def fehler(self, e: BaseException):
+        """Eine Abfrage auf der Replika ist gescheitert: bis zur nächsten Prüfung nicht mehr nutzen"""
+        self.erreichbar = False
+        self.fehler_text = f"{type(e).__name__}: {e}"
+
+    # ---------------- Routing ----------------
+    def waehlen(self, tabellen: Tuple[str, ...] = (), lesen_ab: float = 0.0) -> Tuple[async_sessionmaker, str]:
+        """Session-Fabrik und Quelle ("replica"/"primary") für eine lesende Abfrage"""
+        if not self.aktiv:
+            return self.primaer, "primary"
+        if not self.erreichbar:
+            grund = "nicht_erreichbar"
+        elif self.lag_s is None or self.lag_s > self.max_lag_s:
+            grund = "verzoegert"
+        elif self.stand < max(lesen_ab, tabellen_versionen.geaendert(*tabellen)):
+            grund = "zu_alt"
+        else:
+            self.lesungen["replica"] += 1
+            return self.replika, "replica"
+        self.fallbacks[grund] += 1
+        self.lesungen["primary"] += 1
+        return self.primaer, "primary"
+
+    def stats(self) -> dict:
+        return {
+            "aktiv": self.aktiv,
+            "erreichbar": self.erreichbar,
+            "lag_s": round(self.lag_s, 3) if self.lag_s is not None else None,
+            "max_lag_s": self.max_lag_s,
+            "geprueft_am": self.geprueft_am,
+            "fehler": self.fehler_text,
+            "reads_replica": self.lesungen["replica"],
+            "reads_primary": self.lesungen["primary"],
+            **{f"fallback_{grund}": anzahl for grund, anzahl in self.fallbacks.items()},
+        }
+
+
+def lesen_ab(request: Request) -> float:
+    """Zeitpunkt aus X-Read-After (Unix-Zeit), 0 ohne oder mit ungültigem Header"""
+    try:
+        return float(request.headers.get(READ_AFTER_HEADER, 0))
+    except ValueError:
+        return 0.0
+
+
+class WriteTimeMiddleware:
+    """Setzt X-Write-Time auf erfolgreiche schreibende Anfragen (nur mit Replika)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in _LESENDE_METHODEN or not lese_routing.aktiv:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_mit_zeit(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (WRITE_TIME_HEADER.lower().encode(), f"{time.time():.6f}".encode())
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_mit_zeit)
+
+
+lese_routing = LeseRouting(AsyncSessionLocal, ReadSessionLocal, REPLICA_MAX_LAG_SECONDS, REPLICA_CHECK_SECONDS)
@@ -0,0 +1,63 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from services.agent_cache import normalize_query
+
+
+# ============================================
+# Zusammenlegen gleichzeitiger gleicher Agent-Anfragen
+# ============================================
+# Kommt dieselbe Anfrage (normalisiert wie im Agent-Cache) mehrfach an, während
+# die erste noch in der Warteschlange steht oder läuft, hängen sich die weiteren
+# an deren Job an, statt die Pipeline (LLM, Tavily) erneut zu starten. Der
+# Agent-Cache greift erst, wenn die erste Antwort fertig ist; dieses Register
+# deckt die Zeit davor ab. Die Anfragen der Mitläufer werden vermerkt, damit
+# jede ihre eigene KIAktion bekommt.
+
+class SingleFlight:
+    """Register der laufenden Ausführung je normalisierter Anfrage"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._laufend: Dict[str, Tuple[Any, List[str]]] = {}
+        self.gestartet = 0
+        self.angehaengt = 0
+
+    def anhaengen(self, query: str) -> Optional[Any]:
+        """Laufende Ausführung für `query` oder None; die Anfrage wird als Mitläufer vermerkt"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            eintrag = self._laufend.get(normalize_query(query))
+            if eintrag is None:
+                return None
+            eintrag[1].append(query)
+            self.angehaengt += 1
+            return eintrag[0]
+
+    def starten(self, query: str, ausfuehrung: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._laufend[normalize_query(query)] = (ausfuehrung, [])
+            self.gestartet += 1
+
+    def beenden(self, query: str) -> List[str]:
+        """Eintrag entfernen (neue Anfragen starten wieder selbst); liefert die Mitläufer"""
+        with self._lock:
+            return self._laufend.pop(normalize_query(query), (None, []))[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.gestartet + self.angehaengt
+            return {
+                "enabled": self.enabled,
+                "in_flight": len(self._laufend),
+                "started": self.gestartet,
+                "coalesced": self.angehaengt,
+                "coalesced_rate": round(self.angehaengt / total, 3) if total else 0.0,
+            }
+
+
+agent_single_flight = SingleFlight(enabled=os.getenv("AGENT_COALESCE", "true").lower() == "true")
@@ -0,0 +1,218 @@
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import bindparam, func, select
+from database import SessionLocal
+import models
+
+
+# ============================================
+# Auftragsstatistik (inkrementell gepflegte Zähler)
+# ============================================
+# Wird einmal beim Start per GROUP BY aufgebaut und danach bei jedem
+# angelegten Auftrag bzw. Statuswechsel direkt nach dem Commit fortgeschrieben.
+# Lesen kostet O(Werkstätten) bzw. O(Tage), nicht O(Aufträge).
+# Die Zähler liegen pro Prozess im Speicher (wie der Werkstatt-Index).
+
+ABGESCHLOSSENE_STATUS = {
+    s.strip().lower()
+    for s in os.getenv("AUFTRAG_STATUS_ABGESCHLOSSEN", "abgeschlossen,erledigt,geschlossen,storniert").split(",")
+    if s.strip()
+}
+MAX_TAGE = 731
+
+
+def _status_key(status: Optional[str]) -> str:
+    return (status or "").strip().lower()
+
+
+@dataclass
+class WerkstattZaehler:
+    anzahl: int = 0
+    pro_status: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    kosten_summe: Decimal = Decimal(0)
+    kosten_anzahl: int = 0
+
+    def to_dict(self) -> dict:
+        abgeschlossen = sum(n for s, n in self.pro_status.items() if s in ABGESCHLOSSENE_STATUS)
+        return {
+            "anzahl": self.anzahl,
+            "offen": self.anzahl - abgeschlossen,
+            "abgeschlossen": abgeschlossen,
+            "pro_status": {s: n for s, n in self.pro_status.items() if n},
+            "kosten_summe": self.kosten_summe,
+            "kosten_durchschnitt": (
+                (self.kosten_summe / self.kosten_anzahl).quantize(Decimal("0.01")) if self.kosten_anzahl else None
+            ),
+        }
+
+
+class AuftragStatistik:
+    """Zähler pro Werkstatt und Status, Kostensummen und Aufträge pro Tag.
+
+    Während eines Neuaufbaus (`rebuild_async`) angelegte Aufträge werden
+    vorgemerkt und danach auf den Snapshot angewendet, sofern ihre ID über
+    der höchsten ID des Snapshots liegt. Statuswechsel in diesem Zeitfenster
+    können doppelt oder gar nicht gezählt werden, bis zum nächsten Neuaufbau.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+        self._vorgemerkt: Optional[List[Tuple[int, Optional[int], Optional[str], Optional[date], object]]] = None
+
+    def _clear(self):
+        self._werkstaetten: Dict[Optional[int], WerkstattZaehler] = defaultdict(WerkstattZaehler)
+        self._pro_tag: Dict[date, int] = defaultdict(int)
+        self._pro_werkstatt_tag: Dict[Tuple[Optional[int], date], int] = defaultdict(int)
+        self.loaded = False
+
+    # ---------------- Aufbau ----------------
+    def build(self, status_rows: Iterable, tag_rows: Iterable, max_id: int = 0):
+        """status_rows: (werkstatt_id, status, anzahl, kosten_summe, kosten_anzahl),
+        tag_rows: (werkstatt_id, erstellt_am, anzahl)"""
+        with self._lock:
+            self._clear()
+            for werkstatt_id, status, anzahl, kosten_summe, kosten_anzahl in status_rows:
+                z = self._werkstaetten[werkstatt_id]
+                z.anzahl += anzahl
+                z.pro_status[_status_key(status)] += anzahl
+                z.kosten_summe += Decimal(kosten_summe or 0)
+                z.kosten_anzahl += kosten_anzahl
+            for werkstatt_id, erstellt_am, anzahl in tag_rows:
+                if erstellt_am is not None:
+                    self._pro_tag[erstellt_am] += anzahl
+                    self._pro_werkstatt_tag[(werkstatt_id, erstellt_am)] += anzahl
+            # Während des Neuaufbaus angelegte Aufträge, die der Snapshot noch nicht enthält
+            for auftrag_id, *werte in self._vorgemerkt or ():
+                if auftrag_id > max_id:
+                    self._add(*werte)
+            self._vorgemerkt = None
+            self.loaded = True
+
+    async def rebuild_async(self, db):
+        """Neuaufbau aus der Datenbank (drei Abfragen, alle bis zur selben maximalen ID)"""
+        with self._lock:
+            self._vorgemerkt = []
+        try:
+            max_id = (await db.scalar(_MAX_ID_SELECT)) or 0
+            status_rows = (await db.execute(_STATUS_SELECT, {"max_id": max_id})).all()
+            tag_rows = (await db.execute(_TAG_SELECT, {"max_id": max_id})).all()
+        except Exception:
+            with self._lock:
+                self._vorgemerkt = None
+            raise
+        self.build(status_rows, tag_rows, max_id)
+
+    def load(self, db):
+        max_id = db.scalar(_MAX_ID_SELECT) or 0
+        self.build(
+            db.execute(_STATUS_SELECT, {"max_id": max_id}).all(),
+            db.execute(_TAG_SELECT, {"max_id": max_id}).all(),
+            max_id,
+        )
+
+    def ensure_loaded(self):
+        """Für Aufrufe außerhalb der App (z.B. Skripte) bei Bedarf synchron laden"""
+        if self.loaded:
+            return
+        db = SessionLocal()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+
+    # ---------------- Inkrementelle Updates (nach dem Commit) ----------------
+    def add_auftrag(self, auftrag_id: int, werkstatt_id: Optional[int], status: Optional[str],
+                    erstellt_am: Optional[date], kosten=None):
+        with self._lock:
+            self._add(werkstatt_id, status, erstellt_am, kosten)
+            if self._vorgemerkt is not None:
+                self._vorgemerkt.append((auftrag_id, werkstatt_id, status, erstellt_am, kosten))
+
+    def add_rows(self, rows: List[dict]):
+        """Für Bulk-Importe: geschriebene Zeilen inkl. `id`"""
+        for row in rows:
+            self.add_auftrag(row["id"], row.get("werkstatt_id"), row.get("status"),
+                             row.get("erstellt_am"), row.get("kosten"))
+
+    def change_status(self, werkstatt_id: Optional[int], alt: Optional[str], neu: Optional[str]):
+        alt, neu = _status_key(alt), _status_key(neu)
+        if alt == neu:
+            return
+        with self._lock:
+            z = self._werkstaetten[werkstatt_id]
+            z.pro_status[alt] -= 1
+            z.pro_status[neu] += 1
+
+    def _add(self, werkstatt_id, status, erstellt_am, kosten):
+        z = self._werkstaetten[werkstatt_id]
+        z.anzahl += 1
+        z.pro_status[_status_key(status)] += 1
+        if kosten is not None:
+            z.kosten_summe += Decimal(kosten)
+            z.kosten_anzahl += 1
+        if erstellt_am is not None:
+            self._pro_tag[erstellt_am] += 1
+            self._pro_werkstatt_tag[(werkstatt_id, erstellt_am)] += 1
+
+    # ---------------- Abfragen ----------------
+    def anzahl(self, werkstatt_id: int) -> int:
+        with self._lock:
+            z = self._werkstaetten.get(werkstatt_id)
+            return z.anzahl if z else 0
+
+    def werkstaetten(self, werkstatt_id: Optional[int] = None) -> List[dict]:
+        with self._lock:
+            ids = [werkstatt_id] if werkstatt_id is not None else sorted(
+                (i for i in self._werkstaetten if i is not None)
+            )
+            return [
+                {"werkstatt_id": i, **self._werkstaetten[i].to_dict()}
+                for i in ids if i in self._werkstaetten
+            ]
+
+    def gesamt(self) -> dict:
+        with self._lock:
+            summe = WerkstattZaehler()
+            for z in self._werkstaetten.values():
+                summe.anzahl += z.anzahl
+                for s, n in z.pro_status.items():
+                    summe.pro_status[s] += n
+                summe.kosten_summe += z.kosten_summe
+                summe.kosten_anzahl += z.kosten_anzahl
+            return summe.to_dict()
+
+    def pro_tag(self, von: date, bis: date, werkstatt_id: Optional[int] = None) -> List[dict]:
+        """Aufträge je Tag im Zeitraum (inkl. Tage ohne Aufträge)"""
+        with self._lock:
+            tage = []
+            tag = von
+            while tag <= bis:
+                if werkstatt_id is None:
+                    anzahl = self._pro_tag.get(tag, 0)
+                else:
+                    anzahl = self._pro_werkstatt_tag.get((werkstatt_id, tag), 0)
+                tage.append({"datum": tag, "anzahl": anzahl})
+                tag += timedelta(days=1)
+            return tage
+
+
+_A = models.Auftrag
+_MAX_ID_SELECT = select(func.max(_A.id))
+_STATUS_SELECT = (
+    select(_A.werkstatt_id, func.lower(_A.status), func.count(_A.id), func.sum(_A.kosten), func.count(_A.kosten))
+    .where(_A.id <= bindparam("max_id"))
+    .group_by(_A.werkstatt_id, func.lower(_A.status))
+)
+_TAG_SELECT = (
+    select(_A.werkstatt_id, _A.erstellt_am, func.count(_A.id))
+    .where(_A.id <= bindparam("max_id"))
+    .group_by(_A.werkstatt_id, _A.erstellt_am)
+)
+
+auftrag_statistik = AuftragStatistik()
@@ -0,0 +1,54 @@
+import os
+import threading
+
+try:
+    import tiktoken
+except ImportError:  # optional, ohne Paket wird geschätzt
+    tiktoken = None
+
+
+# ============================================
+# Token-Zählung für Prompts und Antworten (tiktoken)
+# ============================================
+# Das Encoding passt zu OPENAI_MODEL (Fallback o200k_base) und wird beim
+# ersten Aufruf geladen; warmup() im Agenten erledigt das vorab. Ohne tiktoken
+# oder ohne Encoding-Datei (kein Netz beim ersten Laden) wird mit
+# 4 Zeichen pro Token geschätzt.
+
+ZEICHEN_PRO_TOKEN = 4
+
+_encoding = None
+_geladen = False
+_lock = threading.Lock()
+
+
+def _laden():
+    global _encoding, _geladen
+    with _lock:
+        if _geladen:
+            return _encoding
+        if tiktoken is not None:
+            model = os.getenv("OPENAI_MODEL", "gpt-5-nano-2025-08-07")
+            try:
+                try:
+                    _encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                print(f"tiktoken-Encoding nicht verfügbar, Tokens werden geschätzt: {e}")
+        _geladen = True
+        return _encoding
+
+
+def geschaetzt() -> bool:
+    """True, wenn nicht mit tiktoken gezählt, sondern geschätzt wird"""
+    return _laden() is None
+
+
+def anzahl(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding if _geladen else _laden()
+    if encoding is None:
+        return max(1, len(text) // ZEICHEN_PRO_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+from services.agent_cache import normalize_query
+
+
+# ============================================
+# Persistenter Cache für Internet-Suchergebnisse (Tavily)
+# ============================================
+
+# Version des Dateiformats (PRAGMA user_version); 1 = Treffer als JSON
+SCHEMA_VERSION = 1
+
+
+class WebSearchCache:
+    """TTL-Cache in einer lokalen SQLite-Datei, übersteht also Neustarts.
+
+    - frisch (Alter < ttl): direkt aus dem Cache
+    - veraltet (Alter < ttl + stale): alter Wert sofort, Aktualisierung im Hintergrund
+    - älter oder unbekannt: Suche ausführen und speichern
+    Die Anzahl der Einträge ist begrenzt; verdrängt werden die am längsten nicht
+    mehr gelesenen. Gespeichert wird nur, was `fetch` zurückgibt; Fehler müssen
+    als Exception kommen und werden nicht gecacht.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, stale_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._initialized = False
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            if not self._initialized:
+                self._create_table(conn)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _create_table(self, conn: sqlite3.Connection):
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Ältere Dateien enthalten Python-repr und gecachte Fehlertexte: verwerfen
+            conn.execute("DROP TABLE IF EXISTS web_search")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS web_search ("
+            " key TEXT PRIMARY KEY, result TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_web_search_accessed ON web_search (accessed_at)")
+        self._initialized = True
+
+    def get_or_fetch(self, query: str, fetch: Callable[[str], str]) -> str:
+        key = normalize_query(query)
+        now = time.time()
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT result, fetched_at FROM web_search WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                result, fetched_at = row
+                age = now - fetched_at
+                if age < self.ttl_seconds + self.stale_seconds:
+                    conn.execute("UPDATE web_search SET accessed_at = ? WHERE key = ?", (now, key))
+                    if age < self.ttl_seconds:
+                        self.hits += 1
+                    else:
+                        self.stale_hits += 1
+                        self._refresh_in_background(key, query, fetch)
+                    return result
+
+        self.misses += 1
+        result = fetch(query)
+        self._store(key, result)
+        return result
+
+    def _store(self, key: str, result: str):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO web_search (key, result, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, result, now, now),
+            )
+            overflow = conn.execute("SELECT COUNT(*) FROM web_search").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM web_search WHERE key IN "
+                    "(SELECT key FROM web_search ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+
+    def _refresh_in_background(self, key: str, query: str, fetch: Callable[[str], str]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(key, fetch(query))
+            except Exception as e:
+                # Alter Wert bleibt bis zum Ablauf des Stale-Fensters gültig
+                self.refresh_errors += 1
+                print(f"Aktualisierung der Internet-Suche '{query}' fehlgeschlagen: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM web_search").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refresh_errors": self.refresh_errors,
+        }
+
+
+web_search_cache = WebSearchCache(
+    path=os.getenv("WEB_SEARCH_CACHE_PATH", "web_search_cache.sqlite3"),
+    ttl_seconds=float(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", str(24 * 3600))),
+    stale_seconds=float(os.getenv("WEB_SEARCH_CACHE_STALE_SECONDS", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "5000")),
+)
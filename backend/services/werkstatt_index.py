@@ -0,0 +1,167 @@
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select
+from database import SessionLocal
+from services.geo import GeoGrid, plz_geocoder
+import models
+
+
+# ============================================
+# In-Memory-Suchindex für Werkstätten
+# ============================================
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+@dataclass
+class WerkstattEintrag:
+    id: int
+    name: str
+    adresse: str
+    plz: str
+    ort: str
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+
+class WerkstattIndex:
+    """Phrasen-Index über Ort, PLZ und Name.
+
+    Jeder Feldwert wird als Token-Folge abgelegt ("frankfurt am main").
+    Bei der Suche werden nur die Token-N-Gramme des Anfragetexts nachgeschlagen,
+    die Kosten hängen also von der Länge der Anfrage und der Trefferzahl ab,
+    nicht von der Anzahl der Werkstätten. Die Koordinaten
+    liegen zusätzlich in einem Gitter-Index für Umkreissuchen.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+        # Während eines Ladevorgangs hinzugefügte Werkstätten, danach erneut eintragen
+        self._vorgemerkt: Optional[List] = None
+
+    def _clear(self):
+        self.werkstaetten: Dict[int, WerkstattEintrag] = {}
+        self._by_ort: Dict[tuple, Set[int]] = defaultdict(set)
+        self._by_plz: Dict[str, Set[int]] = defaultdict(set)
+        self._by_name: Dict[tuple, Set[int]] = defaultdict(set)
+        self._geo = GeoGrid()
+        self._max_phrase = 1
+        self.loaded = False
+
+    # ---------------- Aufbau ----------------
+    def build(self, werkstaetten: Iterable):
+        with self._lock:
+            self._clear()
+            for w in werkstaetten:
+                self._add(w)
+            for w in self._vorgemerkt or ():
+                self._add(w)
+            self._vorgemerkt = None
+            self.loaded = True
+
+    async def load_async(self, db):
+        """Baut den Index mit einer Abfrage auf (Auftragszahlen: services/statistik.py)"""
+        with self._lock:
+            self._vorgemerkt = []
+        self.build((await db.execute(_WERKSTATT_SELECT)).all())
+
+    def load(self, db):
+        with self._lock:
+            self._vorgemerkt = []
+        self.build(db.execute(_WERKSTATT_SELECT).all())
+
+    def ensure_loaded(self):
+        """Für Aufrufe außerhalb der App (z.B. Skripte) den Index bei Bedarf synchron laden"""
+        if self.loaded:
+            return
+        db = SessionLocal()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+
+    # ---------------- Inkrementelle Updates ----------------
+    def add_werkstatt(self, w):
+        with self._lock:
+            self._add(w)
+            if self._vorgemerkt is not None:
+                self._vorgemerkt.append(w)
+
+    def _add(self, w):
+        eintrag = WerkstattEintrag(w.id, w.name, w.adresse, w.plz, w.ort, w.lat, w.lon)
+        if eintrag.lat is None or eintrag.lon is None:
+            # Noch nicht nachgetragene Zeilen: Koordinaten nur im Speicher ermitteln
+            eintrag.lat, eintrag.lon = plz_geocoder.locate(eintrag.plz, eintrag.ort) or (None, None)
+        self.werkstaetten[eintrag.id] = eintrag
+        if eintrag.lat is not None:
+            self._geo.add(eintrag.id, eintrag.lat, eintrag.lon)
+
+        ort = tuple(tokenize(eintrag.ort))
+        name = tuple(tokenize(eintrag.name))
+        if ort:
+            self._by_ort[ort].add(eintrag.id)
+        if name:
+            self._by_name[name].add(eintrag.id)
+        if eintrag.plz:
+            self._by_plz[str(eintrag.plz).strip()].add(eintrag.id)
+        self._max_phrase = max(self._max_phrase, len(ort), len(name))
+
+    # ---------------- Suche ----------------
+    def search(self, user_query: str, classification: str = "") -> List[WerkstattEintrag]:
+        """Werkstätten, deren Name, Ort oder PLZ in der Anfrage vorkommt.
+
+        Ort und PLZ werden zusätzlich in der Klassifizierung von Agent 1 gesucht.
+        """
+        with self._lock:
+            treffer: Set[int] = set()
+            treffer |= self._lookup(tokenize(user_query), include_name=True)
+            if classification:
+                treffer |= self._lookup(tokenize(classification), include_name=False)
+            return [self.werkstaetten[i] for i in sorted(treffer)]
+
+    def find_ort(self, text: str) -> Optional[str]:
+        """Erster bekannter Werkstatt-Ort, der im Text vorkommt (Schreibweise wie gespeichert)"""
+        tokens = tokenize(text)
+        with self._lock:
+            for start in range(len(tokens)):
+                for length in range(min(self._max_phrase, len(tokens) - start), 0, -1):
+                    ids = self._by_ort.get(tuple(tokens[start:start + length]))
+                    if ids:
+                        return self.werkstaetten[min(ids)].ort
+        return None
+
+    def nearby(self, lat: float, lon: float, radius_km: float, limit: int) -> List[Tuple[WerkstattEintrag, float]]:
+        """Nächste Werkstätten im Umkreis, mit Entfernung in km"""
+        with self._lock:
+            return [(self.werkstaetten[i], d) for d, i in self._geo.nearest(lat, lon, radius_km, limit)]
+
+    def first(self, n: int) -> List[WerkstattEintrag]:
+        with self._lock:
+            return [self.werkstaetten[i] for i in sorted(self.werkstaetten)[:n]]
+
+    def _lookup(self, tokens: List[str], include_name: bool) -> Set[int]:
+        found: Set[int] = set()
+        for start in range(len(tokens)):
+            found |= self._by_plz.get(tokens[start], set())
+            for length in range(1, min(self._max_phrase, len(tokens) - start) + 1):
+                phrase = tuple(tokens[start:start + length])
+                found |= self._by_ort.get(phrase, set())
+                if include_name:
+                    found |= self._by_name.get(phrase, set())
+        return found
+
+
+_WERKSTATT_SELECT = select(
+    models.Werkstatt.id, models.Werkstatt.name, models.Werkstatt.adresse,
+    models.Werkstatt.plz, models.Werkstatt.ort, models.Werkstatt.lat, models.Werkstatt.lon,
+)
+
+werkstatt_index = WerkstattIndex()
@@ -1,49 +1,29 @@
-from typing import Optional
+from typing import AsyncIterator, Optional, Tuple
+import asyncio
+import contextvars
+import json
+import logging
 import os
-from langchain.chat_models import ChatOpenAI
-from langchain import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain.chains import SequentialChain
-from langchain_community.tools.tavily_search import TavilySearchResults
-from sqlalchemy.orm import Session
-from database import SessionLocal
-import models
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services.werkstatt_index import werkstatt_index
+from services.statistik import auftrag_statistik
+from services.web_search_cache import web_search_cache
+from services.agent_cache import normalize_query
+from services.fast_classifier import fast_classifier
+from services.geo import plz_geocoder
+from services.metrics import llm_tokens, stufe
+from services.prompt_kontext import AGENT2_CONTEXT_TOKENS, DBErgebnis, WebErgebnis, bauen as kontext_bauen
+from services import tokens as tokenizer
 
+logger = logging.getLogger(__name__)
 
-def run_werkstatt_agent_sequential(user_query: str) -> str:
-    """
-    Sequential Chain mit 2 Agenten:
-    
-    AGENT 1 (Klassifizierungs-Agent):
-    - Nimmt die Anfrage entgegen
-    - Analysiert, ob es um Werkstattsuche geht
-    - Extrahiert relevante Parameter (PLZ, Ort, Fahrzeugtyp)
-    - Entscheidet: Weiterleiten an Agent 2 oder direkt beantworten
-    
-    AGENT 2 (Werkstatt-Such-Agent):
-    - Wird nur aktiviert bei Werkstattsuche
-    - Sucht im Internet nach Werkstätten
-    - Durchsucht die lokale Datenbank
-    - Kombiniert beide Quellen zu einer Empfehlung
-    
-    Beispiel Flow:
-    User: "Finde mir eine gute Werkstatt in Berlin"
-    → Agent 1: Erkennt "Werkstattsuche", extrahiert "Berlin"
-    → Agent 2: Sucht im Web + DB, kombiniert Ergebnisse
-    → Output: Konkrete Werkstatt-Empfehlungen
-    """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY ist nicht konfiguriert")
-    
-    model_name = os.getenv("OPENAI_MODEL", "gpt-5-nano-2025-08-07")
-    llm = ChatOpenAI(openai_api_key=api_key, model_name=model_name, temperature=1.0)
-    
-    # ============================================
-    # AGENT 1: Klassifizierungs-Agent
-    # ============================================
-    
-    classification_template = """Du bist Agent 1, ein Klassifizierungs-Agent für Fahrzeugservice-Anfragen.
+
+# ============================================
+# AGENT 1: Klassifizierungs-Agent
+# ============================================
+
+CLASSIFICATION_TEMPLATE = """Du bist Agent 1, ein Klassifizierungs-Agent für Fahrzeugservice-Anfragen.
 
 Deine Aufgabe: Analysiere die Anfrage und entscheide, ob sie an Agent 2 (Werkstatt-Such-Agent) weitergeleitet werden soll.
 
@@ -68,18 +48,12 @@ Beispiele:
 - "Finde Werkstatt in Berlin" → WERKSTATT_SUCHE, WEITERLEITEN: JA
 - "Wie oft Ölwechsel?" → ANDERE, WEITERLEITEN: NEIN
 """
-    
-    agent1_chain = LLMChain(
-        llm=llm,
-        prompt=PromptTemplate(template=classification_template, input_variables=["user_input"]),
-        output_key="classification"
-    )
-    
-    # ============================================
-    # AGENT 2: Werkstatt-Such-Agent mit Web-Suche
-    # ============================================
-    
-    werkstatt_search_template = """Du bist Agent 2, ein spezialisierter Werkstatt-Such-Agent.
+
+# ============================================
+# AGENT 2: Werkstatt-Such-Agent mit Web-Suche
+# ============================================
+
+WERKSTATT_SEARCH_TEMPLATE = """Du bist Agent 2, ein spezialisierter Werkstatt-Such-Agent.
 
 Du erhältst von Agent 1:
 {classification}
@@ -107,58 +81,301 @@ Deine Aufgaben:
 
 Antworte auf Deutsch, freundlich und professionell.
 """
+
+NICHT_RELEVANT = "Nicht relevant (keine Werkstattsuche)"
+
+# Zeitlimits pro Stufe (Sekunden)
+LLM_TIMEOUT = float(os.getenv("AGENT_LLM_TIMEOUT", "60"))
+DB_TIMEOUT = float(os.getenv("AGENT_DB_TIMEOUT", "2"))
+WEB_TIMEOUT = float(os.getenv("AGENT_WEB_TIMEOUT", "10"))
+
+# Umkreis für die DB-Suche, wenn kein Ort/keine PLZ exakt passt
+NEARBY_RADIUS_KM = float(os.getenv("AGENT_NEARBY_RADIUS_KM", "30"))
+
+# Eigener Threadpool für blockierende Agent-Stufen (Tavily, Index), damit sie
+# nicht mit dem Standard-Pool der übrigen Endpunkte konkurrieren
+agent_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("AGENT_THREADS", "8")), thread_name_prefix="agent"
+)
+
+
+# ============================================
+# LLM-Client und Chains (einmal gebaut, wiederverwendet)
+# ============================================
+# LangChain/OpenAI/Tavily werden erst hier importiert (>1 s Importzeit), damit
+# der Import der App schnell bleibt; `warmup()` erledigt das beim Start im Hintergrund.
+
+_chains = {}
+_chains_lock = threading.Lock()
+
+
+def get_agent_chains():
+    """Liefert (agent1_chain, agent2_chain) für den konfigurierten Key/Model"""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY ist nicht konfiguriert")
+    model_name = os.getenv("OPENAI_MODEL", "gpt-5-nano-2025-08-07")
+
+    key = (api_key, model_name)
+    with _chains_lock:
+        if key not in _chains:
+            from langchain import LLMChain
+            from langchain.chat_models import ChatOpenAI
+            from langchain.prompts import PromptTemplate
+
+            llm = ChatOpenAI(openai_api_key=api_key, model_name=model_name, temperature=1.0)
+            agent1_chain = LLMChain(
+                llm=llm,
+                prompt=PromptTemplate(template=CLASSIFICATION_TEMPLATE, input_variables=["user_input"]),
+                output_key="classification"
+            )
+            agent2_chain = LLMChain(
+                llm=llm,
+                prompt=PromptTemplate(
+                    template=WERKSTATT_SEARCH_TEMPLATE,
+                    input_variables=["classification", "user_input", "db_results", "web_results"]
+                ),
+                output_key="final_answer"
+            )
+            _chains.clear()
+            _chains[key] = (agent1_chain, agent2_chain)
+        return _chains[key]
+
+
+def warmup():
+    """Lädt LangChain, den Tavily-Client und das tiktoken-Encoding vorab (blockierend, für einen Thread)"""
+    if os.getenv("OPENAI_API_KEY"):
+        get_agent_chains()
+        tokenizer.geschaetzt()
+    if os.getenv("TAVILY_API_KEY"):
+        get_tavily_client(os.getenv("TAVILY_API_KEY"))
+
+
+def ist_werkstattsuche(classification: str) -> bool:
+    return "WEITERLEITEN: JA" in classification or "WERKSTATT_SUCHE" in classification
+
+
+def run_werkstatt_agent_sequential(user_query: str) -> str:
+    """
+    Sequential Chain mit 2 Agenten:
     
-    agent2_chain = LLMChain(
-        llm=llm,
-        prompt=PromptTemplate(
-            template=werkstatt_search_template,
-            input_variables=["classification", "user_input", "db_results", "web_results"]
-        ),
-        output_key="final_answer"
-    )
+    AGENT 1 (Klassifizierungs-Agent):
+    - Nimmt die Anfrage entgegen
+    - Analysiert, ob es um Werkstattsuche geht
+    - Extrahiert relevante Parameter (PLZ, Ort, Fahrzeugtyp)
+    - Entscheidet: Weiterleiten an Agent 2 oder direkt beantworten
+    
+    AGENT 2 (Werkstatt-Such-Agent):
+    - Wird nur aktiviert bei Werkstattsuche
+    - Sucht im Internet nach Werkstätten
+    - Durchsucht die lokale Datenbank
+    - Kombiniert beide Quellen zu einer Empfehlung
+    
+    Beispiel Flow:
+    User: "Finde mir eine gute Werkstatt in Berlin"
+    → Agent 1: Erkennt "Werkstattsuche", extrahiert "Berlin"
+    → Agent 2: Sucht im Web + DB, kombiniert Ergebnisse
+    → Output: Konkrete Werkstatt-Empfehlungen
+
+    Synchrone Variante für Skripte; die API nutzt run_werkstatt_agent_async.
+    """
+    agent1_chain, agent2_chain = get_agent_chains()
     
     # ============================================
     # Führe Agent 1 aus
     # ============================================
     
-    agent1_result = agent1_chain({"user_input": user_query})
-    classification = agent1_result["classification"]
+    # Eindeutige Fälle klassifiziert die Regel-Vorstufe ohne LLM
+    with stufe("regel"):
+        classification = fast_classifier.classify(user_query)
+    if classification is None:
+        with stufe("agent1"):
+            agent1_result = agent1_chain({"user_input": user_query})
+        classification = agent1_result["classification"]
+        llm_tokens("agent1", agent1_chain.prompt.format(user_input=user_query), classification)
     
-    print(f"\n=== AGENT 1 KLASSIFIZIERUNG ===\n{classification}\n")
+    logger.debug("Agent 1 Klassifizierung:\n%s", classification)
     
     # ============================================
     # Entscheide basierend auf Agent 1
     # ============================================
     
-    if "WEITERLEITEN: JA" in classification or "WERKSTATT_SUCHE" in classification:
+    if ist_werkstattsuche(classification):
         # Werkstattsuche durchführen
         
         # 1. Datenbank durchsuchen
-        db_results = search_werkstaetten_in_db(user_query, classification)
+        db = db_ergebnis(user_query, classification)
         
         # 2. Internet durchsuchen (falls TAVILY_API_KEY vorhanden)
-        web_results = search_werkstaetten_in_web(user_query, classification)
+        web = web_ergebnis(user_query, classification)
         
-        # 3. Agent 2 ausführen
-        agent2_result = agent2_chain({
+        # 3. Agent 2 ausführen (Kontext nach Relevanz, im Token-Budget)
+        db_results, web_results = agent2_kontext(classification, db, web)
+        return _agent2_sync(agent2_chain, {
             "classification": classification,
             "user_input": user_query,
             "db_results": db_results,
             "web_results": web_results
         })
-        
-        return agent2_result["final_answer"]
     
     else:
         # Keine Werkstattsuche - Agent 2 beantwortet direkt
-        agent2_result = agent2_chain({
+        return _agent2_sync(agent2_chain, {
             "classification": classification,
             "user_input": user_query,
-            "db_results": "Nicht relevant (keine Werkstattsuche)",
-            "web_results": "Nicht relevant (keine Werkstattsuche)"
+            "db_results": NICHT_RELEVANT,
+            "web_results": NICHT_RELEVANT
         })
-        
-        return agent2_result["final_answer"]
+
+
+def _agent2_sync(agent2_chain, inputs: dict) -> str:
+    with stufe("agent2"):
+        answer = agent2_chain(inputs)["final_answer"]
+    llm_tokens("agent2", agent2_chain.prompt.format(**inputs), answer)
+    return answer
+
+
+async def run_werkstatt_agent_async(user_query: str) -> str:
+    """Gleicher Ablauf wie run_werkstatt_agent_sequential, aber nebenläufig.
+
+    Während Agent 1 klassifiziert, läuft die Web-Suche bereits spekulativ mit
+    dem Ort, der sich direkt aus der Anfrage ablesen lässt (ohne Ort keine
+    Spekulation). Passt die Klassifizierung dazu, wird das Ergebnis
+    übernommen, sonst wird die Suche neu gestartet. Die DB-Suche läuft parallel dazu über den In-Memory-Index.
+    Jede Stufe hat ein eigenes Zeitlimit; die Laufzeit liegt bei etwa
+    max(Agent 1, Web-Suche) + Agent 2 statt der Summe aller Stufen.
+    """
+    async for ereignis in stream_werkstatt_agent(user_query, tokens=False):
+        if ereignis["event"] == "done":
+            return ereignis["response"]
+
+
+async def stream_werkstatt_agent(user_query: str, tokens: bool = True) -> AsyncIterator[dict]:
+    """Ablauf von run_werkstatt_agent_async als Folge von Ereignissen.
+
+    - {"event": "classification", "werkstattsuche": ..., "fast_path": ...}
+    - {"event": "db_results" / "web_results", "text": ...} sobald die Stufe fertig ist
+    - {"event": "token", "text": ...} für jedes Stück der Antwort von Agent 2
+      (nur mit tokens=True, sonst ein einzelner Aufruf)
+    - {"event": "done", "response": ...} mit der vollständigen Antwort
+    """
+    agent1_chain, agent2_chain = get_agent_chains()
+
+    # Eindeutige Fälle klassifiziert die Regel-Vorstufe ohne LLM
+    with stufe("regel"):
+        classification = fast_classifier.classify(user_query)
+    fast_path = classification is not None
+
+    # Web-Suche schon jetzt starten: mit der Regel-Klassifizierung endgültig,
+    # sonst spekulativ während Agent 1 läuft, aber nur mit erkanntem Ort
+    if fast_path:
+        spec_web_query = extract_search_query(user_query, classification)
+    else:
+        spec_web_query = guess_search_query(user_query)
+    web_task = asyncio.create_task(_web_stage(user_query, spec_web_query)) if spec_web_query else None
+    db_task = None
+
+    try:
+        if classification is None:
+            with stufe("agent1"):
+                agent1_result = await asyncio.wait_for(agent1_chain.acall({"user_input": user_query}), LLM_TIMEOUT)
+            classification = agent1_result["classification"]
+            llm_tokens("agent1", agent1_chain.prompt.format(user_input=user_query), classification)
+
+        logger.debug("Agent 1 Klassifizierung:\n%s", classification)
+        werkstattsuche = ist_werkstattsuche(classification)
+        yield {"event": "classification", "werkstattsuche": werkstattsuche, "fast_path": fast_path}
+
+        if werkstattsuche:
+            # Die DB-Suche läuft über den In-Memory-Index und ist billig genug,
+            # um sie direkt mit der Klassifizierung zu wiederholen
+            db_task = asyncio.create_task(_db_stage(user_query, classification))
+
+            web_query = extract_search_query(user_query, classification)
+            if web_task is None or normalize_query(web_query) != normalize_query(spec_web_query):
+                if web_task is not None:
+                    web_task.cancel()
+                web_task = asyncio.create_task(_web_stage(user_query, web_query))
+
+            # Ergebnisse in der Reihenfolge melden, in der sie fertig werden
+            stufen = {db_task: "db_results", web_task: "web_results"}
+            ergebnisse = {}
+            offen = set(stufen)
+            while offen:
+                fertig, offen = await asyncio.wait(offen, return_when=asyncio.FIRST_COMPLETED)
+                for task in fertig:
+                    ergebnisse[stufen[task]] = task.result()
+                    anzeige = (format_db_ergebnis if stufen[task] == "db_results" else format_web_ergebnis)
+                    yield {"event": stufen[task], "text": anzeige(ergebnisse[stufen[task]])}
+            db_results, web_results = agent2_kontext(
+                classification, ergebnisse["db_results"], ergebnisse["web_results"]
+            )
+        else:
+            db_results = web_results = NICHT_RELEVANT
+    finally:
+        # Abbruch (Timeout, Client getrennt) darf keine Suche weiterlaufen lassen;
+        # ein bereits laufender Tavily-Aufruf im Threadpool endet trotzdem erst selbst
+        if web_task is not None:
+            web_task.cancel()
+        if db_task is not None:
+            db_task.cancel()
+
+    agent2_inputs = {
+        "classification": classification,
+        "user_input": user_query,
+        "db_results": db_results,
+        "web_results": web_results
+    }
+    if not tokens:
+        with stufe("agent2"):
+            agent2_result = await asyncio.wait_for(agent2_chain.acall(agent2_inputs), LLM_TIMEOUT)
+        answer = agent2_result["final_answer"]
+        llm_tokens("agent2", agent2_chain.prompt.format(**agent2_inputs), answer)
+        yield {"event": "done", "response": answer}
+        return
+
+    teile = []
+    with stufe("agent2"):
+        async for text in _stream_llm(agent2_chain, agent2_inputs):
+            teile.append(text)
+            yield {"event": "token", "text": text}
+    answer = "".join(teile)
+    llm_tokens("agent2", agent2_chain.prompt.format(**agent2_inputs), answer)
+    yield {"event": "done", "response": answer}
+
+
+async def _stream_llm(chain, inputs: dict) -> AsyncIterator[str]:
+    """Antwort einer LLMChain stückweise; LLM_TIMEOUT gilt für die ganze Antwort"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LLM_TIMEOUT
+    chunks = chain.llm.astream(chain.prompt.format(**inputs)).__aiter__()
+    while True:
+        try:
+            chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - loop.time(), 0))
+        except StopAsyncIteration:
+            return
+        if chunk.content:
+            yield chunk.content
+
+
+def _im_executor(fn, *args) -> asyncio.Future:
+    """fn im Agent-Threadpool, mit dem Kontext (Anfrageprofil) des Aufrufers"""
+    ctx = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(agent_executor, ctx.run, fn, *args)
+
+
+async def _db_stage(user_query: str, classification: str) -> DBErgebnis:
+    try:
+        return await asyncio.wait_for(_im_executor(db_ergebnis, user_query, classification), DB_TIMEOUT)
+    except asyncio.TimeoutError:
+        return DBErgebnis(fehler="❌ Datenbank-Suche hat zu lange gedauert.")
+
+
+async def _web_stage(user_query: str, search_query: str) -> WebErgebnis:
+    try:
+        return await asyncio.wait_for(_im_executor(web_ergebnis, user_query, "", search_query), WEB_TIMEOUT)
+    except asyncio.TimeoutError:
+        return WebErgebnis(search_query, fehler="❌ Internet-Suche hat zu lange gedauert.")
 
 
 # ============================================
@@ -166,87 +383,130 @@ Antworte auf Deutsch, freundlich und professionell.
 # ============================================
 
 def search_werkstaetten_in_db(user_query: str, classification: str) -> str:
-    """Durchsucht die Werkstatt-Datenbank"""
-    db = SessionLocal()
-    try:
-        # Extrahiere Suchbegriffe aus Query
-        query_lower = user_query.lower()
-        
-        # Hole alle Werkstätten
-        werkstaetten = db.query(models.Werkstatt).all()
-        
-        if not werkstaetten:
-            return "❌ Keine Werkstätten in unserer Datenbank vorhanden."
-        
-        # Filter nach Ort/PLZ
-        filtered = []
-        for w in werkstaetten:
-            # Prüfe Matches
-            ort_match = w.ort and w.ort.lower() in query_lower
-            plz_match = w.plz and str(w.plz) in user_query
-            name_match = w.name and w.name.lower() in query_lower
-            
-            # Auch in Klassifizierung suchen
-            if classification:
-                ort_in_class = w.ort and w.ort.lower() in classification.lower()
-                plz_in_class = w.plz and str(w.plz) in classification
-                
-                if ort_match or plz_match or name_match or ort_in_class or plz_in_class:
-                    filtered.append(w)
+    """Durchsucht die Werkstätten über den In-Memory-Index (siehe werkstatt_index.py)"""
+    return format_db_ergebnis(db_ergebnis(user_query, classification))
+
+
+def db_ergebnis(user_query: str, classification: str) -> DBErgebnis:
+    with stufe("db"):
+        try:
+            werkstatt_index.ensure_loaded()
+            auftrag_statistik.ensure_loaded()
+
+            if not werkstatt_index.werkstaetten:
+                return DBErgebnis(fehler="❌ Keine Werkstätten in unserer Datenbank vorhanden.")
+
+            # Filter nach Ort/PLZ/Name in Anfrage und Klassifizierung
+            filtered = werkstatt_index.search(user_query, classification)
+
+            distanzen = {}
+            # Falls keine gefunden, Umkreissuche um PLZ/Ort aus der Anfrage
+            if not filtered:
+                punkt = plz_geocoder.locate_text(f"{user_query}\n{classification}")
+                if punkt:
+                    nahe = werkstatt_index.nearby(punkt[0], punkt[1], NEARBY_RADIUS_KM, 10)
+                    filtered = [w for w, _ in nahe]
+                    distanzen = {w.id: d for w, d in nahe}
+
+            # Sonst zeige alle (max 10)
+            if not filtered:
+                filtered = werkstatt_index.first(10)
+                prefix = "ℹ️ Keine exakte Übereinstimmung. Alle verfügbaren Werkstätten:\n"
+            elif distanzen:
+                prefix = f"✅ Werkstätten im Umkreis von {NEARBY_RADIUS_KM:.0f} km ({len(filtered)}):\n"
             else:
-                if ort_match or plz_match or name_match:
-                    filtered.append(w)
-        
-        # Falls keine gefunden, zeige alle (max 10)
-        if not filtered:
-            filtered = werkstaetten[:10]
-            prefix = "ℹ️ Keine exakte Übereinstimmung. Alle verfügbaren Werkstätten:\n"
-        else:
-            prefix = f"✅ Gefundene Werkstätten in unserer Datenbank ({len(filtered)}):\n"
-        
-        # Formatiere Ergebnis
-        result = prefix
-        for w in filtered:
-            anzahl_auftraege = len(w.auftraege) if hasattr(w, 'auftraege') else 0
-            result += f"  • {w.name}\n"
-            result += f"    📍 {w.adresse}, {w.plz} {w.ort}\n"
-            result += f"    📊 Aufträge: {anzahl_auftraege}\n"
-            result += f"    🆔 ID: {w.id}\n\n"
-        
-        return result
-        
-    except Exception as e:
-        return f"❌ Fehler beim DB-Zugriff: {str(e)}"
-    finally:
-        db.close()
+                prefix = f"✅ Gefundene Werkstätten in unserer Datenbank ({len(filtered)}):\n"
+
+            auftraege = {w.id: auftrag_statistik.anzahl(w.id) for w in filtered}
+            return DBErgebnis(filtered, distanzen, auftraege, prefix)
+
+        except Exception as e:
+            return DBErgebnis(fehler=f"❌ Fehler beim DB-Zugriff: {str(e)}")
+
+
+def format_db_ergebnis(ergebnis: DBErgebnis) -> str:
+    """Ausführliche Anzeige der DB-Treffer (SSE-Ereignis db_results)"""
+    if ergebnis.fehler:
+        return ergebnis.fehler
+    result = ergebnis.ueberschrift
+    for w in ergebnis.werkstaetten:
+        result += f"  • {w.name}\n"
+        result += f"    📍 {w.adresse}, {w.plz} {w.ort}\n"
+        if w.id in ergebnis.distanzen:
+            result += f"    📏 ca. {ergebnis.distanzen[w.id]:.0f} km entfernt\n"
+        result += f"    📊 Aufträge: {ergebnis.auftraege.get(w.id, 0)}\n"
+        result += f"    🆔 ID: {w.id}\n\n"
+    return result
+
+
+_tavily_client = None
+_tavily_client_key = None
+
+
+def get_tavily_client(api_key: str):
+    """Tavily-Client einmal erzeugen und wiederverwenden"""
+    global _tavily_client, _tavily_client_key
+    if _tavily_client is None or _tavily_client_key != api_key:
+        from langchain_community.tools.tavily_search import TavilySearchResults
+
+        _tavily_client = TavilySearchResults(
+            api_key=api_key,
+            max_results=3,
+            search_depth="basic",
+            include_answer=True
+        )
+        _tavily_client_key = api_key
+    return _tavily_client
+
+
+def search_werkstaetten_in_web(user_query: str, classification: str, search_query: Optional[str] = None) -> str:
+    """Durchsucht das Internet nach Werkstätten (Ergebnisse persistent gecacht)"""
+    return format_web_ergebnis(web_ergebnis(user_query, classification, search_query))
 
 
-def search_werkstaetten_in_web(user_query: str, classification: str) -> str:
-    """Durchsucht das Internet nach Werkstätten"""
+def web_ergebnis(user_query: str, classification: str, search_query: Optional[str] = None) -> WebErgebnis:
     tavily_api_key = os.getenv("TAVILY_API_KEY")
     
     if not tavily_api_key:
-        return "⚠️ Internet-Suche nicht verfügbar (TAVILY_API_KEY fehlt in .env)"
+        return WebErgebnis(fehler="⚠️ Internet-Suche nicht verfügbar (TAVILY_API_KEY fehlt in .env)")
     
     try:
         # Extrahiere Ort aus Klassifizierung oder Query
-        search_query = extract_search_query(user_query, classification)
-        
-        # Tavily Search Tool
-        search = TavilySearchResults(
-            api_key=tavily_api_key,
-            max_results=3,
-            search_depth="basic",
-            include_answer=True
-        )
+        if search_query is None:
+            search_query = extract_search_query(user_query, classification)
         
-        # Führe Suche aus
-        results = search.run(search_query)
+        # Führe Suche aus – gleiche Query (z.B. gleicher Ort) kommt aus dem Cache.
+        # Tavily liefert eine Liste von Treffern, der Cache speichert sie als JSON
+        search = get_tavily_client(tavily_api_key)
+        with stufe("web"):
+            results = web_search_cache.get_or_fetch(search_query, lambda q: _tavily_suche(search, q))
         
-        return f"🌐 Internet-Recherche zu '{search_query}':\n\n{results}"
+        return WebErgebnis(search_query, results)
         
     except Exception as e:
-        return f"❌ Internet-Suche fehlgeschlagen: {str(e)}"
+        return WebErgebnis(search_query or "", fehler=f"❌ Internet-Suche fehlgeschlagen: {str(e)}")
+
+
+def _tavily_suche(search, query: str) -> str:
+    """Treffer als JSON-Liste; TavilySearchResults meldet Fehler als Text statt als
+    Exception, die werden hier zur Exception, damit sie nicht in den Cache kommen"""
+    treffer = search.run(query)
+    if not isinstance(treffer, list):
+        raise RuntimeError(str(treffer))
+    return json.dumps(treffer, ensure_ascii=False)
+
+
+def format_web_ergebnis(ergebnis: WebErgebnis) -> str:
+    """Ausführliche Anzeige der Web-Treffer (SSE-Ereignis web_results)"""
+    return ergebnis.fehler or f"🌐 Internet-Recherche zu '{ergebnis.query}':\n\n{ergebnis.roh}"
+
+
+def agent2_kontext(classification: str, db: DBErgebnis, web: WebErgebnis) -> Tuple[str, str]:
+    """db_results/web_results für Agent 2: kompakt im Token-Budget, mit AGENT2_CONTEXT_TOKENS=0 ausführlich"""
+    if AGENT2_CONTEXT_TOKENS <= 0:
+        return format_db_ergebnis(db), format_web_ergebnis(web)
+    kontext = kontext_bauen(classification, db, web)
+    return kontext.db_text, kontext.web_text
 
 
 def extract_search_query(user_query: str, classification: str) -> str:
@@ -267,3 +527,18 @@ def extract_search_query(user_query: str, classification: str) -> str:
     else:
         # Fallback auf ursprüngliche Query
         return f"Autowerkstatt {user_query}"
+
+
+def guess_search_query(user_query: str) -> Optional[str]:
+    """Such-Query ohne Agent 1: Ort per Ortsverzeichnis oder aus bekannten Werkstatt-Orten
+
+    None, wenn kein Ort erkennbar ist; dann lohnt sich keine spekulative Suche.
+    Läuft auf dem Event-Loop und nutzt den Werkstatt-Index daher nur, wenn er
+    schon geladen ist (kein synchroner DB-Zugriff).
+    """
+    ort = fast_classifier.find_location(user_query)
+    if not ort and werkstatt_index.loaded:
+        ort = werkstatt_index.find_ort(user_query)
+    if ort:
+        return extract_search_query(user_query, f"- Ort/PLZ: {ort}")
+    return None
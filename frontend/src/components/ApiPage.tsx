@@ -1,6 +1,26 @@
 import { useState, useEffect } from "react";
 import { api } from "../services/api";
-import type { Kunde, Fahrzeug, Werkstatt } from "../services/api";
+import type { Aenderung, Kunde, Fahrzeug, Werkstatt } from "../services/api";
+
+// Long-Poll-Dauer für /changes in Sekunden und Pause nach einem Fehler in ms
+const CHANGES_WAIT = 30;
+const CHANGES_RETRY_MS = 5000;
+
+// Änderungen einer Tabelle in die Liste übernehmen: ersetzen, anhängen oder (data = null) entfernen
+function einarbeiten<T extends { id: number }>(
+  liste: T[],
+  changes: Aenderung[],
+  table: Aenderung["table"]
+): T[] {
+  const relevant = changes.filter((c) => c.table === table);
+  if (relevant.length === 0) return liste;
+  const nachId = new Map(liste.map((eintrag) => [eintrag.id, eintrag]));
+  for (const change of relevant) {
+    if (change.data === null) nachId.delete(change.id);
+    else nachId.set(change.id, change.data as unknown as T);
+  }
+  return Array.from(nachId.values());
+}
 
 function App() {
   const [kunden, setKunden] = useState<Kunde[]>([]);
@@ -9,11 +29,17 @@ function App() {
   const [text, setText] = useState(""); // Add text state
 
   useEffect(() => {
-    loadData();
+    const abbruch = new AbortController();
+    loadData().then((cursor) => {
+      if (cursor !== undefined) pollChanges(cursor, abbruch.signal);
+    });
+    return () => abbruch.abort();
   }, []);
 
-  const loadData = async () => {
+  // Liefert den Cursor von vor dem Laden, damit keine Änderung dazwischen verloren geht
+  const loadData = async (): Promise<number | undefined> => {
     try {
+      const cursor = (await api.getChanges()).data.cursor;
       const [kundenRes, fahrzeugeRes, werkstattRes] = await Promise.all([
         api.getKunden(),
         api.getFahrzeuge(),
@@ -22,11 +48,32 @@ function App() {
       setKunden(kundenRes.data);
       setFahrzeuge(fahrzeugeRes.data);
       setWerkstatt(werkstattRes.data);
+      return cursor;
     } catch (error) {
       console.error("Error loading data:", error);
     }
   };
 
+  // Statt die Listen neu zu laden, nur die Änderungen seit `cursor` abholen (Long-Poll)
+  const pollChanges = async (cursor: number, signal: AbortSignal) => {
+    let wait = CHANGES_WAIT;
+    while (!signal.aborted) {
+      try {
+        const { data } = await api.getChanges(cursor, wait, signal);
+        setKunden((alt) => einarbeiten(alt, data.changes, "kunde"));
+        setFahrzeuge((alt) => einarbeiten(alt, data.changes, "fahrzeug"));
+        setWerkstatt((alt) => einarbeiten(alt, data.changes, "werkstatt"));
+        cursor = data.cursor;
+        // Weitere Seiten sofort holen, danach wieder warten
+        wait = data.has_more ? 0 : CHANGES_WAIT;
+      } catch (error) {
+        if (signal.aborted) return;
+        console.error("Error loading changes:", error);
+        await new Promise((resolve) => setTimeout(resolve, CHANGES_RETRY_MS));
+      }
+    }
+  };
+
   return (
     /*Simple Database query for testing Frontend/Backend*/
     <div>
@@ -1,4 +1,4 @@
-import axios from 'axios';
+import axios, { type AxiosResponse } from 'axios';
 
 const API_URL = 'http://localhost:8000';
 
@@ -24,20 +24,53 @@ export interface Werkstatt {
    ort: string; 
 }
 
+export interface Aenderung {
+  seq: number;
+  table: 'kunde' | 'fahrzeug' | 'werkstatt' | 'auftrag' | 'ki_aktionen';
+  id: number;
+  op: 'insert' | 'update';
+  data: Record<string, unknown> | null;
+}
+
+export interface AenderungsSeite {
+  changes: Aenderung[];
+  cursor: number;
+  has_more: boolean;
+}
+
+// Die Listen-Endpunkte liefern seitenweise (Cursor im Header X-Next-Cursor);
+// hier werden alle Seiten nacheinander geladen und zusammengefügt
+const SEITEN_LIMIT = 1000;
+
+async function alleSeiten<T>(pfad: string): Promise<AxiosResponse<T[]>> {
+  const params: { limit: number; after?: string } = { limit: SEITEN_LIMIT };
+  let res = await axios.get<T[]>(`${API_URL}${pfad}`, { params });
+  const daten = [...res.data];
+  while (res.headers['x-next-cursor']) {
+    params.after = String(res.headers['x-next-cursor']);
+    res = await axios.get<T[]>(`${API_URL}${pfad}`, { params });
+    daten.push(...res.data);
+  }
+  return { ...res, data: daten };
+}
+
 export const api = {
   // Kunden
-  getKunden: () => axios.get<Kunde[]>(`${API_URL}/kunden`),
+  getKunden: () => alleSeiten<Kunde>('/kunden'),
   createKunde: (kunde: Omit<Kunde, 'id'>) => axios.post<Kunde>(`${API_URL}/kunden`, kunde),
 
   // Fahrzeuge
-  getFahrzeuge: () => axios.get<Fahrzeug[]>(`${API_URL}/fahrzeuge`),
+  getFahrzeuge: () => alleSeiten<Fahrzeug>('/fahrzeuge'),
   createFahrzeug: (fahrzeug: Omit<Fahrzeug, 'id'>) => 
     axios.post<Fahrzeug>(`${API_URL}/fahrzeuge`, fahrzeug),
 
   // Werkstatt
-  getWerkstatt: () => axios.get<Werkstatt[]>(`${API_URL}/werkstatt`),
+  getWerkstatt: () => alleSeiten<Werkstatt>('/werkstatt'),
   createWerkstatt: (werkstatt: Omit<Werkstatt, 'id'>) => 
     axios.post<Werkstatt>(`${API_URL}/werkstatt`, werkstatt),
+  // Änderungen seit `since` (ohne: nur aktueller Cursor); `wait` = Long-Poll in Sekunden
+  getChanges: (since?: number, wait = 0, signal?: AbortSignal) =>
+    axios.get<AenderungsSeite>(`${API_URL}/changes`, { params: { since, wait }, signal }),
   // OpenAI chat
   sendToOpenAI: (message: { message: string }) =>
     axios.post<{ response: string }>(`${API_URL}/langchain/chat`, message),